@@ -0,0 +1,55 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005_outline_key_pool"
+down_revision = "0004_admin_audit"
+branch_labels = None
+depends_on = None
+
+
+def create_pool_tables(existing: set[str]) -> None:
+    if "outline_pools" not in existing:
+        op.create_table(
+            "outline_pools",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column("code", sa.String(length=50), nullable=False, unique=True),
+            sa.Column("name", sa.String(length=255), nullable=False),
+            sa.Column("is_active", sa.Boolean(), nullable=False, server_default="true"),
+            sa.Column("is_default", sa.Boolean(), nullable=False, server_default="false"),
+        )
+    if "outline_pool_nodes" not in existing:
+        op.create_table(
+            "outline_pool_nodes",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column("pool_id", sa.Integer(), sa.ForeignKey("outline_pools.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("outline_node_id", sa.Integer(), sa.ForeignKey("outline_nodes.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("priority", sa.Integer()),
+            sa.Column("is_active", sa.Boolean(), nullable=False, server_default="true"),
+        )
+    if "outline_pool_regions" not in existing:
+        op.create_table(
+            "outline_pool_regions",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column("pool_id", sa.Integer(), sa.ForeignKey("outline_pools.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("region_id", sa.Integer(), sa.ForeignKey("regions.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("priority", sa.Integer()),
+            sa.Column("is_active", sa.Boolean(), nullable=False, server_default="true"),
+        )
+
+
+def upgrade() -> None:
+    create_pool_tables(set(sa.inspect(op.get_bind()).get_table_names()))
+    op.alter_column("outline_access_keys", "device_id", existing_type=sa.Integer(), nullable=True)
+    op.add_column("outline_access_keys", sa.Column("assigned_at", sa.DateTime(timezone=True)))
+    op.add_column("outline_nodes", sa.Column("key_pool_size", sa.Integer()))
+    op.add_column("outline_pools", sa.Column("key_pool_size", sa.Integer()))
+
+
+def downgrade() -> None:
+    op.drop_column("outline_nodes", "key_pool_size")
+    op.drop_column("outline_access_keys", "assigned_at")
+    op.execute("DELETE FROM outline_access_keys WHERE device_id IS NULL")
+    op.alter_column("outline_access_keys", "device_id", existing_type=sa.Integer(), nullable=False)
+    op.drop_table("outline_pool_regions")
+    op.drop_table("outline_pool_nodes")
+    op.drop_table("outline_pools")
@@ -0,0 +1,15 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006_outline_node_capacity"
+down_revision = "0005_outline_key_pool"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("outline_nodes", sa.Column("capacity", sa.Integer()))
+
+
+def downgrade() -> None:
+    op.drop_column("outline_nodes", "capacity")
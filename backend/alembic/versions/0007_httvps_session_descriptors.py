@@ -0,0 +1,24 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007_httvps_session_descriptors"
+down_revision = "0006_outline_node_capacity"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    prefixes = ["UNLOGGED"] if op.get_bind().dialect.name == "postgresql" else []
+    op.create_table(
+        "httvps_session_descriptors",
+        sa.Column("token", sa.String(length=128), primary_key=True),
+        sa.Column("payload", sa.JSON(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        prefixes=prefixes,
+    )
+    op.create_index("ix_httvps_session_descriptors_expires_at", "httvps_session_descriptors", ["expires_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_httvps_session_descriptors_expires_at", table_name="httvps_session_descriptors")
+    op.drop_table("httvps_session_descriptors")
@@ -0,0 +1,45 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008_hot_path_indexes"
+down_revision = "0007_httvps_session_descriptors"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_outline_access_keys_device_revoked_created",
+        "outline_access_keys",
+        ["device_id", "revoked", "created_at"],
+    )
+    op.create_index("ix_outline_access_keys_node_revoked", "outline_access_keys", ["outline_node_id", "revoked"])
+    op.create_index(
+        "ix_outline_access_keys_pooled",
+        "outline_access_keys",
+        ["outline_node_id", "id"],
+        postgresql_where=sa.text("device_id IS NULL AND revoked = false"),
+        sqlite_where=sa.text("device_id IS NULL AND revoked = 0"),
+    )
+    op.create_index(
+        "ix_subscriptions_user_status_valid_until",
+        "subscriptions",
+        ["user_id", "status", "valid_until"],
+    )
+    op.create_index("ix_sessions_device_id", "sessions", ["device_id"])
+    op.create_index("ix_outline_pool_nodes_pool_active", "outline_pool_nodes", ["pool_id", "is_active"])
+    op.create_index(
+        "ix_outline_nodes_region_active_deleted",
+        "outline_nodes",
+        ["region_id", "is_active", "is_deleted"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_outline_nodes_region_active_deleted", table_name="outline_nodes")
+    op.drop_index("ix_outline_pool_nodes_pool_active", table_name="outline_pool_nodes")
+    op.drop_index("ix_sessions_device_id", table_name="sessions")
+    op.drop_index("ix_subscriptions_user_status_valid_until", table_name="subscriptions")
+    op.drop_index("ix_outline_access_keys_pooled", table_name="outline_access_keys")
+    op.drop_index("ix_outline_access_keys_node_revoked", table_name="outline_access_keys")
+    op.drop_index("ix_outline_access_keys_device_revoked_created", table_name="outline_access_keys")
@@ -0,0 +1,31 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0009_outline_node_health_history"
+down_revision = "0008_hot_path_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "outline_node_health_history",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("outline_node_id", sa.Integer(), sa.ForeignKey("outline_nodes.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("bucket_start", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("samples", sa.Integer(), nullable=False),
+        sa.Column("errors", sa.Integer(), nullable=False),
+        sa.Column("ewma_ms", sa.Float()),
+        sa.Column("p50_ms", sa.Float()),
+        sa.Column("p95_ms", sa.Float()),
+    )
+    op.create_index(
+        "ix_outline_node_health_history_node_bucket",
+        "outline_node_health_history",
+        ["outline_node_id", "bucket_start"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_outline_node_health_history_node_bucket", table_name="outline_node_health_history")
+    op.drop_table("outline_node_health_history")
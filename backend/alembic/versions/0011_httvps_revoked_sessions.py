@@ -0,0 +1,21 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0011_httvps_revoked_sessions"
+down_revision = "0010_leader_leases"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "httvps_revoked_sessions",
+        sa.Column("session_id", sa.String(length=64), primary_key=True),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("ix_httvps_revoked_sessions_expires_at", "httvps_revoked_sessions", ["expires_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_httvps_revoked_sessions_expires_at", table_name="httvps_revoked_sessions")
+    op.drop_table("httvps_revoked_sessions")
@@ -0,0 +1,19 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0012_outline_node_health_stats"
+down_revision = "0011_httvps_revoked_sessions"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("outline_nodes", sa.Column("latency_p50_ms", sa.Float()))
+    op.add_column("outline_nodes", sa.Column("latency_p95_ms", sa.Float()))
+    op.add_column("outline_nodes", sa.Column("error_rate", sa.Float()))
+
+
+def downgrade() -> None:
+    op.drop_column("outline_nodes", "error_rate")
+    op.drop_column("outline_nodes", "latency_p95_ms")
+    op.drop_column("outline_nodes", "latency_p50_ms")
@@ -0,0 +1,15 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0013_outline_node_health_check_request"
+down_revision = "0012_outline_node_health_stats"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("outline_nodes", sa.Column("health_check_requested_at", sa.DateTime(timezone=True)))
+
+
+def downgrade() -> None:
+    op.drop_column("outline_nodes", "health_check_requested_at")
@@ -0,0 +1,19 @@
+import math
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+from fastapi import HTTPException, status
+from app.services.admission_service import AdmissionRejected, DeviceRateLimited, admission
+
+
+@asynccontextmanager
+async def admission_guard(route: str, device_id: str | None = None) -> AsyncIterator[None]:
+    try:
+        async with admission.admit(route, device_id):
+            yield
+    except AdmissionRejected as exc:
+        status_code = status.HTTP_429_TOO_MANY_REQUESTS if isinstance(exc, DeviceRateLimited) else status.HTTP_503_SERVICE_UNAVAILABLE
+        raise HTTPException(
+            status_code=status_code,
+            detail=exc.reason,
+            headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))},
+        )
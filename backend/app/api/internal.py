@@ -1,24 +1,64 @@
-from fastapi import APIRouter, Header, HTTPException
-from app.core.config import get_settings
-from app.schemas.httvps import ValidateSessionRequest, ValidateSessionResponse
-from app.services.httvps_session_service import validate_session_token
+from typing import Any
+from fastapi import APIRouter, Header, HTTPException, status
+from app.core.config import Settings, get_settings
+from app.schemas.httvps import (
+    RevokeSessionRequest,
+    RevokeSessionResponse,
+    ValidateSessionBatchItem,
+    ValidateSessionBatchRequest,
+    ValidateSessionBatchResponse,
+    ValidateSessionRequest,
+    ValidateSessionResponse,
+)
+from app.services.httvps_session_service import revoke_session_token, validate_session_token, validate_session_tokens
 
 
 router = APIRouter(prefix="/internal")
 
 
+def check_internal_secret(settings: Settings, x_internal_secret: str | None) -> None:
+    if settings.gateway_internal_secret and settings.gateway_internal_secret != (x_internal_secret or ""):
+        raise HTTPException(status_code=403, detail={"reason": "forbidden"})
+
+
 @router.post("/httvps/validate-session", response_model=ValidateSessionResponse)
 async def validate_session(body: ValidateSessionRequest, x_internal_secret: str | None = Header(default=None)):
     settings = get_settings()
-    if settings.gateway_internal_secret and settings.gateway_internal_secret != (x_internal_secret or ""):
-        raise HTTPException(status_code=403, detail={"reason": "forbidden"})
-    descriptor = await validate_session_token(body.session_token)
+    check_internal_secret(settings, x_internal_secret)
+    descriptor = await validate_session_token(body.session_token, settings)
     if not descriptor:
         raise HTTPException(status_code=403, detail={"reason": "invalid_session"})
-    outline = descriptor.get("outline") or {}
+    return build_validate_response(descriptor)
+
+
+def build_validate_response(descriptor: dict[str, Any]) -> ValidateSessionResponse:
     return ValidateSessionResponse(
-        session_id=descriptor.get("session_token"),
+        session_id=descriptor.get("session_id") or descriptor.get("session_token"),
         device_id=descriptor.get("device_id"),
         max_streams=descriptor.get("max_streams", 0),
-        outline=outline,
+        outline=descriptor.get("outline") or {},
     )
+
+
+@router.post("/httvps/validate-session:batch", response_model=ValidateSessionBatchResponse)
+async def validate_session_batch(body: ValidateSessionBatchRequest, x_internal_secret: str | None = Header(default=None)):
+    settings = get_settings()
+    check_internal_secret(settings, x_internal_secret)
+    if len(body.session_tokens) > settings.httvps_validate_batch_max_tokens:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="too_many_tokens")
+    descriptors = await validate_session_tokens(body.session_tokens, settings)
+    results = [
+        ValidateSessionBatchItem(index=index, valid=True, session=build_validate_response(descriptor))
+        if descriptor
+        else ValidateSessionBatchItem(index=index, valid=False, reason="invalid_session")
+        for index, descriptor in enumerate(descriptors)
+    ]
+    return ValidateSessionBatchResponse(valid=sum(1 for item in results if item.valid), results=results)
+
+
+@router.post("/httvps/revoke-session", response_model=RevokeSessionResponse)
+async def revoke_session(body: RevokeSessionRequest, x_internal_secret: str | None = Header(default=None)):
+    settings = get_settings()
+    check_internal_secret(settings, x_internal_secret)
+    revoked = await revoke_session_token(body.session_token, settings)
+    return RevokeSessionResponse(revoked=revoked)
@@ -57,6 +57,8 @@ def build_outline_info(node) -> OutlineNodeInfo:
         api_key=node.api_key,
         tag=node.tag,
         priority=node.priority,
+        key_pool_size=node.key_pool_size,
+        capacity=node.capacity,
         is_active=node.is_active,
         is_deleted=node.is_deleted,
     )
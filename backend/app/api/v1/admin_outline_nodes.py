@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import get_settings
 from app.core.database import get_session
-from app.schemas.nodes import OutlineNodeStatus
-from app.services.nodes_service import list_outline_nodes, build_outline_node_status
-from app.services.outline_health_service import trigger_outline_healthcheck
+from app.schemas.nodes import OutlineNodeHealthPoint, OutlineNodeStatus
+from app.services.nodes_service import get_outline_node_status, list_outline_node_health, list_outline_node_statuses
+from app.services.outline_health_service import request_outline_healthcheck, run_outline_healthcheck
 from app.api.admin import require_admin
 
 
@@ -11,27 +12,44 @@ router = APIRouter(prefix="/admin/outline-nodes")
 
 
 @router.get("/", response_model=list[OutlineNodeStatus], dependencies=[Depends(require_admin)])
-async def list_nodes(session: AsyncSession = Depends(get_session)):
-    nodes = await list_outline_nodes(session)
-    statuses = []
-    for node in nodes:
-        statuses.append(await build_outline_node_status(session, node))
-    return statuses
+async def list_nodes(
+    region: str | None = None,
+    status_filter: str | None = Query(default=None, alias="status"),
+    tag: str | None = None,
+    limit: int | None = Query(default=None, ge=1, le=1000),
+    offset: int = Query(default=0, ge=0),
+    session: AsyncSession = Depends(get_session),
+):
+    return await list_outline_node_statuses(session, region, status_filter, tag, limit, offset)
 
 
 @router.get("/{node_id}", response_model=OutlineNodeStatus, dependencies=[Depends(require_admin)])
 async def get_node(node_id: int, session: AsyncSession = Depends(get_session)):
-    nodes = await list_outline_nodes(session)
-    node = next((item for item in nodes if item.id == node_id), None)
-    if not node:
+    node_status = await get_outline_node_status(session, node_id)
+    if not node_status:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="not_found")
-    return await build_outline_node_status(session, node)
+    return node_status
+
+
+@router.get("/{node_id}/health-history", response_model=list[OutlineNodeHealthPoint], dependencies=[Depends(require_admin)])
+async def get_node_health_history(
+    node_id: int,
+    limit: int = Query(default=288, ge=1, le=10000),
+    session: AsyncSession = Depends(get_session),
+):
+    history = await list_outline_node_health(session, node_id, limit)
+    if history is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="not_found")
+    return history
 
 
 @router.post("/{node_id}/check", response_model=OutlineNodeStatus, dependencies=[Depends(require_admin)])
 async def manual_check(node_id: int, session: AsyncSession = Depends(get_session)):
     settings = get_settings()
-    node = await trigger_outline_healthcheck(session, node_id, settings)
-    if not node:
+    if settings.outline_healthcheck_interval_seconds <= 0:
+        found = await run_outline_healthcheck(session, node_id, settings)
+    else:
+        found = await request_outline_healthcheck(session, node_id)
+    if not found:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="not_found")
-    return await build_outline_node_status(session, node)
+    return await get_outline_node_status(session, node_id)
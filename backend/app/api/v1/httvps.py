@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.api.admission import admission_guard
 from app.core.config import get_settings
 from app.core.database import get_session
 from app.schemas.httvps import SessionRequest, SessionResponse
@@ -12,7 +13,8 @@ router = APIRouter()
 @router.post("/session", response_model=SessionResponse)
 async def create_session(body: SessionRequest, session: AsyncSession = Depends(get_session)):
     settings = get_settings()
-    descriptor = await issue_session_descriptor(session, body.device_id, body.token, body.region, settings)
+    async with admission_guard("httvps_session"):
+        descriptor = await issue_session_descriptor(session, body.device_id, body.token, body.region, settings)
     if not descriptor.get("allowed"):
         raise HTTPException(status_code=403, detail=descriptor)
     return SessionResponse(
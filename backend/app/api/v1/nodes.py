@@ -1,5 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.api.admission import admission_guard
+from app.clients.outline_client import OutlineClient
 from app.core.database import get_session
 from app.schemas.nodes import OutlineNodeAssignmentRequest, OutlineNodeAssignment, OutlineRevokeRequest, OutlineRevokeResponse
 from app.services.nodes_service import (
@@ -17,7 +19,8 @@ router = APIRouter()
 @router.post("/assign-outline", response_model=OutlineNodeAssignment)
 async def assign_outline(body: OutlineNodeAssignmentRequest, session: AsyncSession = Depends(get_session)):
     try:
-        assignment = await assign_outline_node(session, body.region_code, body.device_id, pool_code=body.pool_code)
+        async with admission_guard("assign_outline"):
+            assignment = await assign_outline_node(session, body.region_code, body.device_id, pool_code=body.pool_code)
     except NoOutlineNodesAvailable:
         raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="no_outline_nodes_available")
     except NoHealthyOutlineNodesError:
@@ -31,7 +34,7 @@ async def assign_outline(body: OutlineNodeAssignmentRequest, session: AsyncSessi
 async def revoke_outline(body: OutlineRevokeRequest, request: Request, session: AsyncSession = Depends(get_session)):
     client_class = getattr(request.app.state, "outline_client_class", None)
     try:
-        revoked = await revoke_outline_key(session, body.device_id, client_class=client_class or None)
+        revoked = await revoke_outline_key(session, body.device_id, client_class=client_class or OutlineClient)
     except OutlineProvisioningError as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc))
     return OutlineRevokeResponse(revoked=revoked)
@@ -1,8 +1,12 @@
-from fastapi import APIRouter, Depends
+import json
+import zlib
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import Settings, get_settings
 from app.core.database import get_session
-from app.schemas.usage import UsageReport
-from app.services.sessions_service import apply_usage
+from app.schemas.usage import UsageBatchItemResult, UsageBatchResponse, UsageReport
+from app.services.sessions_service import apply_usage, apply_usage_batch
 
 
 router = APIRouter()
@@ -10,5 +14,80 @@ router = APIRouter()
 
 @router.post("/usage/report")
 async def report_usage(body: UsageReport, session: AsyncSession = Depends(get_session)):
-    await apply_usage(session, body.session_id, body.bytes_up, body.bytes_down)
+    settings = get_settings()
+    await apply_usage(session, body.session_id, body.bytes_up, body.bytes_down, settings)
     return {"status": "accepted"}
+
+
+def too_large(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=detail)
+
+
+async def read_raw_body(request: Request, max_bytes: int) -> bytes:
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > max_bytes:
+        raise too_large("body_too_large")
+    chunks = []
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > max_bytes:
+            raise too_large("body_too_large")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def decompress_gzip(raw: bytes, max_bytes: int) -> bytes:
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    try:
+        data = decompressor.decompress(raw, max_bytes + 1)
+    except zlib.error:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="invalid_gzip_body")
+    if len(data) > max_bytes or decompressor.unconsumed_tail:
+        raise too_large("body_too_large")
+    if not decompressor.eof:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="invalid_gzip_body")
+    return data
+
+
+async def read_batch_items(request: Request, settings: Settings) -> list:
+    raw = await read_raw_body(request, settings.usage_batch_max_bytes)
+    if request.headers.get("content-encoding", "").lower() == "gzip":
+        raw = decompress_gzip(raw, settings.usage_batch_max_bytes)
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    try:
+        if content_type in ("application/x-ndjson", "application/jsonl"):
+            lines = [line for line in raw.splitlines() if line.strip()]
+            if len(lines) > settings.usage_batch_max_items:
+                raise too_large("too_many_reports")
+            return [json.loads(line) for line in lines]
+        data = json.loads(raw or b"[]")
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="invalid_json_body")
+    if isinstance(data, dict):
+        data = data.get("reports")
+    if not isinstance(data, list):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="expected_report_list")
+    return data
+
+
+@router.post("/usage/report:batch", response_model=UsageBatchResponse)
+async def report_usage_batch(request: Request, session: AsyncSession = Depends(get_session)):
+    settings = get_settings()
+    items = await read_batch_items(request, settings)
+    if len(items) > settings.usage_batch_max_items:
+        raise too_large("too_many_reports")
+    results: list[UsageBatchItemResult | None] = [None] * len(items)
+    reports: list[tuple[int, UsageReport]] = []
+    for index, item in enumerate(items):
+        try:
+            reports.append((index, UsageReport.model_validate(item)))
+        except ValidationError as exc:
+            error = exc.errors()[0]
+            location = ".".join(str(part) for part in error.get("loc", ()))
+            results[index] = UsageBatchItemResult(index=index, status="invalid", error=f"{location}:{error.get('type')}")
+    statuses = await apply_usage_batch(session, [report for _, report in reports])
+    for (index, _), item_status in zip(reports, statuses):
+        results[index] = UsageBatchItemResult(index=index, status=item_status)
+    accepted = sum(1 for item_status in statuses if item_status == "accepted")
+    return UsageBatchResponse(accepted=accepted, results=results)
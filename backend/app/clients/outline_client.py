@@ -1,5 +1,12 @@
+import asyncio
+import time
 import httpx
+from contextlib import asynccontextmanager, suppress
 from dataclasses import dataclass
+from typing import AsyncIterator
+from urllib.parse import urlsplit
+from app.core.config import Settings
+from app.core.metrics import OUTLINE_HTTP_CLIENTS, OUTLINE_HTTP_POOL_LIMIT, OUTLINE_HTTP_REQUESTS_IN_FLIGHT
 
 
 class OutlineClientError(Exception):
@@ -15,42 +22,199 @@ class OutlineKeyData:
     access_url: str | None = None
 
 
+@dataclass
+class ProbeTimings:
+    tcp_ms: float | None = None
+    tls_ms: float | None = None
+    http_ms: float | None = None
+
+    def phases(self) -> dict[str, float]:
+        values = {"tcp": self.tcp_ms, "tls": self.tls_ms, "http": self.http_ms}
+        return {phase: value for phase, value in values.items() if value is not None}
+
+
+class ProbeTracer:
+    def __init__(self):
+        self.timings = ProbeTimings()
+        self._started: dict[str, float] = {}
+
+    async def __call__(self, event: str, info: dict) -> None:
+        name, _, stage = event.rpartition(".")
+        if stage == "started":
+            self._started[name] = time.perf_counter()
+            return
+        started = self._started.pop(name, None)
+        if started is None or stage != "complete":
+            return
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if name == "connection.connect_tcp":
+            self.timings.tcp_ms = elapsed_ms
+        elif name == "connection.start_tls":
+            self.timings.tls_ms = elapsed_ms
+        elif name.startswith(("http11.", "http2.")) and not name.endswith(".response_closed"):
+            self.timings.http_ms = (self.timings.http_ms or 0.0) + elapsed_ms
+
+
+def parse_key_data(data: dict) -> OutlineKeyData:
+    return OutlineKeyData(
+        key_id=str(data.get("id")),
+        password=data.get("password") or "",
+        port=int(data.get("port")) if data.get("port") is not None else 0,
+        method=data.get("method"),
+        access_url=data.get("accessUrl"),
+    )
+
+
+def node_label(api_url: str) -> str:
+    return urlsplit(api_url).netloc or api_url
+
+
+async def probe_tcp(host: str, port: int, timeout: float) -> ProbeTimings:
+    start = time.perf_counter()
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    except asyncio.TimeoutError:
+        raise OutlineClientError("tcp_connect_timeout")
+    except OSError as exc:
+        raise OutlineClientError(f"tcp_connect_failed:{exc.strerror or exc.__class__.__name__}")
+    timings = ProbeTimings(tcp_ms=(time.perf_counter() - start) * 1000)
+    writer.close()
+    with suppress(OSError):
+        await writer.wait_closed()
+    return timings
+
+
 class OutlineClient:
-    def __init__(self, api_url: str, api_key: str, timeout: float = 5.0, transport: httpx.AsyncBaseTransport | None = None):
+    def __init__(
+        self,
+        api_url: str,
+        api_key: str,
+        timeout: float = 5.0,
+        transport: httpx.AsyncBaseTransport | None = None,
+        http_client: httpx.AsyncClient | None = None,
+    ):
         self.api_url = api_url.rstrip("/")
         self.api_key = api_key
         self.timeout = timeout
         self.transport = transport
+        self.http_client = http_client
+
+    @asynccontextmanager
+    async def _client(self) -> AsyncIterator[httpx.AsyncClient]:
+        if self.http_client is not None:
+            yield self.http_client
+            return
+        headers = {"Authorization": f"Bearer {self.api_key}"}
+        async with httpx.AsyncClient(base_url=self.api_url, timeout=self.timeout, headers=headers, transport=self.transport) as client:
+            yield client
+
+    async def _request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        in_flight = OUTLINE_HTTP_REQUESTS_IN_FLIGHT.labels(node=node_label(self.api_url))
+        in_flight.inc()
+        try:
+            async with self._client() as client:
+                return await client.request(method, path, timeout=self.timeout, **kwargs)
+        finally:
+            in_flight.dec()
 
     async def create_key(self, name: str | None = None) -> OutlineKeyData:
         payload = {}
         if name:
             payload["name"] = name
-        headers = {"Authorization": f"Bearer {self.api_key}"}
-        async with httpx.AsyncClient(base_url=self.api_url, timeout=self.timeout, headers=headers, transport=self.transport) as client:
-            response = await client.post("/access-keys", json=payload)
+        response = await self._request("POST", "/access-keys", json=payload)
         if response.status_code not in (200, 201):
             raise OutlineClientError(f"create_key_failed:{response.status_code}")
-        data = response.json()
-        key_id = str(data.get("id"))
-        password = data.get("password") or ""
-        port = int(data.get("port")) if data.get("port") is not None else 0
-        method = data.get("method")
-        access_url = data.get("accessUrl")
-        if not key_id:
+        key = parse_key_data(response.json())
+        if not key.key_id:
             raise OutlineClientError("empty_key_id")
-        return OutlineKeyData(key_id=key_id, password=password, port=port, method=method, access_url=access_url)
+        return key
+
+    async def list_keys(self) -> list[OutlineKeyData]:
+        response = await self._request("GET", "/access-keys")
+        if response.status_code != 200:
+            raise OutlineClientError(f"list_keys_failed:{response.status_code}")
+        return [parse_key_data(item) for item in response.json().get("accessKeys", []) if item.get("id") is not None]
 
     async def delete_key(self, key_id: str) -> None:
-        headers = {"Authorization": f"Bearer {self.api_key}"}
-        async with httpx.AsyncClient(base_url=self.api_url, timeout=self.timeout, headers=headers, transport=self.transport) as client:
-            response = await client.delete(f"/access-keys/{key_id}")
+        response = await self._request("DELETE", f"/access-keys/{key_id}")
         if response.status_code not in (200, 204, 404):
             raise OutlineClientError(f"delete_key_failed:{response.status_code}")
 
-    async def health_check(self) -> None:
-        headers = {"Authorization": f"Bearer {self.api_key}"}
-        async with httpx.AsyncClient(base_url=self.api_url, timeout=self.timeout, headers=headers, transport=self.transport) as client:
-            response = await client.get("/access-keys")
+    async def health_check(self, probe: str = "server", trace: ProbeTracer | None = None) -> None:
+        path = "/access-keys" if probe == "access_keys" else "/server"
+        extensions = {"trace": trace} if trace is not None else {}
+        response = await self._request("GET", path, extensions=extensions)
         if response.status_code != 200:
             raise OutlineClientError(f"health_check_failed:{response.status_code}")
+
+
+class OutlineClientRegistry:
+    def __init__(
+        self,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 30.0,
+        http2: bool = False,
+        timeout: float = 5.0,
+    ):
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.http2 = http2
+        self.timeout = timeout
+        self._clients: dict[tuple[str, str], httpx.AsyncClient] = {}
+
+    def configure(self, settings: Settings) -> None:
+        self.max_connections = settings.outline_http_max_connections
+        self.max_keepalive_connections = settings.outline_http_max_keepalive_connections
+        self.keepalive_expiry = settings.outline_http_keepalive_expiry_seconds
+        self.http2 = settings.outline_http2
+        self.timeout = settings.outline_http_timeout_seconds
+
+    def _create_http_client(self, api_url: str, api_key: str) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+        return httpx.AsyncClient(
+            base_url=api_url,
+            timeout=self.timeout,
+            headers={"Authorization": f"Bearer {api_key}"},
+            limits=limits,
+            http2=self.http2,
+        )
+
+    def client_for(self, api_url: str, api_key: str, timeout: float | None = None) -> OutlineClient:
+        key = (api_url.rstrip("/"), api_key)
+        http_client = self._clients.get(key)
+        if http_client is None or http_client.is_closed:
+            http_client = self._create_http_client(*key)
+            self._clients[key] = http_client
+            OUTLINE_HTTP_CLIENTS.set(len(self._clients))
+            OUTLINE_HTTP_POOL_LIMIT.labels(node=node_label(key[0])).set(self.max_connections)
+        return OutlineClient(key[0], api_key, timeout=timeout or self.timeout, http_client=http_client)
+
+    async def discard(self, api_url: str | None, api_key: str | None) -> None:
+        if not api_url or not api_key:
+            return
+        http_client = self._clients.pop((api_url.rstrip("/"), api_key), None)
+        OUTLINE_HTTP_CLIENTS.set(len(self._clients))
+        if http_client is not None:
+            await http_client.aclose()
+
+    async def aclose(self) -> None:
+        clients = list(self._clients.values())
+        self._clients.clear()
+        OUTLINE_HTTP_CLIENTS.set(0)
+        for http_client in clients:
+            await http_client.aclose()
+
+
+outline_clients = OutlineClientRegistry()
+
+
+def get_outline_client(api_url: str, api_key: str, client_class: type[OutlineClient] = OutlineClient) -> OutlineClient:
+    if client_class is OutlineClient:
+        return outline_clients.client_for(api_url, api_key)
+    return client_class(api_url, api_key)
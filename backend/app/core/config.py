@@ -1,4 +1,5 @@
 from functools import lru_cache
+from typing import Literal
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -16,9 +17,74 @@ class Settings(BaseSettings):
     outline_healthcheck_interval_seconds: int = Field(default=60, alias="OUTLINE_HEALTHCHECK_INTERVAL_SECONDS")
     outline_healthcheck_timeout_seconds: float = Field(default=5.0, alias="OUTLINE_HEALTHCHECK_TIMEOUT_SECONDS")
     outline_healthcheck_degraded_threshold_ms: int = Field(default=1500, alias="OUTLINE_HEALTHCHECK_DEGRADED_THRESHOLD_MS")
+    outline_healthcheck_concurrency: int = Field(default=32, alias="OUTLINE_HEALTHCHECK_CONCURRENCY")
+    outline_healthcheck_cycle_deadline_seconds: float = Field(default=30.0, alias="OUTLINE_HEALTHCHECK_CYCLE_DEADLINE_SECONDS")
+    outline_healthcheck_probe: Literal["server", "tcp", "access_keys"] = Field(default="server", alias="OUTLINE_HEALTHCHECK_PROBE")
+    outline_healthcheck_jitter_ratio: float = Field(default=0.1, alias="OUTLINE_HEALTHCHECK_JITTER_RATIO")
+    outline_healthcheck_backoff_min_seconds: float = Field(default=5.0, alias="OUTLINE_HEALTHCHECK_BACKOFF_MIN_SECONDS")
+    outline_healthcheck_backoff_max_seconds: float = Field(default=60.0, alias="OUTLINE_HEALTHCHECK_BACKOFF_MAX_SECONDS")
+    outline_healthcheck_request_poll_seconds: float = Field(default=2.0, alias="OUTLINE_HEALTHCHECK_REQUEST_POLL_SECONDS")
+    outline_healthcheck_min_tick_seconds: float = Field(default=0.5, alias="OUTLINE_HEALTHCHECK_MIN_TICK_SECONDS")
+    outline_health_window_size: int = Field(default=20, alias="OUTLINE_HEALTH_WINDOW_SIZE")
+    outline_health_ewma_alpha: float = Field(default=0.3, alias="OUTLINE_HEALTH_EWMA_ALPHA")
+    outline_health_down_after_failures: int = Field(default=3, alias="OUTLINE_HEALTH_DOWN_AFTER_FAILURES")
+    outline_health_down_error_rate: float = Field(default=0.5, alias="OUTLINE_HEALTH_DOWN_ERROR_RATE")
+    outline_health_degraded_error_rate: float = Field(default=0.2, alias="OUTLINE_HEALTH_DEGRADED_ERROR_RATE")
+    outline_health_history_bucket_seconds: int = Field(default=300, alias="OUTLINE_HEALTH_HISTORY_BUCKET_SECONDS")
+    outline_health_history_retention_days: int = Field(default=7, alias="OUTLINE_HEALTH_HISTORY_RETENTION_DAYS")
+    outline_key_pool_size: int = Field(default=0, alias="OUTLINE_KEY_POOL_SIZE")
+    outline_key_pool_refill_interval_seconds: int = Field(default=30, alias="OUTLINE_KEY_POOL_REFILL_INTERVAL_SECONDS")
+    outline_key_pool_refill_batch: int = Field(default=10, alias="OUTLINE_KEY_POOL_REFILL_BATCH")
+    leader_election: str = Field(default="auto", alias="LEADER_ELECTION")
+    leader_lease_seconds: float = Field(default=30.0, alias="LEADER_LEASE_SECONDS")
+    leader_check_interval_seconds: float = Field(default=10.0, alias="LEADER_CHECK_INTERVAL_SECONDS")
+    outline_reconcile_interval_seconds: int = Field(default=3600, alias="OUTLINE_RECONCILE_INTERVAL_SECONDS")
+    outline_reconcile_concurrency: int = Field(default=4, alias="OUTLINE_RECONCILE_CONCURRENCY")
+    outline_reconcile_timeout_seconds: float = Field(default=60.0, alias="OUTLINE_RECONCILE_TIMEOUT_SECONDS")
+    outline_reconcile_grace_seconds: float = Field(default=300.0, alias="OUTLINE_RECONCILE_GRACE_SECONDS")
+    outline_reconcile_max_deletes: int = Field(default=1000, alias="OUTLINE_RECONCILE_MAX_DELETES")
+    outline_key_max_age_seconds: int = Field(default=0, alias="OUTLINE_KEY_MAX_AGE_SECONDS")
+    outline_node_selection_strategy: str = Field(default="p2c", alias="OUTLINE_NODE_SELECTION_STRATEGY")
+    outline_node_default_capacity: int = Field(default=1000, alias="OUTLINE_NODE_DEFAULT_CAPACITY")
+    outline_load_snapshot_ttl_seconds: float = Field(default=30.0, alias="OUTLINE_LOAD_SNAPSHOT_TTL_SECONDS")
+    outline_topology_ttl_seconds: float = Field(default=30.0, alias="OUTLINE_TOPOLOGY_TTL_SECONDS")
+    outline_http_timeout_seconds: float = Field(default=5.0, alias="OUTLINE_HTTP_TIMEOUT_SECONDS")
+    outline_http_max_connections: int = Field(default=20, alias="OUTLINE_HTTP_MAX_CONNECTIONS")
+    outline_http_max_keepalive_connections: int = Field(default=10, alias="OUTLINE_HTTP_MAX_KEEPALIVE_CONNECTIONS")
+    outline_http_keepalive_expiry_seconds: float = Field(default=30.0, alias="OUTLINE_HTTP_KEEPALIVE_EXPIRY_SECONDS")
+    outline_http2: bool = Field(default=False, alias="OUTLINE_HTTP2")
+    entitlement_cache_ttl_seconds: float = Field(default=30.0, alias="ENTITLEMENT_CACHE_TTL_SECONDS")
+    entitlement_cache_max_entries: int = Field(default=100_000, alias="ENTITLEMENT_CACHE_MAX_ENTRIES")
+    admission_max_concurrency: int = Field(default=64, alias="ADMISSION_MAX_CONCURRENCY")
+    admission_max_queue: int = Field(default=1000, alias="ADMISSION_MAX_QUEUE")
+    admission_queue_timeout_seconds: float = Field(default=2.0, alias="ADMISSION_QUEUE_TIMEOUT_SECONDS")
+    admission_retry_after_seconds: float = Field(default=2.0, alias="ADMISSION_RETRY_AFTER_SECONDS")
+    admission_device_rate_per_second: float = Field(default=0.5, alias="ADMISSION_DEVICE_RATE_PER_SECOND")
+    admission_device_burst: float = Field(default=5.0, alias="ADMISSION_DEVICE_BURST")
+    admission_max_tracked_devices: int = Field(default=100000, alias="ADMISSION_MAX_TRACKED_DEVICES")
+    usage_flush_interval_seconds: float = Field(default=5.0, alias="USAGE_FLUSH_INTERVAL_SECONDS")
+    usage_flush_max_pending: int = Field(default=5000, alias="USAGE_FLUSH_MAX_PENDING")
+    usage_batch_max_items: int = Field(default=10_000, alias="USAGE_BATCH_MAX_ITEMS")
+    usage_batch_max_bytes: int = Field(default=4 * 1024 * 1024, alias="USAGE_BATCH_MAX_BYTES")
     httvps_gateway_url: str = Field(default="https://localhost:8443/ws", alias="HTTVPS_GATEWAY_URL")
     httvps_session_ttl_seconds: int = Field(default=600, alias="HTTVPS_SESSION_TTL_SECONDS")
     httvps_max_streams: int = Field(default=8, alias="HTTVPS_MAX_STREAMS")
+    httvps_session_store_max_entries: int = Field(default=0, alias="HTTVPS_SESSION_STORE_MAX_ENTRIES")
+    httvps_session_store: str = Field(default="memory", alias="HTTVPS_SESSION_STORE")
+    httvps_session_cache_ttl_seconds: float = Field(default=5.0, alias="HTTVPS_SESSION_CACHE_TTL_SECONDS")
+    httvps_session_token_mode: str = Field(default="opaque", alias="HTTVPS_SESSION_TOKEN_MODE")
+    httvps_session_token_key: str | None = Field(default=None, alias="HTTVPS_SESSION_TOKEN_KEY")
+    httvps_revocation_refresh_seconds: float = Field(default=2.0, alias="HTTVPS_REVOCATION_REFRESH_SECONDS")
+    httvps_session_coalesce: bool = Field(default=True, alias="HTTVPS_SESSION_COALESCE")
+    httvps_validate_batch_max_tokens: int = Field(default=500, alias="HTTVPS_VALIDATE_BATCH_MAX_TOKENS")
+    httvps_session_sweep_interval_seconds: float = Field(default=30.0, alias="HTTVPS_SESSION_SWEEP_INTERVAL_SECONDS")
+    metrics_http_buckets: str = Field(
+        default="0.001,0.0025,0.005,0.0075,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10",
+        alias="METRICS_HTTP_BUCKETS",
+    )
+    db_slow_query_threshold_ms: float = Field(default=200.0, alias="DB_SLOW_QUERY_THRESHOLD_MS")
+    db_request_query_warn_count: int = Field(default=50, alias="DB_REQUEST_QUERY_WARN_COUNT")
+    db_request_duration_warn_ms: float = Field(default=500.0, alias="DB_REQUEST_DURATION_WARN_MS")
     gateway_internal_secret: str = Field(default="", alias="BACKEND_GATEWAY_SECRET")
     outline_default_pool_code: str | None = Field(default=None, alias="OUTLINE_DEFAULT_POOL_CODE")
 
@@ -1,10 +1,55 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+import logging
+import time
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from app.core.config import get_settings
+from app.core.metrics import DB_QUERY_DURATION
+from app.core.tracing import get_request_id, record_query
 from app.db import Base
 
+logger = logging.getLogger(__name__)
+
+QUERY_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH"}
+
+
+def query_operation(statement: str) -> str:
+    keyword = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    return keyword.lower() if keyword in QUERY_OPERATIONS else "other"
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    started = conn.info.get("query_started_at")
+    if not started:
+        return
+    duration = time.perf_counter() - started.pop()
+    DB_QUERY_DURATION.labels(operation=query_operation(statement)).observe(duration)
+    record_query(duration)
+    if duration * 1000 >= get_settings().db_slow_query_threshold_ms:
+        logger.warning("slow_query %.1fms request_id=%s: %s", duration * 1000, get_request_id(), statement[:1000])
+
+
+def handle_error(exception_context) -> None:
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_started_at"):
+        connection.info["query_started_at"].pop()
+
+
+def instrument_engine(engine: AsyncEngine) -> AsyncEngine:
+    sync_engine = engine.sync_engine
+    if not event.contains(sync_engine, "before_cursor_execute", before_cursor_execute):
+        event.listen(sync_engine, "before_cursor_execute", before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", after_cursor_execute)
+        event.listen(sync_engine, "handle_error", handle_error)
+    return engine
+
+
 settings = get_settings()
-engine = create_async_engine(settings.db_dsn, echo=settings.debug, future=True)
+engine = instrument_engine(create_async_engine(settings.db_dsn, echo=settings.debug, future=True))
 SessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
 
@@ -13,4 +58,4 @@ async def get_session() -> AsyncSession:
         yield session
 
 
-__all__ = ["engine", "SessionLocal", "Base", "get_session"]
+__all__ = ["engine", "SessionLocal", "Base", "get_session", "instrument_engine"]
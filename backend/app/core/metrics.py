@@ -1,8 +1,18 @@
+import os
 import time
-from prometheus_client import Counter, Histogram, Gauge, CONTENT_TYPE_LATEST, generate_latest
+from prometheus_client import CollectorRegistry, Counter, Histogram, Gauge, CONTENT_TYPE_LATEST, REGISTRY, generate_latest, multiprocess
 from fastapi import APIRouter
 from starlette.responses import Response
 from starlette.types import ASGIApp, Receive, Scope, Send
+from app.core.config import get_settings
+
+UNMATCHED_ROUTE = "__unmatched__"
+
+
+def parse_buckets(value: str) -> tuple[float, ...]:
+    buckets = sorted({float(item) for item in value.split(",") if item.strip()})
+    return (*buckets, float("inf"))
+
 
 REQUESTS_TOTAL = Counter(
     "backend_http_requests_total",
@@ -13,16 +23,144 @@ REQUEST_DURATION = Histogram(
     "backend_http_request_duration_seconds",
     "Backend HTTP request latency in seconds",
     ["method", "path"],
+    buckets=parse_buckets(get_settings().metrics_http_buckets),
 )
 IN_PROGRESS = Gauge(
     "backend_http_requests_in_progress",
     "Number of backend HTTP requests currently in progress",
+    multiprocess_mode="livesum",
 )
 REQUEST_EXCEPTIONS = Counter(
     "backend_http_request_exceptions_total",
     "Exceptions raised while handling backend HTTP requests",
     ["path"],
 )
+DB_QUERY_DURATION = Histogram(
+    "backend_db_query_duration_seconds",
+    "Duration of individual SQL statements in seconds",
+    ["operation"],
+    buckets=parse_buckets(get_settings().metrics_http_buckets),
+)
+DB_REQUEST_QUERIES = Histogram(
+    "backend_db_queries_per_request",
+    "Number of SQL statements executed per HTTP request",
+    ["path"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144, float("inf")),
+)
+DB_REQUEST_DURATION = Histogram(
+    "backend_db_time_per_request_seconds",
+    "Cumulative SQL time spent per HTTP request in seconds",
+    ["path"],
+    buckets=parse_buckets(get_settings().metrics_http_buckets),
+)
+OUTLINE_PROBE_PHASE_DURATION = Histogram(
+    "backend_outline_probe_phase_duration_seconds",
+    "Outline health probe duration broken down by connection phase",
+    ["node", "phase"],
+)
+OUTLINE_RECONCILE_DURATION = Histogram(
+    "backend_outline_reconcile_duration_seconds",
+    "Time spent listing and cleaning up access keys per Outline node",
+    ["node"],
+)
+OUTLINE_RECONCILE_DIFF = Gauge(
+    "backend_outline_reconcile_diff_keys",
+    "Access keys found out of sync with the database in the last reconciliation per Outline node",
+    ["node", "kind"],
+    multiprocess_mode="livesum",
+)
+OUTLINE_RECONCILE_ACTIONS = Counter(
+    "backend_outline_reconcile_actions_total",
+    "Corrective actions taken by the Outline key reconciler",
+    ["node", "action"],
+)
+OUTLINE_HTTP_CLIENTS = Gauge(
+    "backend_outline_http_clients",
+    "Number of pooled Outline API clients held by the registry",
+    multiprocess_mode="livesum",
+)
+OUTLINE_HTTP_POOL_LIMIT = Gauge(
+    "backend_outline_http_pool_max_connections",
+    "Connection limit of the pooled Outline API client per node",
+    ["node"],
+    multiprocess_mode="livesum",
+)
+OUTLINE_HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "backend_outline_http_requests_in_flight",
+    "Outline API requests currently occupying a pooled connection per node",
+    ["node"],
+    multiprocess_mode="livesum",
+)
+ENTITLEMENT_CACHE_REQUESTS = Counter(
+    "backend_entitlement_cache_requests_total",
+    "Device entitlement cache lookups by result",
+    ["result"],
+)
+ENTITLEMENT_CACHE_SIZE = Gauge(
+    "backend_entitlement_cache_entries",
+    "Number of cached device entitlements",
+    multiprocess_mode="livesum",
+)
+SESSION_STORE_ENTRIES = Gauge(
+    "backend_httvps_session_store_entries",
+    "Number of HTTVPS session descriptors held in memory",
+    multiprocess_mode="livesum",
+)
+SESSION_STORE_EVICTIONS = Counter(
+    "backend_httvps_session_store_evictions_total",
+    "HTTVPS session descriptors removed from memory by reason",
+    ["reason"],
+)
+SESSION_STORE_CACHE_REQUESTS = Counter(
+    "backend_httvps_session_cache_requests_total",
+    "Local read-through cache lookups for shared HTTVPS session descriptors",
+    ["result"],
+)
+SESSION_REQUESTS_COALESCED = Counter(
+    "backend_httvps_session_requests_coalesced_total",
+    "HTTVPS session requests served by an already in-flight request for the same device",
+)
+ADMISSION_DECISIONS = Counter(
+    "backend_admission_decisions_total",
+    "Admission control decisions for session issuance endpoints",
+    ["route", "result"],
+)
+ADMISSION_QUEUE_WAIT = Histogram(
+    "backend_admission_queue_wait_seconds",
+    "Time admitted requests waited for a concurrency slot",
+    ["route"],
+)
+ADMISSION_IN_FLIGHT = Gauge(
+    "backend_admission_in_flight",
+    "Requests currently holding an admission slot",
+    multiprocess_mode="livesum",
+)
+ADMISSION_WAITING = Gauge(
+    "backend_admission_waiting",
+    "Requests currently queued for an admission slot",
+    multiprocess_mode="livesum",
+)
+LEADER_STATUS = Gauge(
+    "backend_leader",
+    "Whether this process currently holds the background-work leadership",
+    ["name"],
+    multiprocess_mode="livesum",
+)
+USAGE_PENDING_SESSIONS = Gauge(
+    "backend_usage_pending_sessions",
+    "Sessions with usage deltas waiting to be flushed",
+    multiprocess_mode="livesum",
+)
+USAGE_FLUSH_DURATION = Histogram(
+    "backend_usage_flush_duration_seconds",
+    "Duration of bulk usage flushes in seconds",
+)
+
+
+def route_label(scope: Scope) -> str:
+    route = scope.get("route")
+    path_format = getattr(route, "path_format", None) or getattr(route, "path", None)
+    return path_format or UNMATCHED_ROUTE
 
 
 class MetricsMiddleware:
@@ -34,7 +172,6 @@ class MetricsMiddleware:
             await self.app(scope, receive, send)
             return
         method = scope.get("method", "")
-        path = scope.get("path", "")
         start = time.perf_counter()
         status_code: dict[str, int] = {}
         IN_PROGRESS.inc()
@@ -47,23 +184,63 @@ class MetricsMiddleware:
         try:
             await self.app(scope, receive, send_wrapper)
         except Exception:
-            REQUEST_EXCEPTIONS.labels(path=path).inc()
+            REQUEST_EXCEPTIONS.labels(path=route_label(scope)).inc()
             status_code["value"] = status_code.get("value", 500)
             raise
         finally:
             duration = time.perf_counter() - start
             code = str(status_code.get("value", 500))
+            path = route_label(scope)
             REQUESTS_TOTAL.labels(method=method, path=path, status=code).inc()
             REQUEST_DURATION.labels(method=method, path=path).observe(duration)
             IN_PROGRESS.dec()
 
 
+def multiprocess_dir() -> str | None:
+    return os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+
+
+def process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def cleanup_dead_process_files(path: str | None = None) -> list[int]:
+    path = path or multiprocess_dir()
+    if not path or not os.path.isdir(path):
+        return []
+    dead = set()
+    for name in os.listdir(path):
+        stem, ext = os.path.splitext(name)
+        pid = stem.rsplit("_", 1)[-1]
+        if ext != ".db" or not pid.isdigit():
+            continue
+        if int(pid) != os.getpid() and not process_alive(int(pid)):
+            dead.add(int(pid))
+    for pid in dead:
+        multiprocess.mark_process_dead(pid, path)
+    return sorted(dead)
+
+
+def collect_metrics() -> bytes:
+    path = multiprocess_dir()
+    if not path:
+        return generate_latest(REGISTRY)
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, path=path)
+    return generate_latest(registry)
+
+
 def setup_metrics_router() -> APIRouter:
     router = APIRouter()
 
     @router.get("/metrics")
     async def metrics() -> Response:
-        data = generate_latest()
-        return Response(content=data, media_type=CONTENT_TYPE_LATEST)
+        return Response(content=collect_metrics(), media_type=CONTENT_TYPE_LATEST)
 
     return router
@@ -1,5 +1,10 @@
+import base64
+import hashlib
+import json
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 import jwt
+from cryptography.fernet import Fernet, InvalidToken
 from app.core.config import Settings
 
 
@@ -11,3 +16,26 @@ def create_token(payload: dict, settings: Settings) -> str:
 
 def verify_token(token: str, settings: Settings) -> dict:
     return jwt.decode(token, settings.secret_key, algorithms=[settings.jwt_algorithm])
+
+
+@lru_cache(maxsize=8)
+def build_fernet(secret: str) -> Fernet:
+    digest = hashlib.sha256(f"httvps-session-token:{secret}".encode()).digest()
+    return Fernet(base64.urlsafe_b64encode(digest))
+
+
+def session_token_cipher(settings: Settings) -> Fernet:
+    return build_fernet(settings.httvps_session_token_key or settings.secret_key)
+
+
+def seal_token(payload: dict, settings: Settings) -> str:
+    data = json.dumps(payload, separators=(",", ":")).encode()
+    return session_token_cipher(settings).encrypt(data).decode()
+
+
+def unseal_token(token: str, settings: Settings) -> dict | None:
+    try:
+        data = session_token_cipher(settings).decrypt(token.encode())
+    except (InvalidToken, ValueError):
+        return None
+    return json.loads(data)
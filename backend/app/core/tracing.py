@@ -1,8 +1,25 @@
 import contextvars
+import logging
 import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterator
 from starlette.types import ASGIApp, Scope, Receive, Send
+from app.core.config import get_settings
+from app.core.metrics import DB_REQUEST_DURATION, DB_REQUEST_QUERIES, route_label
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    duration: float = 0.0
+    parent: "QueryStats | None" = None
+
+
+logger = logging.getLogger(__name__)
 
 request_id_ctx_var: contextvars.ContextVar[str | None] = contextvars.ContextVar("request_id", default=None)
+query_stats_ctx_var: contextvars.ContextVar[QueryStats | None] = contextvars.ContextVar("query_stats", default=None)
 
 
 def set_request_id(request_id: str) -> None:
@@ -13,6 +30,39 @@ def get_request_id() -> str | None:
     return request_id_ctx_var.get()
 
 
+def record_query(duration: float) -> None:
+    stats = query_stats_ctx_var.get()
+    while stats is not None:
+        stats.count += 1
+        stats.duration += duration
+        stats = stats.parent
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    stats = QueryStats(parent=query_stats_ctx_var.get())
+    token = query_stats_ctx_var.set(stats)
+    try:
+        yield stats
+    finally:
+        query_stats_ctx_var.reset(token)
+
+
+def observe_request_queries(scope: Scope, stats: QueryStats) -> None:
+    path = route_label(scope)
+    DB_REQUEST_QUERIES.labels(path=path).observe(stats.count)
+    DB_REQUEST_DURATION.labels(path=path).observe(stats.duration)
+    settings = get_settings()
+    if stats.count > settings.db_request_query_warn_count or stats.duration * 1000 > settings.db_request_duration_warn_ms:
+        logger.warning(
+            "db_heavy_request %s %s: %d queries, %.1fms",
+            scope.get("method", ""),
+            path,
+            stats.count,
+            stats.duration * 1000,
+        )
+
+
 class RequestContextMiddleware:
     def __init__(self, app: ASGIApp):
         self.app = app
@@ -31,7 +81,9 @@ class RequestContextMiddleware:
                 message = {**message, "headers": headers}
             await send(message)
 
-        try:
-            await self.app(scope, receive, send_wrapper)
-        finally:
-            request_id_ctx_var.reset(token)
+        with track_queries() as stats:
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                observe_request_queries(scope, stats)
+                request_id_ctx_var.reset(token)
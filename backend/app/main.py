@@ -3,11 +3,20 @@ from contextlib import suppress, asynccontextmanager
 from fastapi import FastAPI
 from app.api.v1 import router as v1_router
 from app.api import internal as internal_router
+from app.clients.outline_client import outline_clients
 from app.core.config import get_settings
 from app.core.logging import configure_logging
-from app.core.metrics import MetricsMiddleware, setup_metrics_router
+from app.core.metrics import MetricsMiddleware, cleanup_dead_process_files, setup_metrics_router
 from app.core.tracing import RequestContextMiddleware
+from app.services.admission_service import admission
+from app.services.auth_service import entitlement_cache
+from app.services.httvps_session_service import configure_descriptor_backend, start_session_store_sweeper
+from app.services.leader_election_service import background_leader
+from app.services.outline_health_history_service import health_history
 from app.services.outline_health_service import start_outline_healthcheck_background
+from app.services.outline_key_pool_service import start_outline_key_pool_background
+from app.services.outline_reconcile_service import start_outline_reconcile_background
+from app.services.sessions_service import drain_usage, start_usage_flush_background
 
 settings = get_settings()
 configure_logging("DEBUG" if settings.debug else "INFO")
@@ -15,14 +24,37 @@ configure_logging("DEBUG" if settings.debug else "INFO")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    cleanup_dead_process_files()
+    outline_clients.configure(settings)
+    app.state.outline_clients = outline_clients
+    entitlement_cache.configure(settings)
+    admission.configure(settings)
+    health_history.configure(settings)
+    configure_descriptor_backend(settings)
     task = await start_outline_healthcheck_background(settings)
     if task:
         app.state.outline_healthcheck_task = task
+    key_pool_task = await start_outline_key_pool_background(settings)
+    if key_pool_task:
+        app.state.outline_key_pool_task = key_pool_task
+    reconcile_task = await start_outline_reconcile_background(settings)
+    if reconcile_task:
+        app.state.outline_reconcile_task = reconcile_task
+    usage_task = await start_usage_flush_background(settings)
+    if usage_task:
+        app.state.usage_flush_task = usage_task
+    sweeper_task = await start_session_store_sweeper(settings)
+    if sweeper_task:
+        app.state.session_store_sweeper_task = sweeper_task
     yield
-    if task:
-        task.cancel()
-        with suppress(asyncio.CancelledError):
-            await task
+    for background_task in (task, key_pool_task, reconcile_task, usage_task, sweeper_task):
+        if background_task:
+            background_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await background_task
+    await background_leader.release()
+    await drain_usage()
+    await outline_clients.aclose()
 
 
 app = FastAPI(lifespan=lifespan)
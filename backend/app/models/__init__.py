@@ -12,6 +12,10 @@ from app.models.outline_pool import OutlinePool
 from app.models.outline_pool_node import OutlinePoolNode
 from app.models.outline_pool_region import OutlinePoolRegion
 from app.models.admin_audit_log import AdminAuditLog
+from app.models.httvps_session_descriptor import HttvpsSessionDescriptor
+from app.models.httvps_revoked_session import HttvpsRevokedSession
+from app.models.outline_node_health_history import OutlineNodeHealthHistory
+from app.models.leader_lease import LeaderLease
 
 __all__ = [
     "Base",
@@ -29,4 +33,8 @@ __all__ = [
     "OutlinePoolNode",
     "OutlinePoolRegion",
     "AdminAuditLog",
+    "HttvpsSessionDescriptor",
+    "HttvpsRevokedSession",
+    "OutlineNodeHealthHistory",
+    "LeaderLease",
 ]
@@ -0,0 +1,12 @@
+from datetime import datetime
+from sqlalchemy import DateTime, JSON, String
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db import Base
+
+
+class HttvpsSessionDescriptor(Base):
+    __tablename__ = "httvps_session_descriptors"
+
+    token: Mapped[str] = mapped_column(String(128), primary_key=True)
+    payload: Mapped[dict] = mapped_column(JSON(), nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)
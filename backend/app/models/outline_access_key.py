@@ -1,14 +1,25 @@
 from datetime import datetime
-from sqlalchemy import Boolean, DateTime, ForeignKey, Integer, String, func
+from sqlalchemy import Boolean, DateTime, ForeignKey, Integer, String, func, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db import Base
 
 
 class OutlineAccessKey(Base):
     __tablename__ = "outline_access_keys"
+    __table_args__ = (
+        Index("ix_outline_access_keys_device_revoked_created", "device_id", "revoked", "created_at"),
+        Index("ix_outline_access_keys_node_revoked", "outline_node_id", "revoked"),
+        Index(
+            "ix_outline_access_keys_pooled",
+            "outline_node_id",
+            "id",
+            postgresql_where=text("device_id IS NULL AND revoked = false"),
+            sqlite_where=text("device_id IS NULL AND revoked = 0"),
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    device_id: Mapped[int] = mapped_column(ForeignKey("devices.id", ondelete="CASCADE"), nullable=False)
+    device_id: Mapped[int | None] = mapped_column(ForeignKey("devices.id", ondelete="CASCADE"))
     outline_node_id: Mapped[int] = mapped_column(ForeignKey("outline_nodes.id", ondelete="CASCADE"), nullable=False)
     access_key_id: Mapped[str] = mapped_column(String(128), nullable=False)
     password: Mapped[str] = mapped_column(String(255), nullable=False)
@@ -17,5 +28,6 @@ class OutlineAccessKey(Base):
     access_url: Mapped[str | None] = mapped_column(String(255))
     revoked: Mapped[bool] = mapped_column(Boolean, nullable=False, server_default="false", default=False)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    assigned_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
     device: Mapped["Device"] = relationship("Device")
     outline_node: Mapped["OutlineNode"] = relationship("OutlineNode", back_populates="access_keys")
@@ -1,11 +1,14 @@
 from datetime import datetime
-from sqlalchemy import Boolean, DateTime, ForeignKey, Integer, String, func
+from sqlalchemy import Boolean, DateTime, Float, ForeignKey, Integer, String, func, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db import Base
 
 
 class OutlineNode(Base):
     __tablename__ = "outline_nodes"
+    __table_args__ = (
+        Index("ix_outline_nodes_region_active_deleted", "region_id", "is_active", "is_deleted"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     name: Mapped[str | None] = mapped_column(String(100))
@@ -18,13 +21,19 @@ class OutlineNode(Base):
     api_key: Mapped[str | None] = mapped_column(String(255))
     tag: Mapped[str | None] = mapped_column(String(50))
     priority: Mapped[int | None] = mapped_column(Integer)
+    key_pool_size: Mapped[int | None] = mapped_column(Integer)
+    capacity: Mapped[int | None] = mapped_column(Integer)
     is_active: Mapped[bool] = mapped_column(Boolean, nullable=False, server_default="true", default=True)
     is_deleted: Mapped[bool] = mapped_column(Boolean, nullable=False, server_default="false", default=False)
     last_heartbeat_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
     last_check_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    health_check_requested_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
     last_check_status: Mapped[str | None] = mapped_column(String(20), server_default="unknown", default="unknown")
     last_error: Mapped[str | None] = mapped_column(String(255))
     recent_latency_ms: Mapped[int | None] = mapped_column(Integer)
+    latency_p50_ms: Mapped[float | None] = mapped_column(Float)
+    latency_p95_ms: Mapped[float | None] = mapped_column(Float)
+    error_rate: Mapped[float | None] = mapped_column(Float)
     region: Mapped["Region"] = relationship("Region", back_populates="outline_nodes")
     sessions: Mapped[list["Session"]] = relationship("Session", back_populates="outline_node")
     access_keys: Mapped[list["OutlineAccessKey"]] = relationship("OutlineAccessKey", back_populates="outline_node")
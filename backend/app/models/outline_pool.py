@@ -11,5 +11,6 @@ class OutlinePool(Base):
     name: Mapped[str] = mapped_column(String(255), nullable=False)
     is_active: Mapped[bool] = mapped_column(Boolean, nullable=False, server_default="true", default=True)
     is_default: Mapped[bool] = mapped_column(Boolean, nullable=False, server_default="false", default=False)
+    key_pool_size: Mapped[int | None] = mapped_column(Integer)
     nodes: Mapped[list["OutlinePoolNode"]] = relationship("OutlinePoolNode", back_populates="pool")
     regions: Mapped[list["OutlinePoolRegion"]] = relationship("OutlinePoolRegion", back_populates="pool")
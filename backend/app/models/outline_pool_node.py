@@ -1,10 +1,13 @@
-from sqlalchemy import Boolean, ForeignKey, Integer
+from sqlalchemy import Boolean, ForeignKey, Integer, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db import Base
 
 
 class OutlinePoolNode(Base):
     __tablename__ = "outline_pool_nodes"
+    __table_args__ = (
+        Index("ix_outline_pool_nodes_pool_active", "pool_id", "is_active"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     pool_id: Mapped[int] = mapped_column(ForeignKey("outline_pools.id", ondelete="CASCADE"), nullable=False)
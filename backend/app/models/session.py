@@ -1,11 +1,14 @@
 from datetime import datetime
-from sqlalchemy import DateTime, ForeignKey, Integer, String, BigInteger, func
+from sqlalchemy import DateTime, ForeignKey, Integer, String, BigInteger, func, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db import Base
 
 
 class Session(Base):
     __tablename__ = "sessions"
+    __table_args__ = (
+        Index("ix_sessions_device_id", "device_id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     device_id: Mapped[int] = mapped_column(ForeignKey("devices.id", ondelete="CASCADE"), nullable=False)
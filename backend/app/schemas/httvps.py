@@ -25,3 +25,27 @@ class ValidateSessionResponse(BaseModel):
     device_id: str
     max_streams: int
     outline: dict
+
+
+class ValidateSessionBatchRequest(BaseModel):
+    session_tokens: list[str]
+
+
+class ValidateSessionBatchItem(BaseModel):
+    index: int
+    valid: bool
+    session: ValidateSessionResponse | None = None
+    reason: str | None = None
+
+
+class ValidateSessionBatchResponse(BaseModel):
+    valid: int
+    results: list[ValidateSessionBatchItem]
+
+
+class RevokeSessionRequest(BaseModel):
+    session_token: str
+
+
+class RevokeSessionResponse(BaseModel):
+    revoked: bool
@@ -42,7 +42,22 @@ class OutlineNodeStatus(BaseModel):
     last_check_at: datetime | None = None
     recent_latency_ms: int | None = None
     last_error: str | None = None
+    capacity: int | None = None
     active_access_keys: int | None = None
+    latency_p50_ms: float | None = None
+    latency_p95_ms: float | None = None
+    error_rate: float | None = None
+
+
+class OutlineNodeHealthPoint(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    bucket_start: datetime
+    samples: int
+    errors: int
+    ewma_ms: float | None = None
+    p50_ms: float | None = None
+    p95_ms: float | None = None
 
 
 class OutlineNodeCreate(BaseModel):
@@ -56,6 +71,8 @@ class OutlineNodeCreate(BaseModel):
     api_key: str | None = None
     tag: str | None = None
     priority: int | None = None
+    key_pool_size: int | None = None
+    capacity: int | None = None
     is_active: bool = True
 
 
@@ -70,6 +87,8 @@ class OutlineNodeUpdate(BaseModel):
     api_key: str | None = None
     tag: str | None = None
     priority: int | None = None
+    key_pool_size: int | None = None
+    capacity: int | None = None
     is_active: bool | None = None
 
 
@@ -85,6 +104,8 @@ class OutlineNodeInfo(BaseModel):
     api_key: str | None = None
     tag: str | None = None
     priority: int | None = None
+    key_pool_size: int | None = None
+    capacity: int | None = None
     is_active: bool
     is_deleted: bool
 
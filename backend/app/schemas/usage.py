@@ -6,3 +6,14 @@ class UsageReport(BaseModel):
     device_id: str
     bytes_up: int
     bytes_down: int
+
+
+class UsageBatchItemResult(BaseModel):
+    index: int
+    status: str
+    error: str | None = None
+
+
+class UsageBatchResponse(BaseModel):
+    accepted: int
+    results: list[UsageBatchItemResult]
@@ -1,8 +1,10 @@
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
+from app.clients.outline_client import outline_clients
 from app.models.gateway_node import GatewayNode
 from app.models.outline_node import OutlineNode
+from app.services.outline_topology_service import outline_topology
 from app.services.region_service import find_region_by_code
 
 
@@ -47,6 +49,7 @@ async def create_outline_node(session: AsyncSession, data: dict) -> OutlineNode:
     node = OutlineNode(**payload)
     session.add(node)
     await session.commit()
+    outline_topology.invalidate()
     await session.refresh(node)
     await session.refresh(node, attribute_names=["region"])
     return node
@@ -54,6 +57,7 @@ async def create_outline_node(session: AsyncSession, data: dict) -> OutlineNode:
 
 async def update_outline_node(session: AsyncSession, node_id: int, data: dict) -> OutlineNode:
     node = await get_outline_node(session, node_id)
+    previous_api = (node.api_url, node.api_key)
     if "region_code" in data:
         region_value = data.pop("region_code")
         if region_value:
@@ -66,6 +70,9 @@ async def update_outline_node(session: AsyncSession, node_id: int, data: dict) -
     for key, value in data.items():
         setattr(node, key, value)
     await session.commit()
+    outline_topology.invalidate()
+    if previous_api != (node.api_url, node.api_key):
+        await outline_clients.discard(*previous_api)
     await session.refresh(node)
     await session.refresh(node, attribute_names=["region"])
     return node
@@ -76,6 +83,8 @@ async def delete_outline_node(session: AsyncSession, node_id: int) -> None:
     node.is_deleted = True
     node.is_active = False
     await session.commit()
+    outline_topology.invalidate()
+    await outline_clients.discard(node.api_url, node.api_key)
 
 
 async def list_gateway_nodes(session: AsyncSession) -> list[GatewayNode]:
@@ -0,0 +1,108 @@
+import asyncio
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+from app.core.config import Settings
+from app.core.metrics import ADMISSION_DECISIONS, ADMISSION_IN_FLIGHT, ADMISSION_QUEUE_WAIT, ADMISSION_WAITING
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class DeviceRateLimited(AdmissionRejected):
+    pass
+
+
+class AdmissionOverloaded(AdmissionRejected):
+    pass
+
+
+class AdmissionController:
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.max_concurrency = 0
+        self.max_queue = 0
+        self.queue_timeout_seconds = 0.0
+        self.retry_after_seconds = 1.0
+        self.device_rate = 0.0
+        self.device_burst = 1.0
+        self.max_tracked_devices = 0
+        self._semaphore: asyncio.Semaphore | None = None
+        self._waiting = 0
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    def configure(self, settings: Settings) -> None:
+        self.reset()
+        self.max_concurrency = settings.admission_max_concurrency
+        self.max_queue = settings.admission_max_queue
+        self.queue_timeout_seconds = settings.admission_queue_timeout_seconds
+        self.retry_after_seconds = settings.admission_retry_after_seconds
+        self.device_rate = settings.admission_device_rate_per_second
+        self.device_burst = max(settings.admission_device_burst, 1.0)
+        self.max_tracked_devices = settings.admission_max_tracked_devices
+        if self.max_concurrency > 0:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    def take_token(self, device_id: str, now: float | None = None) -> float:
+        if self.device_rate <= 0:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        tokens, updated_at = self._buckets.pop(device_id, (self.device_burst, now))
+        tokens = min(self.device_burst, tokens + (now - updated_at) * self.device_rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / self.device_rate
+        self._buckets[device_id] = (tokens, now)
+        while self.max_tracked_devices > 0 and len(self._buckets) > self.max_tracked_devices:
+            self._buckets.popitem(last=False)
+        return wait
+
+    def check_device(self, route: str, device_id: str) -> None:
+        wait = self.take_token(device_id)
+        if wait > 0:
+            ADMISSION_DECISIONS.labels(route=route, result="rate_limited").inc()
+            raise DeviceRateLimited("rate_limited", wait)
+
+    @asynccontextmanager
+    async def admit(self, route: str, device_id: str | None = None) -> AsyncIterator[None]:
+        if device_id is not None:
+            self.check_device(route, device_id)
+        semaphore = self._semaphore
+        if semaphore is None:
+            ADMISSION_DECISIONS.labels(route=route, result="admitted").inc()
+            yield
+            return
+        if semaphore.locked() and self.max_queue > 0 and self._waiting >= self.max_queue:
+            ADMISSION_DECISIONS.labels(route=route, result="shed_queue_full").inc()
+            raise AdmissionOverloaded("overloaded", self.retry_after_seconds)
+        started = time.monotonic()
+        self._waiting += 1
+        ADMISSION_WAITING.set(self._waiting)
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=self.queue_timeout_seconds or None)
+        except asyncio.TimeoutError:
+            ADMISSION_DECISIONS.labels(route=route, result="shed_timeout").inc()
+            raise AdmissionOverloaded("overloaded", self.retry_after_seconds)
+        finally:
+            self._waiting -= 1
+            ADMISSION_WAITING.set(self._waiting)
+        ADMISSION_QUEUE_WAIT.labels(route=route).observe(time.monotonic() - started)
+        ADMISSION_DECISIONS.labels(route=route, result="admitted").inc()
+        ADMISSION_IN_FLIGHT.inc()
+        try:
+            yield
+        finally:
+            semaphore.release()
+            ADMISSION_IN_FLIGHT.dec()
+
+
+admission = AdmissionController()
@@ -1,20 +1,111 @@
+import time
+from collections import OrderedDict
 from datetime import datetime, timezone
-from sqlalchemy import select
+from itertools import chain
+from sqlalchemy import event, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session as OrmSession
 from app.core.config import Settings
+from app.core.metrics import ENTITLEMENT_CACHE_REQUESTS, ENTITLEMENT_CACHE_SIZE
 from app.core.security import verify_token
 from app.models.device import Device
 from app.models.subscription import Subscription, SubscriptionStatus
 
 
-async def validate_device(session: AsyncSession, device_id: str, token: str, settings: Settings) -> dict:
-    try:
-        payload = verify_token(token, settings)
-    except Exception:
-        return {"allowed": False, "reason": "invalid_token"}
-    token_device_id = payload.get("device_id")
-    if token_device_id and token_device_id != device_id:
-        return {"allowed": False, "reason": "device_mismatch"}
+class EntitlementCache:
+    def __init__(self, max_entries: int = 100_000):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, int, dict]] = OrderedDict()
+        self._devices_by_user: dict[int, set[str]] = {}
+
+    def configure(self, settings: Settings) -> None:
+        self.max_entries = settings.entitlement_cache_max_entries
+
+    def get(self, device_id: str) -> dict | None:
+        entry = self._entries.get(device_id)
+        if entry is None:
+            ENTITLEMENT_CACHE_REQUESTS.labels(result="miss").inc()
+            return None
+        expires_at, _, entitlement = entry
+        if time.monotonic() >= expires_at:
+            self.invalidate(device_id)
+            ENTITLEMENT_CACHE_REQUESTS.labels(result="miss").inc()
+            return None
+        self._entries.move_to_end(device_id)
+        ENTITLEMENT_CACHE_REQUESTS.labels(result="hit").inc()
+        return dict(entitlement)
+
+    def put(self, device_id: str, user_id: int, entitlement: dict, ttl_seconds: float) -> None:
+        if ttl_seconds <= 0 or self.max_entries <= 0:
+            return
+        self.invalidate(device_id)
+        self._entries[device_id] = (time.monotonic() + ttl_seconds, user_id, dict(entitlement))
+        self._devices_by_user.setdefault(user_id, set()).add(device_id)
+        while len(self._entries) > self.max_entries:
+            evicted, (_, evicted_user, _) = self._entries.popitem(last=False)
+            self._forget_user_device(evicted_user, evicted)
+        ENTITLEMENT_CACHE_SIZE.set(len(self._entries))
+
+    def invalidate(self, device_id: str) -> None:
+        entry = self._entries.pop(device_id, None)
+        if entry is not None:
+            self._forget_user_device(entry[1], device_id)
+            ENTITLEMENT_CACHE_SIZE.set(len(self._entries))
+
+    def invalidate_user(self, user_id: int) -> None:
+        for device_id in list(self._devices_by_user.get(user_id, ())):
+            self.invalidate(device_id)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._devices_by_user.clear()
+        ENTITLEMENT_CACHE_SIZE.set(0)
+
+    def _forget_user_device(self, user_id: int, device_id: str) -> None:
+        devices = self._devices_by_user.get(user_id)
+        if devices is not None:
+            devices.discard(device_id)
+            if not devices:
+                self._devices_by_user.pop(user_id, None)
+
+
+entitlement_cache = EntitlementCache()
+
+
+@event.listens_for(OrmSession, "after_flush")
+def collect_entitlement_changes(session: OrmSession, flush_context) -> None:
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, Device):
+            session.info.setdefault("entitlement_devices", set()).add(obj.device_id)
+        elif isinstance(obj, Subscription):
+            session.info.setdefault("entitlement_users", set()).add(obj.user_id)
+
+
+@event.listens_for(OrmSession, "after_commit")
+def apply_entitlement_changes(session: OrmSession) -> None:
+    for device_id in session.info.pop("entitlement_devices", ()):
+        entitlement_cache.invalidate(device_id)
+    for user_id in session.info.pop("entitlement_users", ()):
+        entitlement_cache.invalidate_user(user_id)
+
+
+@event.listens_for(OrmSession, "after_rollback")
+def discard_entitlement_changes(session: OrmSession) -> None:
+    session.info.pop("entitlement_devices", None)
+    session.info.pop("entitlement_users", None)
+
+
+def entitlement_ttl(subscription: Subscription | None, now: datetime, settings: Settings) -> float:
+    ttl = settings.entitlement_cache_ttl_seconds
+    if subscription is not None and subscription.valid_until is not None:
+        valid_until = subscription.valid_until
+        if valid_until.tzinfo is None:
+            valid_until = valid_until.replace(tzinfo=timezone.utc)
+        ttl = min(ttl, (valid_until - now).total_seconds())
+    return ttl
+
+
+async def load_entitlement(session: AsyncSession, device_id: str, settings: Settings) -> dict:
     device = await session.scalar(select(Device).where(Device.device_id == device_id))
     if not device:
         return {"allowed": False, "reason": "device_not_found"}
@@ -27,9 +118,27 @@ async def validate_device(session: AsyncSession, device_id: str, token: str, set
         )
     )
     if not subscription:
-        return {"allowed": False, "reason": "no_active_subscription", "user_id": device.user_id}
-    return {
-        "allowed": True,
-        "user_id": device.user_id,
-        "subscription_status": subscription.status,
-    }
+        entitlement = {"allowed": False, "reason": "no_active_subscription", "user_id": device.user_id}
+    else:
+        entitlement = {
+            "allowed": True,
+            "user_id": device.user_id,
+            "subscription_status": subscription.status,
+        }
+    entitlement_cache.put(device_id, device.user_id, entitlement, entitlement_ttl(subscription, now, settings))
+    return entitlement
+
+
+async def validate_device(session: AsyncSession, device_id: str, token: str, settings: Settings) -> dict:
+    try:
+        payload = verify_token(token, settings)
+    except Exception:
+        return {"allowed": False, "reason": "invalid_token"}
+    token_device_id = payload.get("device_id")
+    if token_device_id and token_device_id != device_id:
+        return {"allowed": False, "reason": "device_mismatch"}
+    if settings.entitlement_cache_ttl_seconds > 0:
+        entitlement = entitlement_cache.get(device_id)
+        if entitlement is not None:
+            return entitlement
+    return await load_entitlement(session, device_id, settings)
@@ -1,44 +1,379 @@
+import asyncio
+import heapq
+import logging
 import secrets
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
-from typing import Any
+from typing import Any, Awaitable, Callable
 
+from sqlalchemy import delete, insert, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
 
-from app.core.config import Settings
+from app.core.config import Settings, get_settings
+from app.core.database import SessionLocal
+from app.core.security import seal_token, unseal_token
+from app.core.metrics import SESSION_REQUESTS_COALESCED, SESSION_STORE_CACHE_REQUESTS, SESSION_STORE_ENTRIES, SESSION_STORE_EVICTIONS
+from app.models.httvps_revoked_session import HttvpsRevokedSession
+from app.models.httvps_session_descriptor import HttvpsSessionDescriptor
+from app.services.admission_service import admission
 from app.services.auth_service import validate_device
 from app.services.nodes_service import assign_outline_node, OutlineProvisioningError, NoOutlineNodesAvailable, NoHealthyOutlineNodesError
 
 
+logger = logging.getLogger(__name__)
+
+
 class SessionDescriptorStore:
-    def __init__(self):
-        self._storage: dict[str, dict[str, Any]] = {}
+    def __init__(self, max_entries: int = 0):
+        self.max_entries = max_entries
+        self._storage: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        self._expiry: list[tuple[float, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._storage)
+
+    def configure(self, settings: Settings) -> None:
+        self.max_entries = settings.httvps_session_store_max_entries
 
     def put(self, token: str, payload: dict[str, Any]) -> None:
         self._storage[token] = payload
+        self._storage.move_to_end(token)
+        expires_at = payload.get("expires_at")
+        if expires_at:
+            heapq.heappush(self._expiry, (expires_at.timestamp(), token))
+        if self.max_entries > 0 and len(self._storage) > self.max_entries:
+            self.sweep()
+        while self.max_entries > 0 and len(self._storage) > self.max_entries:
+            self._storage.popitem(last=False)
+            SESSION_STORE_EVICTIONS.labels(reason="capacity").inc()
+            logger.warning("session_store_evicted_live_session", extra={"max_entries": self.max_entries})
+        if len(self._expiry) > 2 * len(self._storage):
+            self.compact()
+        SESSION_STORE_ENTRIES.set(len(self._storage))
+
+    def compact(self) -> None:
+        self._expiry = [
+            (payload["expires_at"].timestamp(), token)
+            for token, payload in self._storage.items()
+            if payload.get("expires_at")
+        ]
+        heapq.heapify(self._expiry)
 
     def get(self, token: str) -> dict[str, Any] | None:
-        return self._storage.get(token)
+        payload = self._storage.get(token)
+        if payload is None:
+            return None
+        expires_at = payload.get("expires_at")
+        if expires_at and expires_at.timestamp() <= time.time():
+            self.delete(token)
+            SESSION_STORE_EVICTIONS.labels(reason="expired").inc()
+            return None
+        self._storage.move_to_end(token)
+        return payload
 
     def delete(self, token: str) -> None:
         self._storage.pop(token, None)
+        SESSION_STORE_ENTRIES.set(len(self._storage))
+
+    def sweep(self, now: float | None = None) -> int:
+        now = time.time() if now is None else now
+        removed = 0
+        while self._expiry and self._expiry[0][0] <= now:
+            _, token = heapq.heappop(self._expiry)
+            payload = self._storage.get(token)
+            expires_at = payload.get("expires_at") if payload else None
+            if expires_at and expires_at.timestamp() <= now:
+                self._storage.pop(token, None)
+                removed += 1
+        if removed:
+            SESSION_STORE_EVICTIONS.labels(reason="expired").inc(removed)
+            SESSION_STORE_ENTRIES.set(len(self._storage))
+        return removed
+
+
+def encode_descriptor(payload: dict[str, Any]) -> dict[str, Any]:
+    return {key: value for key, value in payload.items() if key != "expires_at"}
+
+
+def decode_descriptor(payload: dict[str, Any], expires_at: datetime) -> dict[str, Any]:
+    if expires_at.tzinfo is None:
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    return {**payload, "expires_at": expires_at}
+
+
+class MemoryDescriptorBackend:
+    def __init__(self, descriptors: SessionDescriptorStore):
+        self.descriptors = descriptors
+
+    async def put(self, token: str, payload: dict[str, Any]) -> None:
+        self.descriptors.put(token, payload)
+
+    async def get(self, token: str) -> dict[str, Any] | None:
+        return self.descriptors.get(token)
+
+    async def get_many(self, tokens: list[str]) -> dict[str, dict[str, Any]]:
+        found = {}
+        for token in tokens:
+            payload = self.descriptors.get(token)
+            if payload is not None:
+                found[token] = payload
+        return found
+
+    async def delete(self, token: str) -> None:
+        self.descriptors.delete(token)
+
+    async def sweep(self) -> int:
+        return self.descriptors.sweep()
+
+
+class DatabaseDescriptorBackend:
+    def __init__(self, session_maker: sessionmaker):
+        self.session_maker = session_maker
+
+    async def put(self, token: str, payload: dict[str, Any]) -> None:
+        async with self.session_maker() as session:
+            await session.execute(
+                insert(HttvpsSessionDescriptor).values(
+                    token=token,
+                    payload=encode_descriptor(payload),
+                    expires_at=payload["expires_at"],
+                )
+            )
+            await session.commit()
+
+    async def get(self, token: str) -> dict[str, Any] | None:
+        async with self.session_maker() as session:
+            row = (
+                await session.execute(
+                    select(HttvpsSessionDescriptor.payload, HttvpsSessionDescriptor.expires_at).where(
+                        HttvpsSessionDescriptor.token == token,
+                        HttvpsSessionDescriptor.expires_at > datetime.now(timezone.utc),
+                    )
+                )
+            ).first()
+        if row is None:
+            return None
+        return decode_descriptor(row.payload, row.expires_at)
+
+    async def get_many(self, tokens: list[str]) -> dict[str, dict[str, Any]]:
+        if not tokens:
+            return {}
+        async with self.session_maker() as session:
+            rows = (
+                await session.execute(
+                    select(HttvpsSessionDescriptor.token, HttvpsSessionDescriptor.payload, HttvpsSessionDescriptor.expires_at).where(
+                        HttvpsSessionDescriptor.token.in_(tokens),
+                        HttvpsSessionDescriptor.expires_at > datetime.now(timezone.utc),
+                    )
+                )
+            ).all()
+        return {row.token: decode_descriptor(row.payload, row.expires_at) for row in rows}
+
+    async def delete(self, token: str) -> None:
+        async with self.session_maker() as session:
+            await session.execute(delete(HttvpsSessionDescriptor).where(HttvpsSessionDescriptor.token == token))
+            await session.commit()
+
+    async def sweep(self) -> int:
+        async with self.session_maker() as session:
+            result = await session.execute(
+                delete(HttvpsSessionDescriptor).where(HttvpsSessionDescriptor.expires_at <= datetime.now(timezone.utc))
+            )
+            await session.commit()
+        return result.rowcount or 0
+
+
+class CachedDescriptorBackend:
+    def __init__(self, backend: DatabaseDescriptorBackend, cache: SessionDescriptorStore, ttl_seconds: float):
+        self.backend = backend
+        self.cache = cache
+        self.ttl_seconds = ttl_seconds
+
+    def remember(self, token: str, payload: dict[str, Any]) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        expires_at = min(payload["expires_at"], datetime.now(timezone.utc) + timedelta(seconds=self.ttl_seconds))
+        self.cache.put(token, {"descriptor": payload, "expires_at": expires_at})
+
+    async def put(self, token: str, payload: dict[str, Any]) -> None:
+        await self.backend.put(token, payload)
+        self.remember(token, payload)
+
+    async def get(self, token: str) -> dict[str, Any] | None:
+        cached = self.cache.get(token)
+        if cached is not None:
+            SESSION_STORE_CACHE_REQUESTS.labels(result="hit").inc()
+            return cached["descriptor"]
+        SESSION_STORE_CACHE_REQUESTS.labels(result="miss").inc()
+        payload = await self.backend.get(token)
+        if payload is not None:
+            self.remember(token, payload)
+        return payload
+
+    async def get_many(self, tokens: list[str]) -> dict[str, dict[str, Any]]:
+        found = {}
+        missing = []
+        for token in tokens:
+            cached = self.cache.get(token)
+            if cached is not None:
+                found[token] = cached["descriptor"]
+            else:
+                missing.append(token)
+        SESSION_STORE_CACHE_REQUESTS.labels(result="hit").inc(len(found))
+        SESSION_STORE_CACHE_REQUESTS.labels(result="miss").inc(len(missing))
+        loaded = await self.backend.get_many(missing)
+        for token, payload in loaded.items():
+            self.remember(token, payload)
+        return {**found, **loaded}
+
+    async def delete(self, token: str) -> None:
+        self.cache.delete(token)
+        await self.backend.delete(token)
+
+    async def sweep(self) -> int:
+        self.cache.sweep()
+        return await self.backend.sweep()
+
+
+class SessionRevocationList:
+    def __init__(self, session_maker: sessionmaker | None = None, refresh_seconds: float = 2.0):
+        self.session_maker = session_maker or SessionLocal
+        self.refresh_seconds = refresh_seconds
+        self._revoked: dict[str, float] = {}
+        self._refreshed_at: float | None = None
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+    def configure(self, settings: Settings, session_maker: sessionmaker | None = None) -> None:
+        self.session_maker = session_maker or SessionLocal
+        self.refresh_seconds = settings.httvps_revocation_refresh_seconds
+        self.reset()
+
+    def reset(self) -> None:
+        self._revoked = {}
+        self._refreshed_at = None
+
+    def is_stale(self) -> bool:
+        return self._refreshed_at is None or time.monotonic() - self._refreshed_at >= self.refresh_seconds
+
+    async def refresh(self) -> None:
+        async with self._lock:
+            if not self.is_stale():
+                return
+            async with self.session_maker() as session:
+                rows = (
+                    await session.execute(
+                        select(HttvpsRevokedSession.session_id, HttvpsRevokedSession.expires_at).where(
+                            HttvpsRevokedSession.expires_at > datetime.now(timezone.utc)
+                        )
+                    )
+                ).all()
+            revoked = {}
+            for session_id, expires_at in rows:
+                if expires_at.tzinfo is None:
+                    expires_at = expires_at.replace(tzinfo=timezone.utc)
+                revoked[session_id] = expires_at.timestamp()
+            self._revoked = revoked
+            self._refreshed_at = time.monotonic()
+
+    async def revoke(self, session_id: str, expires_at: datetime) -> None:
+        try:
+            async with self.session_maker() as session:
+                await session.execute(insert(HttvpsRevokedSession).values(session_id=session_id, expires_at=expires_at))
+                await session.commit()
+        except IntegrityError:
+            pass
+        self._revoked[session_id] = expires_at.timestamp()
+
+    async def is_revoked(self, session_id: str) -> bool:
+        if self.is_stale():
+            await self.refresh()
+        expires_at = self._revoked.get(session_id)
+        return expires_at is not None and expires_at > time.time()
+
+    async def sweep(self) -> int:
+        now = time.time()
+        self._revoked = {session_id: expires_at for session_id, expires_at in self._revoked.items() if expires_at > now}
+        async with self.session_maker() as session:
+            result = await session.execute(
+                delete(HttvpsRevokedSession).where(HttvpsRevokedSession.expires_at <= datetime.now(timezone.utc))
+            )
+            await session.commit()
+        return result.rowcount or 0
 
 
 store = SessionDescriptorStore()
+revoked_sessions = SessionRevocationList()
+descriptor_backend: MemoryDescriptorBackend | CachedDescriptorBackend = MemoryDescriptorBackend(store)
+
+
+def configure_descriptor_backend(settings: Settings, session_maker: sessionmaker | None = None) -> None:
+    global descriptor_backend
+    store.configure(settings)
+    revoked_sessions.configure(settings, session_maker)
+    if settings.httvps_session_store == "database":
+        descriptor_backend = CachedDescriptorBackend(
+            DatabaseDescriptorBackend(session_maker or SessionLocal),
+            store,
+            settings.httvps_session_cache_ttl_seconds,
+        )
+    else:
+        descriptor_backend = MemoryDescriptorBackend(store)
+
+
+class SessionRequestCoalescer:
+    def __init__(self):
+        self._inflight: dict[tuple[str, str | None, str], asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    def forget(self, key: tuple[str, str | None, str], task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    async def run(self, key: tuple[str, str | None, str], factory: Callable[[], Awaitable[dict[str, Any]]]) -> dict[str, Any]:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda finished: self.forget(key, finished))
+        else:
+            SESSION_REQUESTS_COALESCED.inc()
+        return await asyncio.shield(task)
+
+
+session_requests = SessionRequestCoalescer()
 
 
 async def issue_session_descriptor(db: AsyncSession, device_id: str, token: str, region: str | None, settings: Settings) -> dict[str, Any]:
+    if not settings.httvps_session_coalesce:
+        return await mint_session_descriptor(db, device_id, token, region, settings)
+
+    async def mint() -> dict[str, Any]:
+        async with AsyncSession(db.bind, expire_on_commit=False) as session:
+            return await mint_session_descriptor(session, device_id, token, region, settings)
+
+    return await session_requests.run((device_id, region, token), mint)
+
+
+async def mint_session_descriptor(db: AsyncSession, device_id: str, token: str, region: str | None, settings: Settings) -> dict[str, Any]:
     validation = await validate_device(db, device_id, token, settings)
     if not validation.get("allowed"):
         return {"allowed": False, "reason": validation.get("reason", "not_allowed"), "subscription_status": validation.get("subscription_status")}
+    admission.check_device("httvps_session", device_id)
     try:
-        assignment = await assign_outline_node(db, region, device_id, pool_code=settings.outline_default_pool_code)
+        assignment = await assign_outline_node(db, region, device_id, pool_code=settings.outline_default_pool_code, settings=settings)
     except (OutlineProvisioningError, NoOutlineNodesAvailable, NoHealthyOutlineNodesError) as exc:
         return {"allowed": False, "reason": str(exc)}
-    session_token = secrets.token_urlsafe(32)
     expires_at = datetime.now(timezone.utc) + timedelta(seconds=max(settings.httvps_session_ttl_seconds, 60))
     descriptor = {
         "allowed": True,
-        "session_token": session_token,
         "expires_at": expires_at,
         "gateway_url": settings.httvps_gateway_url,
         "max_streams": settings.httvps_max_streams,
@@ -46,16 +381,98 @@ async def issue_session_descriptor(db: AsyncSession, device_id: str, token: str,
         "user_id": validation.get("user_id"),
         "outline": assignment.model_dump(),
     }
-    store.put(session_token, descriptor)
+    if settings.httvps_session_token_mode == "sealed":
+        session_id = secrets.token_urlsafe(16)
+        descriptor["session_id"] = session_id
+        descriptor["session_token"] = seal_session_descriptor(session_id, descriptor, settings)
+        return descriptor
+    session_token = secrets.token_urlsafe(32)
+    descriptor["session_id"] = session_token
+    descriptor["session_token"] = session_token
+    await descriptor_backend.put(session_token, descriptor)
     return descriptor
 
 
-async def validate_session_token(session_token: str) -> dict[str, Any] | None:
-    descriptor = store.get(session_token)
-    if not descriptor:
+def seal_session_descriptor(session_id: str, descriptor: dict[str, Any], settings: Settings) -> str:
+    payload = {
+        "jti": session_id,
+        "device_id": descriptor["device_id"],
+        "user_id": descriptor["user_id"],
+        "max_streams": descriptor["max_streams"],
+        "outline": descriptor["outline"],
+        "exp": descriptor["expires_at"].timestamp(),
+    }
+    return seal_token(payload, settings)
+
+
+def open_sealed_descriptor(session_token: str, settings: Settings) -> dict[str, Any] | None:
+    payload = unseal_token(session_token, settings)
+    if not payload:
         return None
-    expires_at = descriptor.get("expires_at")
-    if expires_at and datetime.now(timezone.utc) > expires_at:
-        store.delete(session_token)
+    expires_at = datetime.fromtimestamp(payload["exp"], timezone.utc)
+    if expires_at <= datetime.now(timezone.utc):
         return None
-    return descriptor
+    return {
+        "allowed": True,
+        "session_id": payload["jti"],
+        "session_token": session_token,
+        "expires_at": expires_at,
+        "max_streams": payload["max_streams"],
+        "device_id": payload["device_id"],
+        "user_id": payload["user_id"],
+        "outline": payload["outline"],
+    }
+
+
+async def validate_session_token(session_token: str, settings: Settings | None = None) -> dict[str, Any] | None:
+    settings = settings or get_settings()
+    if settings.httvps_session_token_mode == "sealed":
+        descriptor = open_sealed_descriptor(session_token, settings)
+        if descriptor is None or await revoked_sessions.is_revoked(descriptor["session_id"]):
+            return None
+        return descriptor
+    return await descriptor_backend.get(session_token)
+
+
+async def validate_session_tokens(session_tokens: list[str], settings: Settings | None = None) -> list[dict[str, Any] | None]:
+    settings = settings or get_settings()
+    if settings.httvps_session_token_mode == "sealed":
+        return [await validate_session_token(token, settings) for token in session_tokens]
+    found = await descriptor_backend.get_many(list(dict.fromkeys(session_tokens)))
+    return [found.get(token) for token in session_tokens]
+
+
+async def revoke_session_token(session_token: str, settings: Settings | None = None) -> bool:
+    settings = settings or get_settings()
+    if settings.httvps_session_token_mode == "sealed":
+        descriptor = open_sealed_descriptor(session_token, settings)
+        if descriptor is None:
+            return False
+        await revoked_sessions.revoke(descriptor["session_id"], descriptor["expires_at"])
+        return True
+    if await descriptor_backend.get(session_token) is None:
+        return False
+    await descriptor_backend.delete(session_token)
+    return True
+
+
+async def session_store_sweeper_loop(settings: Settings) -> None:
+    if settings.httvps_session_sweep_interval_seconds <= 0:
+        return
+    while True:
+        await asyncio.sleep(settings.httvps_session_sweep_interval_seconds)
+        try:
+            await descriptor_backend.sweep()
+            if settings.httvps_session_token_mode == "sealed":
+                await revoked_sessions.sweep()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("session_store_sweep_failed")
+
+
+async def start_session_store_sweeper(settings: Settings) -> asyncio.Task | None:
+    if settings.httvps_session_sweep_interval_seconds <= 0:
+        return None
+    task = asyncio.create_task(session_store_sweeper_loop(settings))
+    return task
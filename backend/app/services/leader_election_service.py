@@ -0,0 +1,162 @@
+import asyncio
+import hashlib
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import delete, insert, or_, select, text, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+from app.core import database
+from app.core.config import Settings
+from app.core.metrics import LEADER_STATUS
+from app.models.leader_lease import LeaderLease
+
+
+logger = logging.getLogger(__name__)
+
+LEADER_ELECTION_MODES = {"auto", "advisory", "lease", "disabled"}
+
+
+def advisory_lock_id(name: str) -> int:
+    return int.from_bytes(hashlib.sha256(name.encode()).digest()[:8], "big", signed=True)
+
+
+def default_holder() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class LeaderElection:
+    def __init__(self, name: str, engine: AsyncEngine | None = None, holder: str | None = None):
+        self.name = name
+        self.lock_id = advisory_lock_id(name)
+        self.holder = holder or default_holder()
+        self._engine = engine
+        self._connection: AsyncConnection | None = None
+        self._mode: str | None = None
+        self._is_leader = False
+        self._checked_at: float | None = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def engine(self) -> AsyncEngine:
+        return self._engine or database.engine
+
+    @property
+    def is_leader(self) -> bool:
+        return self._is_leader
+
+    def mode(self, settings: Settings) -> str:
+        mode = settings.leader_election if settings.leader_election in LEADER_ELECTION_MODES else "auto"
+        if mode != "auto":
+            return mode
+        return "advisory" if self.engine.dialect.name == "postgresql" else "lease"
+
+    async def ensure(self, settings: Settings) -> bool:
+        async with self._lock:
+            now = time.monotonic()
+            if self._checked_at is not None and now - self._checked_at < settings.leader_check_interval_seconds:
+                return self._is_leader
+            mode = self.mode(settings)
+            try:
+                if mode == "disabled":
+                    leader = True
+                elif mode == "advisory":
+                    leader = await self.ensure_advisory_lock()
+                else:
+                    leader = await self.ensure_lease(settings)
+            except Exception:
+                logger.exception("leader_election_failed", extra={"leader_name": self.name})
+                await self.close_connection()
+                leader = False
+            if leader != self._is_leader:
+                logger.info(
+                    "leader_election_changed",
+                    extra={"leader_name": self.name, "holder": self.holder, "leader": leader, "mode": mode},
+                )
+            self._mode = mode
+            self._is_leader = leader
+            self._checked_at = now
+            LEADER_STATUS.labels(name=self.name).set(1 if leader else 0)
+            return leader
+
+    async def ensure_advisory_lock(self) -> bool:
+        if self._connection is not None:
+            await self._connection.execute(text("SELECT 1"))
+            await self._connection.commit()
+            return True
+        connection = await self.engine.connect()
+        try:
+            acquired = await connection.scalar(text("SELECT pg_try_advisory_lock(:lock_id)"), {"lock_id": self.lock_id})
+            await connection.commit()
+        except Exception:
+            await connection.close()
+            raise
+        if not acquired:
+            await connection.close()
+            return False
+        self._connection = connection
+        return True
+
+    async def ensure_lease(self, settings: Settings) -> bool:
+        now = datetime.now(timezone.utc)
+        expires_at = now + timedelta(seconds=settings.leader_lease_seconds)
+        async with self.engine.begin() as connection:
+            result = await connection.execute(
+                update(LeaderLease)
+                .where(
+                    LeaderLease.name == self.name,
+                    or_(LeaderLease.holder == self.holder, LeaderLease.expires_at < now),
+                )
+                .values(holder=self.holder, expires_at=expires_at)
+            )
+            if result.rowcount:
+                return True
+            exists = await connection.scalar(select(LeaderLease.name).where(LeaderLease.name == self.name))
+        if exists:
+            return False
+        try:
+            async with self.engine.begin() as connection:
+                await connection.execute(
+                    insert(LeaderLease).values(name=self.name, holder=self.holder, expires_at=expires_at)
+                )
+        except IntegrityError:
+            return False
+        return True
+
+    async def close_connection(self) -> None:
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            try:
+                await connection.close()
+            except Exception:
+                logger.warning("leader_connection_close_failed", exc_info=True)
+
+    async def release(self) -> None:
+        async with self._lock:
+            try:
+                if self._connection is not None:
+                    await self._connection.execute(text("SELECT pg_advisory_unlock(:lock_id)"), {"lock_id": self.lock_id})
+                    await self._connection.commit()
+                elif self._is_leader and self._mode == "lease":
+                    async with self.engine.begin() as connection:
+                        await connection.execute(
+                            delete(LeaderLease).where(LeaderLease.name == self.name, LeaderLease.holder == self.holder)
+                        )
+            except Exception:
+                logger.warning("leader_release_failed", exc_info=True)
+            await self.close_connection()
+            self._is_leader = False
+            self._checked_at = None
+            LEADER_STATUS.labels(name=self.name).set(0)
+
+    def reset(self) -> None:
+        self._connection = None
+        self._mode = None
+        self._is_leader = False
+        self._checked_at = None
+
+
+background_leader = LeaderElection("outline-background")
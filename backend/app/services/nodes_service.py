@@ -1,14 +1,19 @@
 import logging
-from sqlalchemy import select, func
+from datetime import datetime, timedelta, timezone
+import httpx
+from sqlalchemy import Select, select, func
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
-from app.clients.outline_client import OutlineClient, OutlineClientError
+from app.clients.outline_client import OutlineClient, OutlineClientError, get_outline_client
+from app.core.config import Settings, get_settings
 from app.models.device import Device
 from app.models.outline_access_key import OutlineAccessKey
 from app.models.outline_node import OutlineNode
+from app.models.outline_node_health_history import OutlineNodeHealthHistory
 from app.models.region import Region
 from app.services.outline_health_service import OutlineHealthStatus
-from app.services.outline_pool_service import collect_pool_nodes, OutlinePoolNotFound
+from app.services.outline_key_pool_service import claim_pooled_key
+from app.services.outline_selection_service import choose_outline_node, load_snapshot
+from app.services.outline_topology_service import OutlineNodeView, outline_topology
 from app.schemas.nodes import OutlineNodeAssignment, OutlineNodeStatus
 
 
@@ -27,33 +32,21 @@ class OutlineProvisioningError(Exception):
 logger = logging.getLogger(__name__)
 
 
-async def assign_outline_node(session: AsyncSession, region_code: str | None, device_identifier: str, client_class: type[OutlineClient] = OutlineClient, pool_code: str | None = None) -> OutlineNodeAssignment:
+async def assign_outline_node(session: AsyncSession, region_code: str | None, device_identifier: str, client_class: type[OutlineClient] = OutlineClient, pool_code: str | None = None, settings: Settings | None = None) -> OutlineNodeAssignment:
+    settings = settings or get_settings()
     device = await session.scalar(select(Device).where(Device.device_id == device_identifier))
     if not device:
         raise OutlineProvisioningError("device_not_found")
-    region = None
-    if region_code:
-        region = await session.scalar(select(Region).where(Region.code == region_code))
+    topology = await outline_topology.get(session, settings.outline_topology_ttl_seconds)
     pool_value = None
-    nodes: list[OutlineNode]
     if pool_code:
-        try:
-            pool, nodes = await collect_pool_nodes(session, pool_code, region_code)
-        except OutlinePoolNotFound:
+        pool = topology.pools.get(pool_code)
+        if not pool:
             raise OutlineProvisioningError("outline_pool_not_found")
+        nodes = topology.pool_nodes(pool, region_code)
         pool_value = pool.code
     else:
-        query = (
-            select(OutlineNode)
-            .options(selectinload(OutlineNode.region))
-            .where(OutlineNode.is_active.is_(True), OutlineNode.is_deleted.is_(False))
-            .order_by(OutlineNode.priority.is_(None), OutlineNode.priority, OutlineNode.id)
-        )
-        result = await session.scalars(query.where(OutlineNode.region_id == region.id)) if region else None
-        nodes = result.all() if result else []
-        if not nodes:
-            result = await session.scalars(query)
-            nodes = result.all()
+        nodes = topology.region_nodes(region_code)
     if not nodes:
         raise NoOutlineNodesAvailable()
     healthy_nodes = [
@@ -74,73 +67,126 @@ async def assign_outline_node(session: AsyncSession, region_code: str | None, de
     available_nodes = healthy_nodes or degraded_nodes
     if not available_nodes:
         raise NoHealthyOutlineNodesError()
-    node = available_nodes[0]
-    method = node.method
-    password = node.password
-    port = node.port
-    access_key_id = None
-    access_url = None
+    reusable_key = await find_reusable_key(session, device.id, available_nodes)
+    if reusable_key and not key_expired(reusable_key, settings):
+        node = next(item for item in available_nodes if item.id == reusable_key.outline_node_id)
+        return build_assignment(node, reusable_key, pool_value)
+    if load_snapshot.is_stale(settings.outline_load_snapshot_ttl_seconds):
+        await load_snapshot.refresh(session)
+    node = choose_outline_node(available_nodes, settings)
+    outline_key = None
     if node.api_url and node.api_key:
-        client = client_class(node.api_url, node.api_key)
-        try:
-            key_data = await client.create_key(device_identifier)
-        except OutlineClientError as exc:
-            raise OutlineProvisioningError(str(exc))
-        access_key_id = key_data.key_id
-        password = key_data.password or password
-        method = key_data.method or method or "chacha20-ietf-poly1305"
-        port = key_data.port or port
-        access_url = key_data.access_url
-        outline_key = OutlineAccessKey(
-            device_id=device.id,
-            outline_node_id=node.id,
-            access_key_id=access_key_id,
-            password=password,
-            method=method,
-            port=port,
-            access_url=access_url,
-        )
-        session.add(outline_key)
+        outline_key = await claim_pooled_key(session, node.id, device.id)
+        if outline_key is None:
+            client = get_outline_client(node.api_url, node.api_key, client_class)
+            try:
+                key_data = await client.create_key(device_identifier)
+            except OutlineClientError as exc:
+                raise OutlineProvisioningError(str(exc))
+            outline_key = OutlineAccessKey(
+                device_id=device.id,
+                outline_node_id=node.id,
+                access_key_id=key_data.key_id,
+                password=key_data.password or node.password,
+                method=key_data.method or node.method or "chacha20-ietf-poly1305",
+                port=key_data.port or node.port,
+                access_url=key_data.access_url,
+                assigned_at=datetime.now(timezone.utc),
+            )
+            session.add(outline_key)
         await session.commit()
-        await session.refresh(outline_key)
-    region_value = node.region.code if node.region else None
+        load_snapshot.record_assignment(node.id)
+        if reusable_key:
+            await retire_outline_key(session, reusable_key, client_class)
+    return build_assignment(node, outline_key, pool_value)
+
+
+def build_assignment(node: OutlineNodeView, outline_key: OutlineAccessKey | None, pool_value: str | None) -> OutlineNodeAssignment:
+    if outline_key is None:
+        return OutlineNodeAssignment(
+            node_id=node.id,
+            host=node.host,
+            port=node.port,
+            method=node.method,
+            password=node.password,
+            region=node.region_code,
+            pool=pool_value,
+        )
     return OutlineNodeAssignment(
         node_id=node.id,
         host=node.host,
-        port=port,
-        method=method,
-        password=password,
-        region=region_value,
+        port=outline_key.port,
+        method=outline_key.method,
+        password=outline_key.password,
+        region=node.region_code,
         pool=pool_value,
-        access_key_id=access_key_id,
-        access_url=access_url,
+        access_key_id=outline_key.access_key_id,
+        access_url=outline_key.access_url,
     )
 
 
-async def list_outline_nodes(session: AsyncSession) -> list[OutlineNode]:
-    result = await session.scalars(
-        select(OutlineNode)
-        .options(selectinload(OutlineNode.region))
-        .where(OutlineNode.is_deleted.is_(False))
-        .order_by(OutlineNode.priority.is_(None), OutlineNode.priority, OutlineNode.id)
+async def find_reusable_key(session: AsyncSession, device_pk: int, nodes: list[OutlineNodeView]) -> OutlineAccessKey | None:
+    node_ids = [node.id for node in nodes if node.api_url and node.api_key]
+    if not node_ids:
+        return None
+    return await session.scalar(
+        select(OutlineAccessKey)
+        .where(
+            OutlineAccessKey.device_id == device_pk,
+            OutlineAccessKey.revoked.is_(False),
+            OutlineAccessKey.outline_node_id.in_(node_ids),
+        )
+        .order_by(func.coalesce(OutlineAccessKey.assigned_at, OutlineAccessKey.created_at).desc(), OutlineAccessKey.id.desc())
+        .limit(1)
     )
-    return result.all()
 
 
-async def build_outline_node_status(session: AsyncSession, node: OutlineNode) -> OutlineNodeStatus:
-    active_keys = await session.scalar(
-        select(func.count(OutlineAccessKey.id)).where(
-            OutlineAccessKey.outline_node_id == node.id,
-            OutlineAccessKey.revoked.is_(False),
-        )
+def key_expired(outline_key: OutlineAccessKey, settings: Settings) -> bool:
+    if settings.outline_key_max_age_seconds <= 0:
+        return False
+    issued_at = outline_key.assigned_at or outline_key.created_at
+    if issued_at is None:
+        return False
+    if issued_at.tzinfo is None:
+        issued_at = issued_at.replace(tzinfo=timezone.utc)
+    return datetime.now(timezone.utc) - issued_at > timedelta(seconds=settings.outline_key_max_age_seconds)
+
+
+async def retire_outline_key(session: AsyncSession, outline_key: OutlineAccessKey, client_class: type[OutlineClient] | None) -> None:
+    outline_key.revoked = True
+    await session.commit()
+    load_snapshot.record_release(outline_key.outline_node_id)
+    node = await session.get(OutlineNode, outline_key.outline_node_id)
+    if node and node.api_url and node.api_key and client_class:
+        client = get_outline_client(node.api_url, node.api_key, client_class)
+        try:
+            await client.delete_key(outline_key.access_key_id)
+        except (OutlineClientError, httpx.HTTPError):
+            logger.warning("outline_delete_key_failed", exc_info=True)
+
+
+def outline_node_status_query() -> Select:
+    key_counts = (
+        select(OutlineAccessKey.outline_node_id.label("node_id"), func.count(OutlineAccessKey.id).label("active_keys"))
+        .where(OutlineAccessKey.device_id.is_not(None), OutlineAccessKey.revoked.is_(False))
+        .group_by(OutlineAccessKey.outline_node_id)
+        .subquery()
+    )
+    return (
+        select(OutlineNode, Region.code, func.coalesce(key_counts.c.active_keys, 0))
+        .outerjoin(Region, Region.id == OutlineNode.region_id)
+        .outerjoin(key_counts, key_counts.c.node_id == OutlineNode.id)
+        .where(OutlineNode.is_deleted.is_(False))
     )
-    region_value = node.region.code if node.region else None
+
+
+def build_outline_node_status(node: OutlineNode, region_code: str | None, active_keys: int) -> OutlineNodeStatus:
     return OutlineNodeStatus(
         id=node.id,
         name=node.name,
         host=node.host,
         port=node.port,
-        region=region_value,
+        region=region_code,
         tag=node.tag,
         priority=node.priority,
         is_active=node.is_active,
@@ -148,8 +194,55 @@ async def build_outline_node_status(session: AsyncSession, node: OutlineNode) ->
         last_check_at=node.last_check_at,
         recent_latency_ms=node.recent_latency_ms,
         last_error=node.last_error,
+        capacity=node.capacity,
         active_access_keys=active_keys,
+        latency_p50_ms=node.latency_p50_ms,
+        latency_p95_ms=node.latency_p95_ms,
+        error_rate=node.error_rate,
+    )
+
+
+async def list_outline_node_statuses(
+    session: AsyncSession,
+    region_code: str | None = None,
+    status: str | None = None,
+    tag: str | None = None,
+    limit: int | None = None,
+    offset: int = 0,
+) -> list[OutlineNodeStatus]:
+    query = outline_node_status_query()
+    if region_code:
+        query = query.where(Region.code == region_code)
+    if status:
+        query = query.where(OutlineNode.last_check_status == status)
+    if tag:
+        query = query.where(OutlineNode.tag == tag)
+    query = query.order_by(OutlineNode.priority.is_(None), OutlineNode.priority, OutlineNode.id).offset(offset)
+    if limit is not None:
+        query = query.limit(limit)
+    result = await session.execute(query)
+    return [build_outline_node_status(node, region_code, active_keys) for node, region_code, active_keys in result.all()]
+
+
+async def get_outline_node_status(session: AsyncSession, node_id: int) -> OutlineNodeStatus | None:
+    row = (await session.execute(outline_node_status_query().where(OutlineNode.id == node_id))).first()
+    if row is None:
+        return None
+    node, region_code, active_keys = row
+    return build_outline_node_status(node, region_code, active_keys)
+
+
+async def list_outline_node_health(session: AsyncSession, node_id: int, limit: int) -> list[OutlineNodeHealthHistory] | None:
+    node_exists = await session.scalar(select(OutlineNode.id).where(OutlineNode.id == node_id, OutlineNode.is_deleted.is_(False)))
+    if node_exists is None:
+        return None
+    result = await session.scalars(
+        select(OutlineNodeHealthHistory)
+        .where(OutlineNodeHealthHistory.outline_node_id == node_id)
+        .order_by(OutlineNodeHealthHistory.bucket_start.desc())
+        .limit(limit)
     )
+    return result.all()
 
 
 async def revoke_outline_key(session: AsyncSession, device_identifier: str, client_class: type[OutlineClient] | None = OutlineClient) -> bool:
@@ -158,20 +251,12 @@ async def revoke_outline_key(session: AsyncSession, device_identifier: str, clie
         raise OutlineProvisioningError("device_not_found")
     query = (
         select(OutlineAccessKey)
-        .options(selectinload(OutlineAccessKey.outline_node))
         .where(OutlineAccessKey.device_id == device.id, OutlineAccessKey.revoked.is_(False))
-        .order_by(OutlineAccessKey.created_at.desc())
+        .order_by(func.coalesce(OutlineAccessKey.assigned_at, OutlineAccessKey.created_at).desc(), OutlineAccessKey.id.desc())
+        .limit(1)
     )
     access_key = await session.scalar(query)
     if not access_key:
         return False
-    access_key.revoked = True
-    await session.commit()
-    node = access_key.outline_node
-    if node and node.api_url and node.api_key and client_class:
-        client = client_class(node.api_url, node.api_key)
-        try:
-            await client.delete_key(access_key.access_key_id)
-        except OutlineClientError:
-            logger.warning("outline_delete_key_failed", exc_info=True)
+    await retire_outline_key(session, access_key, client_class)
     return True
@@ -0,0 +1,149 @@
+import math
+from array import array
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import delete, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import Settings
+from app.models.outline_node_health_history import OutlineNodeHealthHistory
+
+
+@dataclass(frozen=True)
+class NodeHealthStats:
+    samples: int
+    errors: int
+    consecutive_failures: int
+    ewma_ms: float | None
+    p50_ms: float | None
+    p95_ms: float | None
+
+    @property
+    def error_rate(self) -> float:
+        return self.errors / self.samples if self.samples else 0.0
+
+
+def percentile(values: list[float], fraction: float) -> float | None:
+    if not values:
+        return None
+    rank = max(math.ceil(fraction * len(values)) - 1, 0)
+    return values[rank]
+
+
+class NodeHealthWindow:
+    def __init__(self, size: int, alpha: float):
+        self.size = max(size, 1)
+        self.alpha = alpha
+        self.latencies = array("d", [math.nan] * self.size)
+        self.position = 0
+        self.count = 0
+        self.consecutive_failures = 0
+        self.ewma_ms: float | None = None
+
+    def add(self, latency_ms: float | None) -> None:
+        self.latencies[self.position] = math.nan if latency_ms is None else latency_ms
+        self.position = (self.position + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+        if latency_ms is None:
+            self.consecutive_failures += 1
+            return
+        self.consecutive_failures = 0
+        if self.ewma_ms is None:
+            self.ewma_ms = latency_ms
+        else:
+            self.ewma_ms = self.alpha * latency_ms + (1 - self.alpha) * self.ewma_ms
+
+    def seed(self, stats: NodeHealthStats) -> None:
+        samples = min(stats.samples, self.size)
+        errors = min(stats.errors, samples)
+        successes = samples - errors
+        low = stats.p50_ms if stats.p50_ms is not None else stats.ewma_ms
+        high = stats.p95_ms if stats.p95_ms is not None else low
+        if successes and low is None:
+            return
+        cut = max(math.ceil(0.95 * successes) - 1, 0)
+        values = [low if index < cut else high for index in range(successes)] + [math.nan] * errors
+        for index, value in enumerate(values):
+            self.latencies[index] = value
+        self.position = samples % self.size
+        self.count = samples
+        self.consecutive_failures = min(stats.consecutive_failures, errors)
+        self.ewma_ms = stats.ewma_ms if stats.ewma_ms is not None else low
+
+    def stats(self) -> NodeHealthStats:
+        values = sorted(value for value in self.latencies[: self.count] if not math.isnan(value))
+        return NodeHealthStats(
+            samples=self.count,
+            errors=self.count - len(values),
+            consecutive_failures=self.consecutive_failures,
+            ewma_ms=self.ewma_ms,
+            p50_ms=percentile(values, 0.5),
+            p95_ms=percentile(values, 0.95),
+        )
+
+
+class OutlineHealthHistory:
+    def __init__(self, window_size: int = 20, alpha: float = 0.3):
+        self.window_size = window_size
+        self.alpha = alpha
+        self._windows: dict[int, NodeHealthWindow] = {}
+        self._persisted_bucket: datetime | None = None
+
+    def configure(self, settings: Settings) -> None:
+        self.window_size = settings.outline_health_window_size
+        self.alpha = settings.outline_health_ewma_alpha
+
+    def record(self, node_id: int, latency_ms: float | None, seed: NodeHealthStats | None = None) -> NodeHealthStats:
+        window = self._windows.get(node_id)
+        if window is None:
+            window = NodeHealthWindow(self.window_size, self.alpha)
+            if seed is not None:
+                window.seed(seed)
+            self._windows[node_id] = window
+        window.add(latency_ms)
+        return window.stats()
+
+    def stats(self, node_id: int) -> NodeHealthStats | None:
+        window = self._windows.get(node_id)
+        return window.stats() if window else None
+
+    def forget(self, node_id: int) -> None:
+        self._windows.pop(node_id, None)
+
+    def reset(self) -> None:
+        self._windows.clear()
+        self._persisted_bucket = None
+
+    def bucket_start(self, now: datetime, bucket_seconds: int) -> datetime:
+        epoch = int(now.timestamp())
+        return datetime.fromtimestamp(epoch - epoch % bucket_seconds, timezone.utc)
+
+    async def persist(self, session: AsyncSession, settings: Settings, now: datetime | None = None) -> int:
+        if settings.outline_health_history_bucket_seconds <= 0 or not self._windows:
+            return 0
+        now = now or datetime.now(timezone.utc)
+        bucket = self.bucket_start(now, settings.outline_health_history_bucket_seconds)
+        if self._persisted_bucket is not None and bucket <= self._persisted_bucket:
+            return 0
+        rows = []
+        for node_id, window in self._windows.items():
+            stats = window.stats()
+            rows.append(
+                {
+                    "outline_node_id": node_id,
+                    "bucket_start": bucket,
+                    "samples": stats.samples,
+                    "errors": stats.errors,
+                    "ewma_ms": stats.ewma_ms,
+                    "p50_ms": stats.p50_ms,
+                    "p95_ms": stats.p95_ms,
+                }
+            )
+        await session.execute(insert(OutlineNodeHealthHistory), rows)
+        if settings.outline_health_history_retention_days > 0:
+            cutoff = now - timedelta(days=settings.outline_health_history_retention_days)
+            await session.execute(delete(OutlineNodeHealthHistory).where(OutlineNodeHealthHistory.bucket_start < cutoff))
+        self._persisted_bucket = bucket
+        return len(rows)
+
+
+health_history = OutlineHealthHistory()
@@ -1,15 +1,31 @@
 import asyncio
+import heapq
 import logging
+import random
 import time
+from contextlib import suppress
 from datetime import datetime, timezone
 from enum import StrEnum
+from typing import Any
 import httpx
-from sqlalchemy import select
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.clients.outline_client import OutlineClient, OutlineClientError
+from app.clients.outline_client import (
+    OutlineClient,
+    OutlineClientError,
+    ProbeTimings,
+    ProbeTracer,
+    node_label,
+    probe_tcp,
+)
 from app.core.config import Settings
+from app.core.metrics import OUTLINE_PROBE_PHASE_DURATION
 from app.core.database import SessionLocal
 from app.models.outline_node import OutlineNode
+from app.services.leader_election_service import background_leader
+from app.services.outline_health_history_service import NodeHealthStats, health_history
+from app.services.outline_selection_service import load_snapshot
+from app.services.outline_topology_service import outline_topology
 
 
 class OutlineHealthStatus(StrEnum):
@@ -30,7 +46,83 @@ def evaluate_status(latency_ms: float | None, error: str | None, settings: Setti
     return OutlineHealthStatus.healthy.value
 
 
+def evaluate_smoothed_status(stats: NodeHealthStats, settings: Settings) -> str:
+    if stats.samples == 0:
+        return OutlineHealthStatus.unknown.value
+    if stats.ewma_ms is None or stats.consecutive_failures >= settings.outline_health_down_after_failures:
+        return OutlineHealthStatus.down.value
+    if stats.error_rate >= settings.outline_health_down_error_rate:
+        return OutlineHealthStatus.down.value
+    if stats.error_rate >= settings.outline_health_degraded_error_rate:
+        return OutlineHealthStatus.degraded.value
+    if stats.ewma_ms > settings.outline_healthcheck_degraded_threshold_ms:
+        return OutlineHealthStatus.degraded.value
+    return OutlineHealthStatus.healthy.value
+
+
+def health_stats_columns(stats: NodeHealthStats) -> dict[str, Any]:
+    return {
+        "recent_latency_ms": int(stats.ewma_ms) if stats.ewma_ms is not None else None,
+        "latency_p50_ms": stats.p50_ms,
+        "latency_p95_ms": stats.p95_ms,
+        "error_rate": stats.error_rate,
+    }
+
+
+def persisted_health_stats(node: OutlineNode, settings: Settings) -> NodeHealthStats | None:
+    if node.last_check_at is None:
+        return None
+    samples = max(settings.outline_health_window_size, 1)
+    errors = round((node.error_rate or 0.0) * samples)
+    if node.last_error and node.last_check_status == OutlineHealthStatus.down.value:
+        consecutive_failures = settings.outline_health_down_after_failures
+    else:
+        consecutive_failures = 1 if node.last_error else 0
+    return NodeHealthStats(
+        samples=samples,
+        errors=max(errors, 1) if node.last_error else errors,
+        consecutive_failures=consecutive_failures,
+        ewma_ms=node.recent_latency_ms,
+        p50_ms=node.latency_p50_ms,
+        p95_ms=node.latency_p95_ms,
+    )
+
+
+def record_health_sample(node: OutlineNode, latency_ms: float | None, error_text: str | None, settings: Settings) -> tuple[str, dict[str, Any]]:
+    stats = health_history.record(node.id, None if error_text else latency_ms, seed=persisted_health_stats(node, settings))
+    return evaluate_smoothed_status(stats, settings), health_stats_columns(stats)
+
+
+def probe_label(node: OutlineNode) -> str:
+    if node.api_url:
+        return node_label(node.api_url)
+    return f"{node.host}:{node.port}"
+
+
+def observe_probe_timings(label: str, timings: ProbeTimings, latency_ms: float | None) -> None:
+    phases = timings.phases()
+    if latency_ms is not None:
+        phases["total"] = latency_ms
+    for phase, value in phases.items():
+        OUTLINE_PROBE_PHASE_DURATION.labels(node=label, phase=phase).observe(value / 1000)
+
+
+async def check_outline_node_tcp(node: OutlineNode, settings: Settings) -> tuple[str, float | None, str | None]:
+    latency_ms = None
+    error_text = None
+    try:
+        timings = await probe_tcp(node.host, node.port, settings.outline_healthcheck_timeout_seconds)
+        latency_ms = timings.tcp_ms
+        observe_probe_timings(probe_label(node), timings, latency_ms)
+    except OutlineClientError as exc:
+        error_text = str(exc)
+    status = evaluate_status(latency_ms, error_text, settings)
+    return status, latency_ms, error_text
+
+
 async def check_outline_node(node: OutlineNode, settings: Settings, transport: httpx.AsyncBaseTransport | None = None) -> tuple[str, float | None, str | None]:
+    if settings.outline_healthcheck_probe == "tcp":
+        return await check_outline_node_tcp(node, settings)
     if not node.api_url or not node.api_key:
         return OutlineHealthStatus.down.value, None, "outline_api_not_configured"
     start = time.perf_counter()
@@ -40,59 +132,267 @@ async def check_outline_node(node: OutlineNode, settings: Settings, transport: h
         timeout=settings.outline_healthcheck_timeout_seconds,
         transport=transport,
     )
+    tracer = ProbeTracer()
     latency_ms = None
     error_text = None
     try:
-        await client.health_check()
+        await client.health_check(settings.outline_healthcheck_probe, trace=tracer)
         latency_ms = (time.perf_counter() - start) * 1000
     except OutlineClientError as exc:
         error_text = str(exc)
     except httpx.HTTPError as exc:
         error_text = str(exc)
+    observe_probe_timings(probe_label(node), tracer.timings, latency_ms)
     status = evaluate_status(latency_ms, error_text, settings)
     return status, latency_ms, error_text
 
 
-async def update_node_health(
+async def probe_outline_nodes(
+    nodes: list[OutlineNode],
+    settings: Settings,
+    transport: httpx.AsyncBaseTransport | None = None,
+) -> dict[int, tuple[str, float | None, str | None]]:
+    semaphore = asyncio.Semaphore(max(settings.outline_healthcheck_concurrency, 1))
+    results: dict[int, tuple[str, float | None, str | None]] = {}
+
+    async def probe(node: OutlineNode) -> None:
+        async with semaphore:
+            results[node.id] = await check_outline_node(node, settings, transport=transport)
+
+    tasks = [asyncio.create_task(probe(node)) for node in nodes]
+    if not tasks:
+        return results
+    deadline = settings.outline_healthcheck_cycle_deadline_seconds or None
+    _, pending = await asyncio.wait(tasks, timeout=deadline)
+    for task in pending:
+        task.cancel()
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+        logger.warning("outline_healthcheck_deadline_exceeded", extra={"pending": len(pending)})
+    return results
+
+
+async def update_nodes_health(
+    session: AsyncSession,
+    nodes: list[OutlineNode],
+    results: dict[int, tuple[str, float | None, str | None]],
+    settings: Settings,
+) -> dict[int, str]:
+    checked_at = datetime.now(timezone.utc)
+    rows = []
+    statuses = {}
+    for node in nodes:
+        if node.id not in results:
+            continue
+        _, latency_ms, error_text = results[node.id]
+        status, columns = record_health_sample(node, latency_ms, error_text, settings)
+        statuses[node.id] = status
+        rows.append(
+            {
+                "id": node.id,
+                "last_check_at": checked_at,
+                "last_check_status": status,
+                "last_error": error_text,
+                **columns,
+            }
+        )
+        if node.last_check_status != status:
+            logger.info("outline_node_status_changed", extra={"node_id": node.id, "from": node.last_check_status, "to": status})
+    if rows:
+        await session.execute(update(OutlineNode), rows)
+    return statuses
+
+
+class HealthCheckScheduler:
+    def __init__(self):
+        self._queue: list[tuple[float, int, int]] = []
+        self._due: dict[int, float] = {}
+        self._failures: dict[int, int] = {}
+        self._sequence = 0
+        self._wakeup: asyncio.Event | None = None
+
+    def __len__(self) -> int:
+        return len(self._due)
+
+    def reset(self) -> None:
+        self._queue.clear()
+        self._due.clear()
+        self._failures.clear()
+        self._wakeup = None
+
+    def wakeup_event(self) -> asyncio.Event:
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        return self._wakeup
+
+    def schedule(self, node_id: int, due_at: float) -> None:
+        self._sequence += 1
+        self._due[node_id] = due_at
+        heapq.heappush(self._queue, (due_at, self._sequence, node_id))
+
+    def sync(self, node_ids: list[int], settings: Settings, now: float | None = None) -> None:
+        now = time.monotonic() if now is None else now
+        active = set(node_ids)
+        for node_id in list(self._due):
+            if node_id not in active:
+                del self._due[node_id]
+                self._failures.pop(node_id, None)
+        new_nodes = [node_id for node_id in node_ids if node_id not in self._due]
+        spread = settings.outline_healthcheck_interval_seconds
+        for index, node_id in enumerate(new_nodes):
+            self.schedule(node_id, now + spread * index / len(new_nodes))
+
+    def next_interval(self, node_id: int, status: str, settings: Settings) -> float:
+        if status == OutlineHealthStatus.healthy.value:
+            self._failures.pop(node_id, None)
+            jitter = settings.outline_healthcheck_interval_seconds * settings.outline_healthcheck_jitter_ratio
+            return settings.outline_healthcheck_interval_seconds + random.uniform(-jitter, jitter)
+        failures = self._failures.get(node_id, 0)
+        self._failures[node_id] = failures + 1
+        backoff = settings.outline_healthcheck_backoff_min_seconds * 2**failures
+        return min(backoff, settings.outline_healthcheck_backoff_max_seconds)
+
+    def reschedule(self, node_id: int, status: str, settings: Settings, now: float | None = None) -> float:
+        now = time.monotonic() if now is None else now
+        due_at = now + self.next_interval(node_id, status, settings)
+        self.schedule(node_id, due_at)
+        return due_at
+
+    def request(self, node_id: int, now: float | None = None) -> None:
+        self.schedule(node_id, time.monotonic() if now is None else now)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def pop_due(self, now: float | None = None) -> list[int]:
+        now = time.monotonic() if now is None else now
+        due = []
+        while self._queue and self._queue[0][0] <= now:
+            due_at, _, node_id = heapq.heappop(self._queue)
+            if self._due.get(node_id) == due_at:
+                del self._due[node_id]
+                due.append(node_id)
+        return due
+
+    def seconds_until_next(self, now: float | None = None) -> float | None:
+        now = time.monotonic() if now is None else now
+        while self._queue and self._due.get(self._queue[0][2]) != self._queue[0][0]:
+            heapq.heappop(self._queue)
+        if not self._queue:
+            return None
+        return max(self._queue[0][0] - now, 0.0)
+
+
+health_scheduler = HealthCheckScheduler()
+
+
+async def sync_health_schedule(session: AsyncSession, settings: Settings, scheduler: HealthCheckScheduler = health_scheduler) -> None:
+    result = await session.scalars(
+        select(OutlineNode.id)
+        .where(OutlineNode.is_active.is_(True), OutlineNode.is_deleted.is_(False))
+        .order_by(OutlineNode.id)
+    )
+    scheduler.sync(list(result.all()), settings)
+
+
+async def record_healthchecks(
     session: AsyncSession,
-    node: OutlineNode,
-    status: str,
-    latency_ms: float | None,
-    error_text: str | None,
-) -> None:
-    previous_status = node.last_check_status
-    node.last_check_at = datetime.now(timezone.utc)
-    node.last_check_status = status
-    node.recent_latency_ms = int(latency_ms) if latency_ms is not None else None
-    node.last_error = error_text
-    await session.flush()
-    if previous_status != status:
-        logger.info("outline_node_status_changed", extra={"node_id": node.id, "from": previous_status, "to": status})
-
-
-async def run_healthcheck_cycle(session: AsyncSession, settings: Settings, transport: httpx.AsyncBaseTransport | None = None) -> None:
+    nodes: list[OutlineNode],
+    settings: Settings,
+    transport: httpx.AsyncBaseTransport | None = None,
+) -> dict[int, str]:
+    started_at = datetime.now(timezone.utc)
+    previous = {node.id: node.last_check_status for node in nodes}
+    results = await probe_outline_nodes(nodes, settings, transport=transport)
+    statuses = await update_nodes_health(session, nodes, results, settings)
+    await session.execute(
+        update(OutlineNode)
+        .where(
+            OutlineNode.id.in_([node.id for node in nodes]),
+            OutlineNode.health_check_requested_at <= started_at,
+        )
+        .values(health_check_requested_at=None)
+        .execution_options(synchronize_session=False)
+    )
+    await health_history.persist(session, settings)
+    await session.commit()
+    if any(previous.get(node_id) != status for node_id, status in statuses.items()):
+        outline_topology.invalidate()
+    return statuses
+
+
+async def run_scheduled_healthchecks(
+    session: AsyncSession,
+    settings: Settings,
+    scheduler: HealthCheckScheduler = health_scheduler,
+    transport: httpx.AsyncBaseTransport | None = None,
+) -> int:
+    due = scheduler.pop_due()
+    if not due:
+        return 0
     result = await session.scalars(
-        select(OutlineNode).where(OutlineNode.is_active.is_(True), OutlineNode.is_deleted.is_(False))
+        select(OutlineNode).where(
+            OutlineNode.id.in_(due),
+            OutlineNode.is_active.is_(True),
+            OutlineNode.is_deleted.is_(False),
+        )
     )
     nodes = result.all()
+    statuses = await record_healthchecks(session, nodes, settings, transport=transport)
     for node in nodes:
-        status, latency_ms, error_text = await check_outline_node(node, settings, transport=transport)
-        await update_node_health(session, node, status, latency_ms, error_text)
-    await session.commit()
+        scheduler.reschedule(node.id, statuses.get(node.id, OutlineHealthStatus.unknown.value), settings)
+    if load_snapshot.is_stale(settings.outline_load_snapshot_ttl_seconds):
+        await load_snapshot.refresh(session)
+    return len(nodes)
+
+
+async def collect_requested_healthchecks(session: AsyncSession, scheduler: HealthCheckScheduler = health_scheduler) -> list[int]:
+    result = await session.scalars(
+        select(OutlineNode.id).where(
+            OutlineNode.health_check_requested_at.is_not(None),
+            OutlineNode.is_active.is_(True),
+            OutlineNode.is_deleted.is_(False),
+        )
+    )
+    node_ids = list(result.all())
+    now = time.monotonic()
+    for node_id in node_ids:
+        scheduler.request(node_id, now)
+    return node_ids
 
 
 async def outline_healthcheck_loop(settings: Settings) -> None:
     if settings.outline_healthcheck_interval_seconds <= 0:
         return
+    wakeup = health_scheduler.wakeup_event()
+    synced_at = None
     while True:
+        leader = False
         try:
-            async with SessionLocal() as session:
-                await run_healthcheck_cycle(session, settings)
+            leader = await background_leader.ensure(settings)
+            if leader:
+                async with SessionLocal() as session:
+                    if synced_at is None or time.monotonic() - synced_at >= settings.outline_healthcheck_interval_seconds:
+                        await sync_health_schedule(session, settings)
+                        synced_at = time.monotonic()
+                    await collect_requested_healthchecks(session)
+                    await run_scheduled_healthchecks(session, settings)
+            elif synced_at is not None:
+                health_scheduler.reset()
+                wakeup = health_scheduler.wakeup_event()
+                synced_at = None
         except asyncio.CancelledError:
             raise
         except Exception:
             logger.exception("outline_healthcheck_failed")
-        await asyncio.sleep(settings.outline_healthcheck_interval_seconds)
+        delay = health_scheduler.seconds_until_next() if leader else settings.leader_check_interval_seconds
+        if delay is None:
+            delay = settings.outline_healthcheck_interval_seconds
+        if leader:
+            delay = min(delay, settings.leader_check_interval_seconds, settings.outline_healthcheck_request_poll_seconds)
+        delay = max(delay, settings.outline_healthcheck_min_tick_seconds)
+        wakeup.clear()
+        with suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(wakeup.wait(), timeout=delay)
 
 
 async def start_outline_healthcheck_background(settings: Settings) -> asyncio.Task | None:
@@ -102,16 +402,25 @@ async def start_outline_healthcheck_background(settings: Settings) -> asyncio.Ta
     return task
 
 
-async def trigger_outline_healthcheck(
-    session: AsyncSession, node_id: int, settings: Settings, transport: httpx.AsyncBaseTransport | None = None
-) -> OutlineNode | None:
-    node = await session.scalar(
-        select(OutlineNode).where(OutlineNode.id == node_id, OutlineNode.is_deleted.is_(False))
+async def request_outline_healthcheck(session: AsyncSession, node_id: int) -> bool:
+    result = await session.execute(
+        update(OutlineNode)
+        .where(OutlineNode.id == node_id, OutlineNode.is_deleted.is_(False))
+        .values(health_check_requested_at=datetime.now(timezone.utc))
+        .execution_options(synchronize_session=False)
     )
-    if not node:
-        return None
-    status, latency_ms, error_text = await check_outline_node(node, settings, transport=transport)
-    await update_node_health(session, node, status, latency_ms, error_text)
     await session.commit()
-    await session.refresh(node)
-    return node
+    return bool(result.rowcount)
+
+
+async def run_outline_healthcheck(
+    session: AsyncSession,
+    node_id: int,
+    settings: Settings,
+    transport: httpx.AsyncBaseTransport | None = None,
+) -> bool:
+    node = await session.scalar(select(OutlineNode).where(OutlineNode.id == node_id, OutlineNode.is_deleted.is_(False)))
+    if not node:
+        return False
+    await record_healthchecks(session, [node], settings, transport=transport)
+    return True
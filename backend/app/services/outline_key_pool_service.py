@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import httpx
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.clients.outline_client import OutlineClient, OutlineClientError, OutlineKeyData, get_outline_client
+from app.core.config import Settings
+from app.core.database import SessionLocal
+from app.models.outline_access_key import OutlineAccessKey
+from app.models.outline_node import OutlineNode
+from app.models.outline_pool import OutlinePool
+from app.models.outline_pool_node import OutlinePoolNode
+from app.services.leader_election_service import background_leader
+from app.services.outline_health_service import OutlineHealthStatus
+
+
+logger = logging.getLogger(__name__)
+
+
+async def claim_pooled_key(session: AsyncSession, node_id: int, device_pk: int) -> OutlineAccessKey | None:
+    candidate = (
+        select(OutlineAccessKey.id)
+        .where(
+            OutlineAccessKey.outline_node_id == node_id,
+            OutlineAccessKey.device_id.is_(None),
+            OutlineAccessKey.revoked.is_(False),
+        )
+        .order_by(OutlineAccessKey.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    statement = (
+        update(OutlineAccessKey)
+        .where(OutlineAccessKey.id == candidate, OutlineAccessKey.device_id.is_(None))
+        .values(device_id=device_pk, assigned_at=func.now())
+        .returning(OutlineAccessKey)
+        .execution_options(synchronize_session=False)
+    )
+    return await session.scalar(statement)
+
+
+async def count_pooled_keys(session: AsyncSession) -> dict[int, int]:
+    result = await session.execute(
+        select(OutlineAccessKey.outline_node_id, func.count(OutlineAccessKey.id))
+        .where(OutlineAccessKey.device_id.is_(None), OutlineAccessKey.revoked.is_(False))
+        .group_by(OutlineAccessKey.outline_node_id)
+    )
+    return {node_id: count for node_id, count in result.all()}
+
+
+async def resolve_key_pool_targets(session: AsyncSession, settings: Settings) -> list[tuple[OutlineNode, int]]:
+    result = await session.scalars(
+        select(OutlineNode).where(
+            OutlineNode.is_active.is_(True),
+            OutlineNode.is_deleted.is_(False),
+            OutlineNode.api_url.is_not(None),
+            OutlineNode.api_key.is_not(None),
+            OutlineNode.last_check_status == OutlineHealthStatus.healthy.value,
+        )
+    )
+    nodes = result.all()
+    pool_sizes = await session.execute(
+        select(OutlinePoolNode.outline_node_id, func.max(OutlinePool.key_pool_size))
+        .join(OutlinePool, OutlinePool.id == OutlinePoolNode.pool_id)
+        .where(OutlinePool.is_active.is_(True), OutlinePoolNode.is_active.is_(True))
+        .group_by(OutlinePoolNode.outline_node_id)
+    )
+    pool_targets = {node_id: size for node_id, size in pool_sizes.all() if size is not None}
+    targets = []
+    for node in nodes:
+        if node.key_pool_size is not None:
+            target = node.key_pool_size
+        else:
+            target = pool_targets.get(node.id, settings.outline_key_pool_size)
+        if target > 0:
+            targets.append((node, target))
+    return targets
+
+
+async def provision_keys(client: OutlineClient, count: int) -> list[OutlineKeyData]:
+    keys = []
+    for _ in range(count):
+        try:
+            keys.append(await client.create_key())
+        except (OutlineClientError, httpx.HTTPError) as exc:
+            logger.warning("outline_key_pool_provision_failed", extra={"api_url": client.api_url, "error": str(exc)})
+            break
+    return keys
+
+
+async def refill_key_pools(session: AsyncSession, settings: Settings, client_class: type[OutlineClient] = OutlineClient) -> int:
+    targets = await resolve_key_pool_targets(session, settings)
+    if not targets:
+        return 0
+    available = await count_pooled_keys(session)
+    semaphore = asyncio.Semaphore(max(settings.outline_healthcheck_concurrency, 1))
+
+    async def refill(node: OutlineNode, target: int) -> list[OutlineAccessKey]:
+        missing = min(target - available.get(node.id, 0), settings.outline_key_pool_refill_batch)
+        if missing <= 0:
+            return []
+        client = get_outline_client(node.api_url, node.api_key, client_class)
+        async with semaphore:
+            keys = await provision_keys(client, missing)
+        return [
+            OutlineAccessKey(
+                outline_node_id=node.id,
+                access_key_id=key.key_id,
+                password=key.password or node.password or "",
+                method=key.method or node.method or "chacha20-ietf-poly1305",
+                port=key.port or node.port,
+                access_url=key.access_url,
+            )
+            for key in keys
+        ]
+
+    batches = await asyncio.gather(*(refill(node, target) for node, target in targets))
+    created = [key for batch in batches for key in batch]
+    if created:
+        session.add_all(created)
+        await session.commit()
+    return len(created)
+
+
+async def outline_key_pool_loop(settings: Settings) -> None:
+    if settings.outline_key_pool_refill_interval_seconds <= 0:
+        return
+    while True:
+        try:
+            if await background_leader.ensure(settings):
+                async with SessionLocal() as session:
+                    await refill_key_pools(session, settings)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("outline_key_pool_refill_failed")
+        await asyncio.sleep(settings.outline_key_pool_refill_interval_seconds)
+
+
+async def start_outline_key_pool_background(settings: Settings) -> asyncio.Task | None:
+    if settings.outline_key_pool_refill_interval_seconds <= 0:
+        return None
+    task = asyncio.create_task(outline_key_pool_loop(settings))
+    return task
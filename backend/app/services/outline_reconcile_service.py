@@ -0,0 +1,216 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+import httpx
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.clients.outline_client import OutlineClient, OutlineClientError, node_label, outline_clients
+from app.core.config import Settings
+from app.core.database import SessionLocal
+from app.core.metrics import OUTLINE_RECONCILE_ACTIONS, OUTLINE_RECONCILE_DIFF, OUTLINE_RECONCILE_DURATION
+from app.models.outline_access_key import OutlineAccessKey
+from app.models.outline_node import OutlineNode
+from app.services.leader_election_service import background_leader
+from app.services.outline_selection_service import load_snapshot
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class NodeReconcileResult:
+    node_id: int
+    remote_keys: int = 0
+    orphaned: set[str] = field(default_factory=set)
+    deleted: set[str] = field(default_factory=set)
+    drifted: set[int] = field(default_factory=set)
+    error: str | None = None
+
+
+@dataclass
+class RemoteListing:
+    key_ids: set[str]
+    listed_at: datetime
+    duration: float
+
+
+class OutlineKeyReconciler:
+    def __init__(self):
+        self._orphan_candidates: dict[int, set[str]] = {}
+
+    def reset(self) -> None:
+        self._orphan_candidates.clear()
+
+    def client_for(self, node: OutlineNode, settings: Settings, transport: httpx.AsyncBaseTransport | None) -> OutlineClient:
+        if transport is None:
+            return outline_clients.client_for(node.api_url, node.api_key, timeout=settings.outline_reconcile_timeout_seconds)
+        return OutlineClient(node.api_url, node.api_key, timeout=settings.outline_reconcile_timeout_seconds, transport=transport)
+
+    async def list_remote_keys(self, client: OutlineClient) -> RemoteListing:
+        listed_at = datetime.now(timezone.utc)
+        start = time.perf_counter()
+        keys = await client.list_keys()
+        return RemoteListing({key.key_id for key in keys}, listed_at, time.perf_counter() - start)
+
+    async def delete_orphans(self, client: OutlineClient, key_ids: set[str], semaphore: asyncio.Semaphore) -> set[str]:
+        async def delete(key_id: str) -> str | None:
+            async with semaphore:
+                try:
+                    await client.delete_key(key_id)
+                except (OutlineClientError, httpx.HTTPError):
+                    logger.warning("outline_reconcile_delete_failed", extra={"api_url": client.api_url, "key_id": key_id}, exc_info=True)
+                    return None
+            return key_id
+
+        deleted = await asyncio.gather(*(delete(key_id) for key_id in sorted(key_ids)))
+        return {key_id for key_id in deleted if key_id is not None}
+
+    async def run(
+        self,
+        session: AsyncSession,
+        settings: Settings,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> dict[int, NodeReconcileResult]:
+        result = await session.scalars(
+            select(OutlineNode).where(
+                OutlineNode.is_active.is_(True),
+                OutlineNode.is_deleted.is_(False),
+                OutlineNode.api_url.is_not(None),
+                OutlineNode.api_key.is_not(None),
+            )
+        )
+        nodes = result.all()
+        if not nodes:
+            return {}
+        semaphore = asyncio.Semaphore(max(settings.outline_reconcile_concurrency, 1))
+        clients = {node.id: self.client_for(node, settings, transport) for node in nodes}
+        results = {node.id: NodeReconcileResult(node_id=node.id) for node in nodes}
+
+        async def list_node(node: OutlineNode) -> RemoteListing | None:
+            async with semaphore:
+                try:
+                    return await self.list_remote_keys(clients[node.id])
+                except (OutlineClientError, httpx.HTTPError, ValueError) as exc:
+                    results[node.id].error = str(exc) or exc.__class__.__name__
+                    OUTLINE_RECONCILE_ACTIONS.labels(node=node_label(node.api_url), action="list_failed").inc()
+                    logger.warning("outline_reconcile_list_failed", extra={"node_id": node.id, "error": str(exc)})
+                    return None
+
+        listings = dict(zip([node.id for node in nodes], await asyncio.gather(*(list_node(node) for node in nodes))))
+        listed_ids = [node_id for node_id, listing in listings.items() if listing is not None]
+        if not listed_ids:
+            return results
+        rows = await session.execute(
+            select(OutlineAccessKey.id, OutlineAccessKey.outline_node_id, OutlineAccessKey.access_key_id, OutlineAccessKey.device_id, OutlineAccessKey.created_at).where(
+                OutlineAccessKey.outline_node_id.in_(listed_ids),
+                OutlineAccessKey.revoked.is_(False),
+            )
+        )
+        live_rows: dict[int, list[tuple[int, str, int | None, datetime | None]]] = {node_id: [] for node_id in listed_ids}
+        for row_id, node_id, access_key_id, device_id, created_at in rows.all():
+            live_rows[node_id].append((row_id, access_key_id, device_id, created_at))
+        grace = timedelta(seconds=settings.outline_reconcile_grace_seconds)
+        drifted_rows: list[tuple[int, int, int | None]] = []
+        deletions: dict[int, set[str]] = {}
+        for node_id in listed_ids:
+            listing = listings[node_id]
+            node_result = results[node_id]
+            node_result.remote_keys = len(listing.key_ids)
+            live_key_ids = {access_key_id for _, access_key_id, _, _ in live_rows[node_id]}
+            node_result.orphaned = listing.key_ids - live_key_ids
+            settled_rows = [
+                (row_id, access_key_id, device_id)
+                for row_id, access_key_id, device_id, created_at in live_rows[node_id]
+                if created_at is None or normalize(created_at) < listing.listed_at - grace
+            ]
+            missing = {access_key_id for _, access_key_id, _ in settled_rows} - listing.key_ids
+            for row_id, access_key_id, device_id in settled_rows:
+                if access_key_id in missing:
+                    node_result.drifted.add(row_id)
+                    drifted_rows.append((row_id, node_id, device_id))
+            confirmed = node_result.orphaned & self._orphan_candidates.get(node_id, set())
+            if confirmed:
+                deletions[node_id] = set(sorted(confirmed)[: max(settings.outline_reconcile_max_deletes, 0)])
+            self._orphan_candidates[node_id] = node_result.orphaned - deletions.get(node_id, set())
+        if drifted_rows:
+            await session.execute(
+                update(OutlineAccessKey)
+                .where(OutlineAccessKey.id.in_([row_id for row_id, _, _ in drifted_rows]))
+                .values(revoked=True)
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+            for _, node_id, device_id in drifted_rows:
+                if device_id is not None:
+                    load_snapshot.record_release(node_id)
+
+        async def clean_node(node_id: int) -> float:
+            start = time.perf_counter()
+            key_ids = deletions.get(node_id)
+            if key_ids:
+                results[node_id].deleted = await self.delete_orphans(clients[node_id], key_ids, semaphore)
+                self._orphan_candidates[node_id] |= key_ids - results[node_id].deleted
+            return time.perf_counter() - start
+
+        durations = await asyncio.gather(*(clean_node(node_id) for node_id in listed_ids))
+        nodes_by_id = {node.id: node for node in nodes}
+        for node_id, duration in zip(listed_ids, durations):
+            node_result = results[node_id]
+            label = node_label(nodes_by_id[node_id].api_url)
+            OUTLINE_RECONCILE_DURATION.labels(node=label).observe(listings[node_id].duration + duration)
+            OUTLINE_RECONCILE_DIFF.labels(node=label, kind="orphaned").set(len(node_result.orphaned))
+            OUTLINE_RECONCILE_DIFF.labels(node=label, kind="drifted").set(len(node_result.drifted))
+            OUTLINE_RECONCILE_ACTIONS.labels(node=label, action="deleted").inc(len(node_result.deleted))
+            OUTLINE_RECONCILE_ACTIONS.labels(node=label, action="revoked").inc(len(node_result.drifted))
+            if node_result.orphaned or node_result.drifted:
+                logger.info(
+                    "outline_reconcile_diff",
+                    extra={
+                        "node_id": node_id,
+                        "remote_keys": node_result.remote_keys,
+                        "orphaned": len(node_result.orphaned),
+                        "deleted": len(node_result.deleted),
+                        "drifted": len(node_result.drifted),
+                    },
+                )
+        return results
+
+
+def normalize(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+outline_reconciler = OutlineKeyReconciler()
+
+
+async def outline_reconcile_loop(settings: Settings) -> None:
+    if settings.outline_reconcile_interval_seconds <= 0:
+        return
+    tick = min(settings.outline_reconcile_interval_seconds, settings.leader_check_interval_seconds or settings.outline_reconcile_interval_seconds)
+    last_run_at = None
+    while True:
+        try:
+            if await background_leader.ensure(settings):
+                if last_run_at is None or time.monotonic() - last_run_at >= settings.outline_reconcile_interval_seconds:
+                    last_run_at = time.monotonic()
+                    async with SessionLocal() as session:
+                        await outline_reconciler.run(session, settings)
+            elif last_run_at is not None:
+                outline_reconciler.reset()
+                last_run_at = None
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("outline_reconcile_failed")
+        await asyncio.sleep(tick)
+
+
+async def start_outline_reconcile_background(settings: Settings) -> asyncio.Task | None:
+    if settings.outline_reconcile_interval_seconds <= 0:
+        return None
+    task = asyncio.create_task(outline_reconcile_loop(settings))
+    return task
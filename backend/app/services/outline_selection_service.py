@@ -0,0 +1,80 @@
+import random
+import time
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import Settings
+from app.models.outline_access_key import OutlineAccessKey
+from app.services.outline_topology_service import OutlineNodeView
+
+
+class NodeLoadSnapshot:
+    def __init__(self):
+        self._active_keys: dict[int, int] = {}
+        self._refreshed_at: float | None = None
+
+    def is_stale(self, ttl_seconds: float) -> bool:
+        return self._refreshed_at is None or time.monotonic() - self._refreshed_at > ttl_seconds
+
+    async def refresh(self, session: AsyncSession) -> None:
+        result = await session.execute(
+            select(OutlineAccessKey.outline_node_id, func.count(OutlineAccessKey.id))
+            .where(OutlineAccessKey.device_id.is_not(None), OutlineAccessKey.revoked.is_(False))
+            .group_by(OutlineAccessKey.outline_node_id)
+        )
+        self._active_keys = {node_id: count for node_id, count in result.all()}
+        self._refreshed_at = time.monotonic()
+
+    def active_keys(self, node_id: int) -> int:
+        return self._active_keys.get(node_id, 0)
+
+    def record_assignment(self, node_id: int) -> None:
+        self._active_keys[node_id] = self._active_keys.get(node_id, 0) + 1
+
+    def record_release(self, node_id: int) -> None:
+        self._active_keys[node_id] = max(self._active_keys.get(node_id, 0) - 1, 0)
+
+    def reset(self) -> None:
+        self._active_keys = {}
+        self._refreshed_at = None
+
+
+load_snapshot = NodeLoadSnapshot()
+
+
+def node_capacity(node: OutlineNodeView, settings: Settings) -> int:
+    return max(node.capacity or settings.outline_node_default_capacity, 1)
+
+
+def node_weights(nodes: list[OutlineNodeView], snapshot: NodeLoadSnapshot, settings: Settings) -> list[float]:
+    priorities = sorted({node.priority for node in nodes if node.priority is not None})
+    latency_scale = max(settings.outline_healthcheck_degraded_threshold_ms, 1)
+    weights = []
+    for node in nodes:
+        rank = priorities.index(node.priority) if node.priority is not None else len(priorities)
+        capacity = node_capacity(node, settings)
+        headroom = max(capacity - snapshot.active_keys(node.id), 0) / capacity
+        latency_factor = 1 / (1 + (node.recent_latency_ms or 0) / latency_scale)
+        weights.append(headroom * latency_factor / (1 + rank))
+    return weights
+
+
+def choose_outline_node(
+    nodes: list[OutlineNodeView],
+    settings: Settings,
+    snapshot: NodeLoadSnapshot = load_snapshot,
+    rng: random.Random | None = None,
+) -> OutlineNodeView:
+    if len(nodes) == 1 or settings.outline_node_selection_strategy == "priority":
+        return nodes[0]
+    rng = rng or random
+    weights = node_weights(nodes, snapshot, settings)
+    if not any(weights):
+        return min(nodes, key=lambda node: snapshot.active_keys(node.id) / node_capacity(node, settings))
+    first = rng.choices(range(len(nodes)), weights=weights)[0]
+    if settings.outline_node_selection_strategy == "weighted":
+        return nodes[first]
+    remaining = [index for index in range(len(nodes)) if index != first and weights[index] > 0]
+    if not remaining:
+        return nodes[first]
+    second = rng.choices(remaining, weights=[weights[index] for index in remaining])[0]
+    return nodes[first] if weights[first] >= weights[second] else nodes[second]
@@ -0,0 +1,163 @@
+import time
+from dataclasses import dataclass, field
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.outline_node import OutlineNode
+from app.models.outline_pool import OutlinePool
+from app.models.outline_pool_node import OutlinePoolNode
+from app.models.outline_pool_region import OutlinePoolRegion
+from app.models.region import Region
+
+
+@dataclass(frozen=True)
+class OutlineNodeView:
+    id: int
+    name: str | None
+    host: str
+    port: int
+    method: str | None
+    password: str | None
+    api_url: str | None
+    api_key: str | None
+    tag: str | None
+    priority: int | None
+    capacity: int | None
+    key_pool_size: int | None
+    last_check_status: str | None
+    recent_latency_ms: int | None
+    region_id: int | None
+    region_code: str | None
+
+
+@dataclass(frozen=True)
+class OutlinePoolView:
+    id: int
+    code: str
+    key_pool_size: int | None
+    region_ids: tuple[int, ...]
+    nodes: tuple[OutlineNodeView, ...]
+
+
+@dataclass
+class OutlineTopology:
+    version: int
+    regions: dict[str, int] = field(default_factory=dict)
+    nodes: dict[int, OutlineNodeView] = field(default_factory=dict)
+    active_nodes: list[OutlineNodeView] = field(default_factory=list)
+    pools: dict[str, OutlinePoolView] = field(default_factory=dict)
+
+    def region_nodes(self, region_code: str | None) -> list[OutlineNodeView]:
+        region_id = self.regions.get(region_code) if region_code else None
+        if region_id is not None:
+            nodes = [node for node in self.active_nodes if node.region_id == region_id]
+            if nodes:
+                return nodes
+        return list(self.active_nodes)
+
+    def pool_nodes(self, pool: OutlinePoolView, region_code: str | None) -> list[OutlineNodeView]:
+        region_id = self.regions.get(region_code) if region_code else None
+        region_ids = (region_id,) if region_id is not None else pool.region_ids
+        for candidate in region_ids:
+            nodes = [node for node in pool.nodes if node.region_id == candidate]
+            if nodes:
+                return nodes
+        return list(pool.nodes)
+
+
+def build_node_view(node: OutlineNode, region_codes: dict[int, str]) -> OutlineNodeView:
+    return OutlineNodeView(
+        id=node.id,
+        name=node.name,
+        host=node.host,
+        port=node.port,
+        method=node.method,
+        password=node.password,
+        api_url=node.api_url,
+        api_key=node.api_key,
+        tag=node.tag,
+        priority=node.priority,
+        capacity=node.capacity,
+        key_pool_size=node.key_pool_size,
+        last_check_status=node.last_check_status,
+        recent_latency_ms=node.recent_latency_ms,
+        region_id=node.region_id,
+        region_code=region_codes.get(node.region_id) if node.region_id is not None else None,
+    )
+
+
+async def load_outline_topology(session: AsyncSession, version: int) -> OutlineTopology:
+    regions = (await session.execute(select(Region.id, Region.code))).all()
+    region_codes = {region_id: code for region_id, code in regions}
+    topology = OutlineTopology(version=version, regions={code: region_id for region_id, code in regions})
+    nodes = await session.scalars(
+        select(OutlineNode)
+        .where(OutlineNode.is_active.is_(True), OutlineNode.is_deleted.is_(False))
+        .order_by(OutlineNode.priority.is_(None), OutlineNode.priority, OutlineNode.id)
+    )
+    for node in nodes:
+        view = build_node_view(node, region_codes)
+        topology.nodes[view.id] = view
+        topology.active_nodes.append(view)
+    pools = (await session.scalars(select(OutlinePool).where(OutlinePool.is_active.is_(True)))).all()
+    pool_regions = await session.execute(
+        select(OutlinePoolRegion.pool_id, OutlinePoolRegion.region_id)
+        .where(OutlinePoolRegion.is_active.is_(True))
+        .order_by(OutlinePoolRegion.priority.is_(None), OutlinePoolRegion.priority, OutlinePoolRegion.id)
+    )
+    pool_nodes = await session.execute(
+        select(OutlinePoolNode.pool_id, OutlinePoolNode.outline_node_id, OutlinePoolNode.priority).where(
+            OutlinePoolNode.is_active.is_(True)
+        )
+    )
+    regions_by_pool: dict[int, list[int]] = {}
+    for pool_id, region_id in pool_regions.all():
+        regions_by_pool.setdefault(pool_id, []).append(region_id)
+    node_order = {view.id: index for index, view in enumerate(topology.active_nodes)}
+    nodes_by_pool: dict[int, list[tuple[tuple[bool, int, int], OutlineNodeView]]] = {}
+    for pool_id, node_id, priority in pool_nodes.all():
+        view = topology.nodes.get(node_id)
+        if view:
+            sort_key = (priority is None, priority or 0, node_order[node_id])
+            nodes_by_pool.setdefault(pool_id, []).append((sort_key, view))
+    for pool in pools:
+        ordered = sorted(nodes_by_pool.get(pool.id, []), key=lambda item: item[0])
+        topology.pools[pool.code] = OutlinePoolView(
+            id=pool.id,
+            code=pool.code,
+            key_pool_size=pool.key_pool_size,
+            region_ids=tuple(regions_by_pool.get(pool.id, [])),
+            nodes=tuple(view for _, view in ordered),
+        )
+    return topology
+
+
+class OutlineTopologyCache:
+    def __init__(self):
+        self._topology: OutlineTopology | None = None
+        self._built_at: float | None = None
+        self._version = 0
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def invalidate(self) -> None:
+        self._version += 1
+        self._topology = None
+
+    async def rebuild(self, session: AsyncSession) -> OutlineTopology:
+        self._version += 1
+        topology = await load_outline_topology(session, self._version)
+        if topology.version == self._version:
+            self._topology = topology
+            self._built_at = time.monotonic()
+        return topology
+
+    async def get(self, session: AsyncSession, ttl_seconds: float) -> OutlineTopology:
+        topology = self._topology
+        if topology is None or self._built_at is None or time.monotonic() - self._built_at > ttl_seconds:
+            topology = await self.rebuild(session)
+        return topology
+
+
+outline_topology = OutlineTopologyCache()
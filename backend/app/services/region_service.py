@@ -1,6 +1,7 @@
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.region import Region
+from app.services.outline_topology_service import outline_topology
 
 
 class RegionNotFound(Exception):
@@ -34,6 +35,7 @@ async def create_region(session: AsyncSession, data: dict) -> Region:
     region = Region(**data)
     session.add(region)
     await session.commit()
+    outline_topology.invalidate()
     await session.refresh(region)
     return region
 
@@ -47,6 +49,7 @@ async def update_region(session: AsyncSession, region_id: int, data: dict) -> Re
     for key, value in data.items():
         setattr(region, key, value)
     await session.commit()
+    outline_topology.invalidate()
     await session.refresh(region)
     return region
 
@@ -55,3 +58,4 @@ async def delete_region(session: AsyncSession, region_id: int) -> None:
     region = await get_region(session, region_id)
     await session.delete(region)
     await session.commit()
+    outline_topology.invalidate()
@@ -1,18 +1,152 @@
-from sqlalchemy import select
+import asyncio
+import logging
+import time
+from sqlalchemy import BigInteger, Integer, bindparam, column, func, select, update, values
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import Settings
+from app.core.database import SessionLocal
+from app.core.metrics import USAGE_FLUSH_DURATION, USAGE_PENDING_SESSIONS
 from app.models.session import Session
+from app.schemas.usage import UsageReport
+
+
+logger = logging.getLogger(__name__)
 
 
 async def get_session_by_id(session: AsyncSession, session_id: int) -> Session | None:
     return await session.scalar(select(Session).where(Session.id == session_id))
 
 
-async def apply_usage(session: AsyncSession, session_id: int | None, bytes_up: int, bytes_down: int) -> None:
+async def increment_session_usage(session: AsyncSession, deltas: dict[int, tuple[int, int]]) -> None:
+    if not deltas:
+        return
+    table = Session.__table__
+    if session.get_bind().dialect.name == "postgresql":
+        batch = values(
+            column("id", Integer), column("up", BigInteger), column("down", BigInteger), name="v"
+        ).data([(session_id, up, down) for session_id, (up, down) in deltas.items()])
+        await session.execute(
+            update(table)
+            .where(table.c.id == batch.c.id)
+            .values(
+                bytes_up=func.coalesce(table.c.bytes_up, 0) + batch.c.up,
+                bytes_down=func.coalesce(table.c.bytes_down, 0) + batch.c.down,
+            )
+        )
+        return
+    await session.execute(
+        update(table)
+        .where(table.c.id == bindparam("session_id"))
+        .values(
+            bytes_up=func.coalesce(table.c.bytes_up, 0) + bindparam("up"),
+            bytes_down=func.coalesce(table.c.bytes_down, 0) + bindparam("down"),
+        ),
+        [{"session_id": session_id, "up": up, "down": down} for session_id, (up, down) in deltas.items()],
+    )
+
+
+class UsageAggregator:
+    def __init__(self):
+        self._pending: dict[int, tuple[int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(self, session_id: int, bytes_up: int, bytes_down: int) -> int:
+        up, down = self._pending.get(session_id, (0, 0))
+        self._pending[session_id] = (up + bytes_up, down + bytes_down)
+        USAGE_PENDING_SESSIONS.set(len(self._pending))
+        return len(self._pending)
+
+    def clear(self) -> None:
+        self._pending = {}
+        USAGE_PENDING_SESSIONS.set(0)
+
+    def _restore(self, deltas: dict[int, tuple[int, int]]) -> None:
+        for session_id, (up, down) in deltas.items():
+            self.add(session_id, up, down)
+
+    async def flush(self, session: AsyncSession) -> int:
+        deltas, self._pending = self._pending, {}
+        USAGE_PENDING_SESSIONS.set(0)
+        if not deltas:
+            return 0
+        start = time.perf_counter()
+        try:
+            await increment_session_usage(session, deltas)
+            await session.commit()
+        except BaseException:
+            self._restore(deltas)
+            raise
+        finally:
+            USAGE_FLUSH_DURATION.observe(time.perf_counter() - start)
+        return len(deltas)
+
+
+usage_aggregator = UsageAggregator()
+
+
+async def apply_usage(session: AsyncSession, session_id: int | None, bytes_up: int, bytes_down: int, settings: Settings) -> None:
     if session_id is None:
         return
-    record = await get_session_by_id(session, session_id)
-    if not record:
+    pending = usage_aggregator.add(session_id, bytes_up, bytes_down)
+    if settings.usage_flush_interval_seconds <= 0 or pending >= settings.usage_flush_max_pending:
+        try:
+            await usage_aggregator.flush(session)
+        except Exception:
+            await session.rollback()
+            logger.exception("usage_flush_failed", extra={"pending": len(usage_aggregator)})
+
+
+async def apply_usage_batch(session: AsyncSession, reports: list[UsageReport]) -> list[str]:
+    session_ids = {report.session_id for report in reports if report.session_id is not None}
+    known_ids = set()
+    if session_ids:
+        known_ids = set((await session.scalars(select(Session.id).where(Session.id.in_(session_ids)))).all())
+    deltas: dict[int, tuple[int, int]] = {}
+    statuses = []
+    for report in reports:
+        if report.session_id is None:
+            statuses.append("ignored")
+            continue
+        if report.session_id not in known_ids:
+            statuses.append("not_found")
+            continue
+        up, down = deltas.get(report.session_id, (0, 0))
+        deltas[report.session_id] = (up + report.bytes_up, down + report.bytes_down)
+        statuses.append("accepted")
+    if deltas:
+        await increment_session_usage(session, deltas)
+        await session.commit()
+    return statuses
+
+
+async def usage_flush_loop(settings: Settings) -> None:
+    if settings.usage_flush_interval_seconds <= 0:
+        return
+    while True:
+        await asyncio.sleep(settings.usage_flush_interval_seconds)
+        try:
+            async with SessionLocal() as session:
+                await usage_aggregator.flush(session)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("usage_flush_failed")
+
+
+async def start_usage_flush_background(settings: Settings) -> asyncio.Task | None:
+    if settings.usage_flush_interval_seconds <= 0:
+        return None
+    task = asyncio.create_task(usage_flush_loop(settings))
+    return task
+
+
+async def drain_usage() -> None:
+    if not len(usage_aggregator):
         return
-    record.bytes_up = (record.bytes_up or 0) + bytes_up
-    record.bytes_down = (record.bytes_down or 0) + bytes_down
-    await session.commit()
+    try:
+        async with SessionLocal() as session:
+            await usage_aggregator.flush(session)
+    except Exception:
+        logger.exception("usage_drain_failed")
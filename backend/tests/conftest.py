@@ -10,6 +10,8 @@ os.environ.setdefault("OUTLINE_HEALTHCHECK_INTERVAL_SECONDS", "0")
 os.environ.setdefault("OUTLINE_HEALTHCHECK_TIMEOUT_SECONDS", "1")
 os.environ.setdefault("OUTLINE_HEALTHCHECK_DEGRADED_THRESHOLD_MS", "500")
 
+from contextlib import contextmanager
+import pytest
 import pytest_asyncio
 import httpx
 from httpx import ASGITransport
@@ -17,17 +19,28 @@ from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from app.db import Base
 from app.core.config import get_settings
-from app.core.database import get_session
+from app.core.database import get_session, instrument_engine
+from app.core.tracing import track_queries
 from app.main import app
 from app.models.user import User
 from app.models.device import Device
+from app.services.admission_service import admission
+from app.services.auth_service import entitlement_cache
+from app.services.httvps_session_service import revoked_sessions
+from app.services.leader_election_service import background_leader
+from app.services.outline_health_history_service import health_history
+from app.services.outline_health_service import health_scheduler
+from app.services.outline_reconcile_service import outline_reconciler
+from app.services.outline_selection_service import load_snapshot
+from app.services.sessions_service import usage_aggregator
+from app.services.outline_topology_service import outline_topology
 
 get_settings.cache_clear()
 
 
 @pytest_asyncio.fixture
 async def test_app():
-    engine = create_async_engine(os.environ["BACKEND_DB_DSN"], future=True)
+    engine = instrument_engine(create_async_engine(os.environ["BACKEND_DB_DSN"], future=True))
     TestSession = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
@@ -35,6 +48,16 @@ async def test_app():
         async with TestSession() as session:
             yield session
     app.dependency_overrides[get_session] = override_session
+    load_snapshot.reset()
+    admission.reset()
+    background_leader.reset()
+    health_history.reset()
+    health_scheduler.reset()
+    outline_reconciler.reset()
+    entitlement_cache.clear()
+    usage_aggregator.clear()
+    outline_topology.invalidate()
+    revoked_sessions.configure(get_settings(), TestSession)
     app.state.test_session_maker = TestSession
     yield app
     await engine.dispose()
@@ -59,3 +82,14 @@ async def setup_device(test_app):
         await session.commit()
         await session.refresh(device)
         return device
+
+
+@pytest.fixture
+def query_budget():
+    @contextmanager
+    def budget(limit: int):
+        with track_queries() as stats:
+            yield stats
+        assert stats.count <= limit, f"expected at most {limit} queries, got {stats.count}"
+
+    return budget
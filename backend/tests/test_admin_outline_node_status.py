@@ -0,0 +1,111 @@
+import pytest
+from sqlalchemy import select
+from app.core.config import get_settings
+from app.models.outline_access_key import OutlineAccessKey
+from app.models.outline_node import OutlineNode
+from app.models.region import Region
+from app.services.outline_health_history_service import health_history
+from app.services.outline_health_service import update_nodes_health
+
+ADMIN_HEADERS = {"X-Admin-Token": "test"}
+
+
+async def seed_nodes(test_app, device_pk: int) -> list[int]:
+    async with test_app.state.test_session_maker() as session:
+        eu = Region(code="eu", name="Europe")
+        us = Region(code="us", name="United States")
+        session.add_all([eu, us])
+        await session.flush()
+        nodes = [
+            OutlineNode(region_id=eu.id, host="eu-1", port=1, tag="edge", priority=1, last_check_status="healthy"),
+            OutlineNode(region_id=eu.id, host="eu-2", port=1, tag="core", priority=2, last_check_status="down"),
+            OutlineNode(region_id=us.id, host="us-1", port=1, tag="edge", priority=3, last_check_status="healthy"),
+            OutlineNode(host="deleted", port=1, is_deleted=True),
+        ]
+        session.add_all(nodes)
+        await session.flush()
+        keys = [
+            OutlineAccessKey(device_id=device_pk, outline_node_id=nodes[0].id, access_key_id="1", password="p", port=1),
+            OutlineAccessKey(device_id=device_pk, outline_node_id=nodes[0].id, access_key_id="2", password="p", port=1),
+            OutlineAccessKey(device_id=device_pk, outline_node_id=nodes[0].id, access_key_id="3", password="p", port=1, revoked=True),
+            OutlineAccessKey(outline_node_id=nodes[0].id, access_key_id="4", password="p", port=1),
+            OutlineAccessKey(device_id=device_pk, outline_node_id=nodes[2].id, access_key_id="5", password="p", port=1),
+        ]
+        session.add_all(keys)
+        await session.commit()
+        return [node.id for node in nodes]
+
+
+@pytest.mark.asyncio
+async def test_list_statuses_in_one_query(client, test_app, setup_device, query_budget):
+    node_ids = await seed_nodes(test_app, setup_device.id)
+    with query_budget(1):
+        response = await client.get("/api/v1/admin/outline-nodes/", headers=ADMIN_HEADERS)
+    assert response.status_code == 200
+    body = response.json()
+    assert [item["id"] for item in body] == node_ids[:3]
+    assert [item["active_access_keys"] for item in body] == [2, 0, 1]
+    assert [item["region"] for item in body] == ["eu", "eu", "us"]
+
+
+@pytest.mark.asyncio
+async def test_list_statuses_filters_and_paginates(client, test_app, setup_device):
+    node_ids = await seed_nodes(test_app, setup_device.id)
+    by_region = await client.get("/api/v1/admin/outline-nodes/", params={"region": "eu", "status": "healthy"}, headers=ADMIN_HEADERS)
+    assert [item["id"] for item in by_region.json()] == [node_ids[0]]
+    by_tag = await client.get("/api/v1/admin/outline-nodes/", params={"tag": "edge", "limit": 1, "offset": 1}, headers=ADMIN_HEADERS)
+    assert [item["id"] for item in by_tag.json()] == [node_ids[2]]
+
+
+@pytest.mark.asyncio
+async def test_get_single_node_status(client, test_app, setup_device, query_budget):
+    node_ids = await seed_nodes(test_app, setup_device.id)
+    with query_budget(1):
+        response = await client.get(f"/api/v1/admin/outline-nodes/{node_ids[0]}", headers=ADMIN_HEADERS)
+    assert response.status_code == 200
+    assert response.json()["active_access_keys"] == 2
+    missing = await client.get(f"/api/v1/admin/outline-nodes/{node_ids[3]}", headers=ADMIN_HEADERS)
+    assert missing.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_health_history_of_unknown_node_is_not_found(client, test_app, setup_device):
+    node_ids = await seed_nodes(test_app, setup_device.id)
+    response = await client.get(f"/api/v1/admin/outline-nodes/{node_ids[0]}/health-history", headers=ADMIN_HEADERS)
+    assert response.status_code == 200
+    assert response.json() == []
+    for node_id in (node_ids[3], 10**6):
+        missing = await client.get(f"/api/v1/admin/outline-nodes/{node_id}/health-history", headers=ADMIN_HEADERS)
+        assert missing.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_manual_check_probes_inline_without_a_scheduler(client, test_app, setup_device):
+    node_ids = await seed_nodes(test_app, setup_device.id)
+    response = await client.post(f"/api/v1/admin/outline-nodes/{node_ids[1]}/check", headers=ADMIN_HEADERS)
+    assert response.status_code == 200
+    assert response.json()["id"] == node_ids[1]
+    assert response.json()["last_error"] == "outline_api_not_configured"
+    async with test_app.state.test_session_maker() as session:
+        node = await session.get(OutlineNode, node_ids[1])
+    assert node.last_check_at is not None
+    assert node.health_check_requested_at is None
+    missing = await client.post(f"/api/v1/admin/outline-nodes/{node_ids[3]}/check", headers=ADMIN_HEADERS)
+    assert missing.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_health_stats_are_served_from_the_database(client, test_app, setup_device):
+    node_ids = await seed_nodes(test_app, setup_device.id)
+    settings = get_settings()
+    async with test_app.state.test_session_maker() as session:
+        nodes = (await session.scalars(select(OutlineNode).where(OutlineNode.id == node_ids[0]))).all()
+        await update_nodes_health(session, nodes, {node_ids[0]: ("healthy", 100.0, None)}, settings)
+        await update_nodes_health(session, nodes, {node_ids[0]: ("down", None, "timeout")}, settings)
+        await session.commit()
+    health_history.reset()
+    response = await client.get(f"/api/v1/admin/outline-nodes/{node_ids[0]}", headers=ADMIN_HEADERS)
+    body = response.json()
+    assert body["latency_p50_ms"] == 100.0
+    assert body["latency_p95_ms"] == 100.0
+    assert body["error_rate"] == 0.5
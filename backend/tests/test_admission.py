@@ -0,0 +1,101 @@
+import asyncio
+import pytest
+from app.core.config import get_settings
+from app.core.security import create_token
+from app.models.device import Device
+from app.models.plan import Plan
+from app.models.subscription import Subscription, SubscriptionStatus
+from app.models.user import User
+from app.services.admission_service import AdmissionController, AdmissionOverloaded, DeviceRateLimited, admission
+
+
+def make_controller(**overrides) -> AdmissionController:
+    controller = AdmissionController()
+    controller.configure(get_settings().model_copy(update=overrides))
+    return controller
+
+
+def test_token_bucket_refills_over_time():
+    controller = make_controller(admission_device_rate_per_second=1.0, admission_device_burst=2.0)
+    assert controller.take_token("dev", now=0.0) == 0
+    assert controller.take_token("dev", now=0.0) == 0
+    assert controller.take_token("dev", now=0.0) == pytest.approx(1.0)
+    assert controller.take_token("dev", now=1.0) == 0
+    assert controller.take_token("other", now=1.0) == 0
+
+
+@pytest.mark.asyncio
+async def test_admit_rejects_devices_over_their_rate():
+    controller = make_controller(admission_device_rate_per_second=0.1, admission_device_burst=1.0)
+    async with controller.admit("test", "dev"):
+        pass
+    with pytest.raises(DeviceRateLimited) as exc:
+        async with controller.admit("test", "dev"):
+            pass
+    assert exc.value.retry_after > 0
+
+
+@pytest.mark.asyncio
+async def test_admit_sheds_after_queue_timeout():
+    controller = make_controller(
+        admission_device_rate_per_second=0,
+        admission_max_concurrency=1,
+        admission_queue_timeout_seconds=0.01,
+    )
+    async with controller.admit("test", "a"):
+        with pytest.raises(AdmissionOverloaded):
+            async with controller.admit("test", "b"):
+                pass
+    async with controller.admit("test", "c"):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_admit_sheds_when_queue_is_full():
+    controller = make_controller(
+        admission_device_rate_per_second=0,
+        admission_max_concurrency=1,
+        admission_max_queue=1,
+        admission_queue_timeout_seconds=1,
+    )
+    release = asyncio.Event()
+
+    async def hold(device_id: str) -> None:
+        async with controller.admit("test", device_id):
+            await release.wait()
+
+    holder = asyncio.create_task(hold("a"))
+    waiter = asyncio.create_task(hold("b"))
+    await asyncio.sleep(0.01)
+    with pytest.raises(AdmissionOverloaded):
+        async with controller.admit("test", "c"):
+            pass
+    release.set()
+    await asyncio.gather(holder, waiter)
+
+
+@pytest.mark.asyncio
+async def test_session_rate_limit_applies_only_after_authentication(client, test_app):
+    settings = get_settings()
+    admission.configure(settings.model_copy(update={"admission_device_rate_per_second": 0.1, "admission_device_burst": 1.0}))
+    async with test_app.state.test_session_maker() as session:
+        user = User(email="limited@example.com")
+        plan = Plan(name="basic")
+        session.add_all([user, plan])
+        await session.flush()
+        session.add_all(
+            [
+                Device(user_id=user.id, device_id="victim"),
+                Subscription(user_id=user.id, plan_id=plan.id, status=SubscriptionStatus.active.value),
+            ]
+        )
+        await session.commit()
+    for _ in range(3):
+        anonymous = await client.post("/api/v1/httvps/session", json={"device_id": "victim", "token": "forged"})
+        assert anonymous.status_code == 403
+    token = create_token({"device_id": "victim"}, settings)
+    first = await client.post("/api/v1/httvps/session", json={"device_id": "victim", "token": token})
+    assert first.status_code != 429
+    second = await client.post("/api/v1/httvps/session", json={"device_id": "victim", "token": token})
+    assert second.status_code == 429
+    assert int(second.headers["retry-after"]) >= 1
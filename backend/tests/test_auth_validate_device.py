@@ -1,4 +1,5 @@
 import pytest
+from sqlalchemy import delete, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.config import get_settings
 from app.core.security import create_token
@@ -43,3 +44,25 @@ async def test_validate_device_failure(test_app, client):
     assert response.status_code == 403
     body = response.json()
     assert body["detail"]["allowed"] is False
+
+
+@pytest.mark.asyncio
+async def test_validate_device_uses_cache_until_subscription_changes(test_app, client):
+    settings = get_settings()
+    TestSession = test_app.state.test_session_maker
+    async with TestSession() as session:
+        user, device, subscription = await create_fixture_data(session)
+    token = create_token({"device_id": device.device_id}, settings)
+    payload = {"device_id": device.device_id, "token": token}
+    assert (await client.post("/api/v1/auth/validate-device", json=payload)).status_code == 200
+    async with TestSession() as session:
+        await session.execute(delete(Subscription))
+        await session.commit()
+    assert (await client.post("/api/v1/auth/validate-device", json=payload)).status_code == 200
+    async with TestSession() as session:
+        plan = await session.scalar(select(Plan))
+        session.add(Subscription(user_id=user.id, plan_id=plan.id, status=SubscriptionStatus.expired.value))
+        await session.commit()
+    response = await client.post("/api/v1/auth/validate-device", json=payload)
+    assert response.status_code == 403
+    assert response.json()["detail"]["reason"] == "no_active_subscription"
@@ -0,0 +1,177 @@
+import asyncio
+import time
+import pytest
+from datetime import datetime, timedelta, timezone
+from app.core.config import get_settings
+from app.core.metrics import SESSION_STORE_ENTRIES
+from app.schemas.nodes import OutlineNodeAssignment
+from app.services import httvps_session_service
+from app.services.httvps_session_service import (
+    CachedDescriptorBackend,
+    DatabaseDescriptorBackend,
+    SessionDescriptorStore,
+    SessionRevocationList,
+    revoke_session_token,
+    seal_session_descriptor,
+    validate_session_token,
+)
+
+
+def make_descriptor(ttl_seconds: float) -> dict:
+    return {"expires_at": datetime.now(timezone.utc) + timedelta(seconds=ttl_seconds)}
+
+
+def test_get_drops_expired_descriptor():
+    store = SessionDescriptorStore()
+    store.put("live", make_descriptor(60))
+    store.put("stale", make_descriptor(-1))
+    assert store.get("live") is not None
+    assert store.get("stale") is None
+    assert len(store) == 1
+
+
+def test_sweep_removes_expired_entries_without_reads():
+    store = SessionDescriptorStore()
+    for index in range(10):
+        store.put(f"old-{index}", make_descriptor(1))
+    store.put("fresh", make_descriptor(3600))
+    assert store.sweep(now=time.time() + 5) == 10
+    assert len(store) == 1
+    assert store.sweep(now=time.time() + 5) == 0
+
+
+def test_sweep_skips_tokens_renewed_after_scheduling():
+    store = SessionDescriptorStore()
+    store.put("token", make_descriptor(1))
+    store.put("token", make_descriptor(3600))
+    assert store.sweep(now=time.time() + 5) == 0
+    assert store.get("token") is not None
+
+
+def test_max_entries_evicts_least_recently_used():
+    store = SessionDescriptorStore(max_entries=2)
+    store.put("a", make_descriptor(60))
+    store.put("b", make_descriptor(60))
+    assert store.get("a") is not None
+    store.put("c", make_descriptor(60))
+    assert store.get("b") is None
+    assert store.get("a") is not None
+    assert store.get("c") is not None
+    assert len(store) == 2
+
+
+def test_max_entries_drops_expired_sessions_before_live_ones():
+    store = SessionDescriptorStore(max_entries=2)
+    store.put("live", make_descriptor(60))
+    store.put("expired", make_descriptor(-1))
+    store.put("new", make_descriptor(60))
+    assert store.get("live") is not None
+    assert store.get("new") is not None
+    assert len(store) == 2
+
+
+def test_expiry_heap_stays_proportional_to_live_entries():
+    store = SessionDescriptorStore(max_entries=3)
+    for index in range(100):
+        store.put(f"token-{index % 5}", make_descriptor(60))
+    assert len(store) == 3
+    assert len(store._expiry) <= 2 * len(store)
+
+
+@pytest.mark.asyncio
+async def test_database_backend_shares_descriptors_between_replicas(test_app):
+    session_maker = test_app.state.test_session_maker
+    minting = CachedDescriptorBackend(DatabaseDescriptorBackend(session_maker), SessionDescriptorStore(), 5)
+    validating = CachedDescriptorBackend(DatabaseDescriptorBackend(session_maker), SessionDescriptorStore(), 5)
+    descriptor = {**make_descriptor(60), "device_id": "dev", "outline": {"node_id": 1}}
+    await minting.put("token", descriptor)
+    loaded = await validating.get("token")
+    assert loaded["device_id"] == "dev"
+    assert loaded["outline"] == {"node_id": 1}
+    assert loaded["expires_at"] == descriptor["expires_at"]
+    assert len(validating.cache) == 1
+    await minting.delete("token")
+    assert await minting.get("token") is None
+
+
+@pytest.mark.asyncio
+async def test_database_backend_sweeps_expired_rows(test_app):
+    backend = DatabaseDescriptorBackend(test_app.state.test_session_maker)
+    await backend.put("old", make_descriptor(-5))
+    await backend.put("live", make_descriptor(60))
+    assert await backend.get("old") is None
+    assert await backend.sweep() == 1
+    assert await backend.get("live") is not None
+
+
+def sealed_settings():
+    return get_settings().model_copy(update={"httvps_session_token_mode": "sealed"})
+
+
+@pytest.mark.asyncio
+async def test_sealed_token_validates_without_store(test_app):
+    settings = sealed_settings()
+    descriptor = {**make_descriptor(60), "device_id": "dev", "user_id": 7, "max_streams": 4, "outline": {"node_id": 3}}
+    token = seal_session_descriptor("sid", descriptor, settings)
+    validated = await validate_session_token(token, settings)
+    assert validated["session_id"] == "sid"
+    assert validated["device_id"] == "dev"
+    assert validated["outline"] == {"node_id": 3}
+    assert await validate_session_token(token[:-4] + "AAAA", settings) is None
+    expired = seal_session_descriptor("old", {**descriptor, **make_descriptor(-1)}, settings)
+    assert await validate_session_token(expired, settings) is None
+
+
+@pytest.mark.asyncio
+async def test_revoked_sealed_token_is_rejected(test_app):
+    settings = sealed_settings()
+    descriptor = {**make_descriptor(60), "device_id": "dev", "user_id": 7, "max_streams": 4, "outline": {}}
+    token = seal_session_descriptor("revoked-sid", descriptor, settings)
+    entries_before = SESSION_STORE_ENTRIES._value.get()
+    assert await revoke_session_token(token, settings) is True
+    assert await validate_session_token(token, settings) is None
+    assert await revoke_session_token("garbage", settings) is False
+    assert SESSION_STORE_ENTRIES._value.get() == entries_before
+
+
+@pytest.mark.asyncio
+async def test_revocations_reach_other_replicas(test_app):
+    session_maker = test_app.state.test_session_maker
+    revoking = SessionRevocationList(session_maker, refresh_seconds=0)
+    validating = SessionRevocationList(session_maker, refresh_seconds=60)
+    assert await validating.is_revoked("sid") is False
+    await revoking.revoke("sid", make_descriptor(60)["expires_at"])
+    await revoking.revoke("sid", make_descriptor(60)["expires_at"])
+    await revoking.revoke("old", make_descriptor(-1)["expires_at"])
+    assert await validating.is_revoked("sid") is False
+    validating.refresh_seconds = 0
+    assert await validating.is_revoked("sid") is True
+    assert await validating.is_revoked("old") is False
+    assert await revoking.sweep() == 1
+    assert len(validating) == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_session_requests_share_one_descriptor(test_app, monkeypatch):
+    calls = []
+
+    async def fake_validate_device(db, device_id, token, settings):
+        calls.append(device_id)
+        await asyncio.sleep(0.01)
+        return {"allowed": True, "user_id": 1}
+
+    async def fake_assign_outline_node(db, region, device_id, pool_code=None, settings=None):
+        return OutlineNodeAssignment(node_id=1, host="h", port=1, region=region)
+
+    monkeypatch.setattr(httvps_session_service, "validate_device", fake_validate_device)
+    monkeypatch.setattr(httvps_session_service, "assign_outline_node", fake_assign_outline_node)
+    settings = get_settings()
+    async with test_app.state.test_session_maker() as session:
+        results = await asyncio.gather(
+            *(httvps_session_service.issue_session_descriptor(session, "dev", "jwt", "eu", settings) for _ in range(5)),
+            httvps_session_service.issue_session_descriptor(session, "dev", "jwt", "us", settings),
+        )
+    assert calls == ["dev", "dev"]
+    assert len({result["session_token"] for result in results[:5]}) == 1
+    assert results[5]["session_token"] != results[0]["session_token"]
+    assert len(httvps_session_service.session_requests) == 0
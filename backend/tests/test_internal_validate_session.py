@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from app.services.httvps_session_service import store
+
+
+def put_descriptor(token: str, device_id: str) -> None:
+    store.put(
+        token,
+        {
+            "session_id": token,
+            "session_token": token,
+            "expires_at": datetime.now(timezone.utc) + timedelta(minutes=5),
+            "device_id": device_id,
+            "max_streams": 4,
+            "outline": {"node_id": 1},
+        },
+    )
+
+
+@pytest.mark.asyncio
+async def test_validate_session_batch_returns_per_token_results(client):
+    put_descriptor("batch-a", "dev-a")
+    put_descriptor("batch-b", "dev-b")
+    response = await client.post(
+        "/internal/httvps/validate-session:batch",
+        json={"session_tokens": ["batch-a", "missing", "batch-b", "batch-a"]},
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["valid"] == 3
+    results = body["results"]
+    assert [item["valid"] for item in results] == [True, False, True, True]
+    assert results[0]["session"]["device_id"] == "dev-a"
+    assert results[1]["reason"] == "invalid_session"
+    assert results[2]["session"]["session_id"] == "batch-b"
+
+
+@pytest.mark.asyncio
+async def test_validate_session_batch_rejects_oversized_batches(client):
+    response = await client.post("/internal/httvps/validate-session:batch", json={"session_tokens": ["t"] * 501})
+    assert response.status_code == 413
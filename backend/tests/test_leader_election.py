@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from sqlalchemy import select, update
+from app.core.config import get_settings
+from app.models.leader_lease import LeaderLease
+from app.services.leader_election_service import LeaderElection, advisory_lock_id
+
+
+def election_settings(**overrides):
+    values = {"leader_election": "auto", "leader_lease_seconds": 30.0, "leader_check_interval_seconds": 0.0}
+    values.update(overrides)
+    return get_settings().model_copy(update=values)
+
+
+@pytest.mark.asyncio
+async def test_only_one_process_holds_the_lease(test_app):
+    engine = test_app.state.test_session_maker.kw["bind"]
+    settings = election_settings()
+    first = LeaderElection("background", engine=engine, holder="first")
+    second = LeaderElection("background", engine=engine, holder="second")
+    assert first.mode(settings) == "lease"
+    assert await first.ensure(settings) is True
+    assert await second.ensure(settings) is False
+    assert await first.ensure(settings) is True
+    assert first.is_leader and not second.is_leader
+
+
+@pytest.mark.asyncio
+async def test_follower_takes_over_expired_lease(test_app):
+    session_maker = test_app.state.test_session_maker
+    engine = session_maker.kw["bind"]
+    settings = election_settings()
+    first = LeaderElection("background", engine=engine, holder="first")
+    second = LeaderElection("background", engine=engine, holder="second")
+    assert await first.ensure(settings) is True
+    async with session_maker() as session:
+        await session.execute(
+            update(LeaderLease).values(expires_at=datetime.now(timezone.utc) - timedelta(seconds=1))
+        )
+        await session.commit()
+    assert await second.ensure(settings) is True
+    assert await first.ensure(settings) is False
+    async with session_maker() as session:
+        lease = await session.scalar(select(LeaderLease))
+    assert lease.holder == "second"
+
+
+@pytest.mark.asyncio
+async def test_release_hands_over_leadership(test_app):
+    engine = test_app.state.test_session_maker.kw["bind"]
+    settings = election_settings()
+    first = LeaderElection("background", engine=engine, holder="first")
+    second = LeaderElection("background", engine=engine, holder="second")
+    assert await first.ensure(settings) is True
+    await first.release()
+    assert first.is_leader is False
+    assert await second.ensure(settings) is True
+
+
+@pytest.mark.asyncio
+async def test_leadership_is_cached_between_checks(test_app):
+    engine = test_app.state.test_session_maker.kw["bind"]
+    first = LeaderElection("background", engine=engine, holder="first")
+    second = LeaderElection("background", engine=engine, holder="second")
+    assert await first.ensure(election_settings()) is True
+    assert await second.ensure(election_settings()) is False
+    await first.release()
+    assert await second.ensure(election_settings(leader_check_interval_seconds=60.0)) is False
+    assert await second.ensure(election_settings()) is True
+
+
+@pytest.mark.asyncio
+async def test_disabled_election_always_leads(test_app):
+    engine = test_app.state.test_session_maker.kw["bind"]
+    election = LeaderElection("background", engine=engine)
+    settings = election_settings(leader_election="disabled")
+    assert election.mode(settings) == "disabled"
+    assert await election.ensure(settings) is True
+
+
+def test_advisory_lock_id_is_stable_signed_bigint():
+    lock_id = advisory_lock_id("outline-background")
+    assert lock_id == advisory_lock_id("outline-background")
+    assert -(2**63) <= lock_id < 2**63
+    assert lock_id != advisory_lock_id("outline-reconcile")
@@ -0,0 +1,63 @@
+import os
+import subprocess
+import sys
+import pytest
+from prometheus_client import REGISTRY
+from app.core.metrics import UNMATCHED_ROUTE, cleanup_dead_process_files, parse_buckets
+
+
+def request_count(method: str, path: str, status: str) -> float:
+    return REGISTRY.get_sample_value(
+        "backend_http_requests_total", {"method": method, "path": path, "status": status}
+    ) or 0.0
+
+
+def test_parse_buckets_sorts_and_appends_infinity():
+    assert parse_buckets("0.01, 0.001,0.01") == (0.001, 0.01, float("inf"))
+
+
+@pytest.mark.asyncio
+async def test_requests_are_labelled_with_route_template(client):
+    template = "/api/v1/admin/outline-nodes/{node_id}"
+    before = request_count("GET", template, "401")
+    await client.get("/api/v1/admin/outline-nodes/17")
+    await client.get("/api/v1/admin/outline-nodes/18")
+    assert request_count("GET", template, "401") == before + 2
+    assert request_count("GET", "/api/v1/admin/outline-nodes/17", "401") == 0
+
+
+@pytest.mark.asyncio
+async def test_unmatched_paths_share_one_label(client):
+    before = request_count("GET", UNMATCHED_ROUTE, "404")
+    await client.get("/no/such/path/1")
+    await client.get("/no/such/path/2")
+    assert request_count("GET", UNMATCHED_ROUTE, "404") == before + 2
+
+
+def test_cleanup_removes_live_gauge_files_of_dead_workers(tmp_path):
+    dead_pid = 4194303
+    (tmp_path / f"gauge_livesum_{dead_pid}.db").write_bytes(b"")
+    (tmp_path / f"counter_{dead_pid}.db").write_bytes(b"")
+    (tmp_path / f"gauge_livesum_{os.getpid()}.db").write_bytes(b"")
+    assert cleanup_dead_process_files(str(tmp_path)) == [dead_pid]
+    remaining = sorted(path.name for path in tmp_path.iterdir())
+    assert remaining == [f"counter_{dead_pid}.db", f"gauge_livesum_{os.getpid()}.db"]
+
+
+WORKER_SCRIPT = """
+import sys
+from prometheus_client import Counter
+Counter("backend_test_worker_jobs", "Jobs handled by a test worker").inc(float(sys.argv[1]))
+"""
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_aggregates_multiprocess_dir(client, tmp_path, monkeypatch):
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    for amount in ("2", "3"):
+        subprocess.run([sys.executable, "-c", WORKER_SCRIPT, amount], check=True, env={**os.environ})
+    assert len(list(tmp_path.glob("counter_*.db"))) == 2
+    response = await client.get("/metrics")
+    assert response.status_code == 200
+    assert "backend_test_worker_jobs_total 5.0" in response.text
+    assert "backend_http_requests_total" not in response.text
@@ -1,8 +1,17 @@
 import pytest
 import pytest
-from sqlalchemy import delete
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import delete, select
+from app.clients.outline_client import OutlineKeyData
+from app.core.config import get_settings
+from app.models.outline_access_key import OutlineAccessKey
 from app.models.outline_node import OutlineNode
+from app.models.outline_pool import OutlinePool
+from app.models.outline_pool_node import OutlinePoolNode
+from app.models.outline_pool_region import OutlinePoolRegion
 from app.models.region import Region
+from app.services.nodes_service import assign_outline_node
+from app.services.outline_topology_service import outline_topology
 from app.services.outline_health_service import OutlineHealthStatus
 
 
@@ -87,3 +96,93 @@ async def test_assign_fails_without_healthy_nodes(client, test_app, setup_device
     resp = await client.post("/api/v1/nodes/assign-outline", json={"region_code": "us", "device_id": setup_device.device_id})
     assert resp.status_code == 503
     assert resp.json()["detail"] == "no_healthy_outline_nodes"
+
+
+class RotatingOutlineClient:
+    created = []
+    deleted = []
+
+    def __init__(self, api_url: str, api_key: str):
+        self.api_url = api_url
+
+    async def create_key(self, name: str | None = None) -> OutlineKeyData:
+        key_id = f"new-{len(self.created)}"
+        self.created.append(key_id)
+        return OutlineKeyData(key_id=key_id, password="pwd", port=9000, method="aes-256-gcm")
+
+    async def delete_key(self, key_id: str) -> None:
+        self.deleted.append(key_id)
+
+
+async def create_keyed_node(session_maker, device, issued_at):
+    async with session_maker() as session:
+        await session.execute(delete(OutlineAccessKey))
+        await session.execute(delete(OutlineNode))
+        node = OutlineNode(host="api", port=1, api_url="https://api", api_key="k", is_active=True, last_check_status=OutlineHealthStatus.healthy.value)
+        session.add(node)
+        await session.flush()
+        session.add(OutlineAccessKey(device_id=device.id, outline_node_id=node.id, access_key_id="old", password="pwd", port=9000, assigned_at=issued_at))
+        await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_assign_reuses_live_device_key(test_app, setup_device):
+    RotatingOutlineClient.created, RotatingOutlineClient.deleted = [], []
+    session_maker = test_app.state.test_session_maker
+    await create_keyed_node(session_maker, setup_device, datetime.now(timezone.utc))
+    settings = get_settings().model_copy(update={"outline_key_max_age_seconds": 3600})
+    async with session_maker() as session:
+        assignment = await assign_outline_node(session, None, setup_device.device_id, client_class=RotatingOutlineClient, settings=settings)
+    assert assignment.access_key_id == "old"
+    assert RotatingOutlineClient.created == []
+
+
+@pytest.mark.asyncio
+async def test_assign_rotates_expired_device_key(test_app, setup_device):
+    RotatingOutlineClient.created, RotatingOutlineClient.deleted = [], []
+    session_maker = test_app.state.test_session_maker
+    await create_keyed_node(session_maker, setup_device, datetime.now(timezone.utc) - timedelta(hours=2))
+    settings = get_settings().model_copy(update={"outline_key_max_age_seconds": 3600})
+    async with session_maker() as session:
+        assignment = await assign_outline_node(session, None, setup_device.device_id, client_class=RotatingOutlineClient, settings=settings)
+    assert assignment.access_key_id == "new-0"
+    assert RotatingOutlineClient.deleted == ["old"]
+    async with session_maker() as session:
+        old_key = await session.scalar(select(OutlineAccessKey).where(OutlineAccessKey.access_key_id == "old"))
+    assert old_key.revoked is True
+
+
+@pytest.mark.asyncio
+async def test_assign_from_pool_uses_topology_snapshot(client, test_app, setup_device):
+    session_maker = test_app.state.test_session_maker
+    async with session_maker() as session:
+        await session.execute(delete(OutlineNode))
+        await session.execute(delete(Region))
+        us = Region(code="us", name="United States")
+        eu = Region(code="eu", name="Europe")
+        pool = OutlinePool(code="main", name="Main")
+        session.add_all([us, eu, pool])
+        await session.flush()
+        us_node = OutlineNode(region_id=us.id, host="us-node", port=1, is_active=True)
+        eu_node = OutlineNode(region_id=eu.id, host="eu-node", port=1, is_active=True)
+        session.add_all([us_node, eu_node])
+        await session.flush()
+        session.add_all(
+            [
+                OutlinePoolRegion(pool_id=pool.id, region_id=us.id, priority=2),
+                OutlinePoolRegion(pool_id=pool.id, region_id=eu.id, priority=1),
+                OutlinePoolNode(pool_id=pool.id, outline_node_id=us_node.id),
+                OutlinePoolNode(pool_id=pool.id, outline_node_id=eu_node.id),
+            ]
+        )
+        await session.commit()
+    version = outline_topology.version
+    resp = await client.post("/api/v1/nodes/assign-outline", json={"pool_code": "main", "device_id": setup_device.device_id})
+    assert resp.json()["host"] == "eu-node"
+    assert resp.json()["pool"] == "main"
+    resp = await client.post("/api/v1/nodes/assign-outline", json={"pool_code": "main", "region_code": "us", "device_id": setup_device.device_id})
+    assert resp.json()["host"] == "us-node"
+    resp = await client.post("/api/v1/nodes/assign-outline", json={"pool_code": "missing", "device_id": setup_device.device_id})
+    assert resp.status_code == 503
+    assert resp.json()["detail"] == "outline_pool_not_found"
+    assert outline_topology.version == version + 1
@@ -1,3 +1,4 @@
+from datetime import datetime, timedelta, timezone
 import pytest
 from sqlalchemy import delete, select
 from app.models.outline_access_key import OutlineAccessKey
@@ -43,6 +44,30 @@ async def test_revoke_outline_marks_revoked(client, test_app, setup_device):
     assert DummyOutlineClient.deleted == [("https://api", "key-1")]
 
 
+@pytest.mark.asyncio
+async def test_revoke_outline_picks_the_most_recently_assigned_key(client, test_app, setup_device):
+    DummyOutlineClient.deleted = []
+    now = datetime.now(timezone.utc)
+    session_maker = test_app.state.test_session_maker
+    async with session_maker() as session:
+        await session.execute(delete(OutlineNode))
+        await session.execute(delete(OutlineAccessKey))
+        node = OutlineNode(host="host1", port=1080, api_url="https://api", api_key="key", is_active=True)
+        session.add(node)
+        await session.flush()
+        session.add_all(
+            [
+                OutlineAccessKey(device_id=setup_device.id, outline_node_id=node.id, access_key_id="pooled", password="p", port=1, created_at=now - timedelta(hours=2), assigned_at=now),
+                OutlineAccessKey(device_id=setup_device.id, outline_node_id=node.id, access_key_id="direct", password="p", port=1, created_at=now - timedelta(hours=1)),
+            ]
+        )
+        await session.commit()
+    client._transport.app.state.outline_client_class = DummyOutlineClient
+    resp = await client.post("/api/v1/nodes/revoke-outline", json={"device_id": setup_device.device_id})
+    assert resp.json()["revoked"] is True
+    assert DummyOutlineClient.deleted == [("https://api", "pooled")]
+
+
 @pytest.mark.asyncio
 async def test_revoke_outline_without_key(client, test_app, setup_device):
     DummyOutlineClient.deleted = []
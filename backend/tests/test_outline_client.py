@@ -1,6 +1,7 @@
+import asyncio
 import pytest
 import httpx
-from app.clients.outline_client import OutlineClient, OutlineClientError
+from app.clients.outline_client import OutlineClient, OutlineClientError, OutlineClientRegistry, ProbeTracer, probe_tcp
 
 
 @pytest.mark.asyncio
@@ -25,3 +26,67 @@ async def test_outline_client_create_key_failure():
     client = OutlineClient("https://outline", "secret", transport=transport)
     with pytest.raises(OutlineClientError):
         await client.create_key("name")
+
+
+@pytest.mark.asyncio
+async def test_outline_client_registry_shares_connections_per_node():
+    registry = OutlineClientRegistry(max_connections=4, max_keepalive_connections=2)
+    first = registry.client_for("https://outline/", "secret")
+    second = registry.client_for("https://outline", "secret", timeout=1.0)
+    other = registry.client_for("https://outline-2", "secret")
+    assert first.http_client is second.http_client
+    assert second.timeout == 1.0
+    assert other.http_client is not first.http_client
+    await registry.discard("https://outline", "secret")
+    assert first.http_client.is_closed
+    assert registry.client_for("https://outline", "secret").http_client is not first.http_client
+    await registry.aclose()
+    assert other.http_client.is_closed
+
+
+@pytest.mark.asyncio
+async def test_outline_client_health_check_uses_server_endpoint():
+    paths = []
+
+    async def handler(request):
+        paths.append(request.url.path)
+        return httpx.Response(200, json={"name": "outline"})
+
+    client = OutlineClient("https://outline", "secret", transport=httpx.MockTransport(handler))
+    await client.health_check()
+    await client.health_check("access_keys")
+    assert paths == ["/server", "/access-keys"]
+
+
+@pytest.mark.asyncio
+async def test_outline_client_health_check_traces_connection_phases():
+    async def serve(reader, writer):
+        await reader.readuntil(b"\r\n\r\n")
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: 2\r\n\r\n{}")
+        await writer.drain()
+        writer.close()
+
+    server = await asyncio.start_server(serve, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    tracer = ProbeTracer()
+    try:
+        await OutlineClient(f"http://127.0.0.1:{port}", "secret").health_check(trace=tracer)
+    finally:
+        server.close()
+        await server.wait_closed()
+    assert tracer.timings.tcp_ms is not None
+    assert tracer.timings.tls_ms is None
+    assert tracer.timings.http_ms is not None
+    assert set(tracer.timings.phases()) == {"tcp", "http"}
+
+
+@pytest.mark.asyncio
+async def test_probe_tcp_connects_and_reports_failures():
+    server = await asyncio.start_server(lambda reader, writer: writer.close(), "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    timings = await probe_tcp("127.0.0.1", port, 1.0)
+    server.close()
+    await server.wait_closed()
+    assert timings.tcp_ms is not None
+    with pytest.raises(OutlineClientError, match="tcp_connect_failed"):
+        await probe_tcp("127.0.0.1", port, 1.0)
@@ -0,0 +1,87 @@
+from datetime import datetime, timezone
+import pytest
+from sqlalchemy import func, select
+from app.core.config import get_settings
+from app.models.outline_node import OutlineNode
+from app.models.outline_node_health_history import OutlineNodeHealthHistory
+from app.services.outline_health_history_service import NodeHealthWindow, OutlineHealthHistory, health_history
+from app.services.outline_health_service import OutlineHealthStatus, evaluate_smoothed_status, record_health_sample
+
+
+def test_window_keeps_fixed_size_and_reports_percentiles():
+    window = NodeHealthWindow(size=4, alpha=0.5)
+    for latency in (100.0, 200.0, None, 300.0, 400.0):
+        window.add(latency)
+    stats = window.stats()
+    assert stats.samples == 4
+    assert stats.errors == 1
+    assert stats.p50_ms == 300.0
+    assert stats.p95_ms == 400.0
+    assert stats.error_rate == 0.25
+    assert stats.ewma_ms == pytest.approx(312.5)
+
+
+def test_single_bad_probe_does_not_flip_status():
+    settings = get_settings()
+    threshold = settings.outline_healthcheck_degraded_threshold_ms
+    window = NodeHealthWindow(size=20, alpha=0.3)
+    for _ in range(10):
+        window.add(threshold / 5)
+    window.add(threshold * 2)
+    assert evaluate_smoothed_status(window.stats(), settings) == OutlineHealthStatus.healthy.value
+    window.add(None)
+    assert evaluate_smoothed_status(window.stats(), settings) == OutlineHealthStatus.healthy.value
+
+
+def test_consecutive_failures_mark_node_down():
+    settings = get_settings()
+    window = NodeHealthWindow(size=20, alpha=0.3)
+    for _ in range(10):
+        window.add(50.0)
+    for _ in range(settings.outline_health_down_after_failures):
+        window.add(None)
+    assert evaluate_smoothed_status(window.stats(), settings) == OutlineHealthStatus.down.value
+
+
+def test_restarted_history_is_seeded_from_the_node_row():
+    settings = get_settings()
+    checked_at = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    healthy = OutlineNode(
+        id=1,
+        last_check_at=checked_at,
+        last_check_status="healthy",
+        recent_latency_ms=80,
+        latency_p50_ms=80.0,
+        latency_p95_ms=120.0,
+        error_rate=0.05,
+    )
+    down = OutlineNode(id=2, last_check_at=checked_at, last_check_status="down", last_error="timeout", recent_latency_ms=80, error_rate=0.2)
+    health_history.reset()
+    status, columns = record_health_sample(healthy, None, "timeout", settings)
+    assert status == OutlineHealthStatus.healthy.value
+    assert columns["latency_p50_ms"] == 80.0
+    assert columns["latency_p95_ms"] == 120.0
+    status, _ = record_health_sample(down, None, "timeout", settings)
+    assert status == OutlineHealthStatus.down.value
+
+
+@pytest.mark.asyncio
+async def test_history_is_downsampled_once_per_bucket(test_app):
+    settings = get_settings().model_copy(update={"outline_health_history_bucket_seconds": 300})
+    async with test_app.state.test_session_maker() as session:
+        node = OutlineNode(host="h", port=1)
+        session.add(node)
+        await session.commit()
+        history = OutlineHealthHistory()
+        history.record(node.id, 120.0)
+        history.record(node.id, None)
+        now = datetime(2026, 1, 1, 12, 1, tzinfo=timezone.utc)
+        assert await history.persist(session, settings, now=now) == 1
+        assert await history.persist(session, settings, now=now.replace(minute=4)) == 0
+        assert await history.persist(session, settings, now=now.replace(minute=6)) == 1
+        await session.commit()
+        rows = (await session.scalars(select(OutlineNodeHealthHistory).order_by(OutlineNodeHealthHistory.bucket_start))).all()
+        assert [row.bucket_start.minute for row in rows] == [0, 5]
+        assert rows[0].samples == 2
+        assert rows[0].errors == 1
+        assert await session.scalar(select(func.count(OutlineNodeHealthHistory.id))) == 2
@@ -1,6 +1,24 @@
+import asyncio
+import time
+import httpx
 import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import delete, select
 from app.core.config import get_settings
-from app.services.outline_health_service import evaluate_status, OutlineHealthStatus
+from app.models.outline_node import OutlineNode
+from app.services.outline_selection_service import load_snapshot
+from app.services.outline_health_service import (
+    HealthCheckScheduler,
+    collect_requested_healthchecks,
+    OutlineHealthStatus,
+    check_outline_node,
+    probe_label,
+    probe_outline_nodes,
+    request_outline_healthcheck,
+    evaluate_status,
+    run_scheduled_healthchecks,
+    sync_health_schedule,
+)
 
 
 def test_evaluate_status_healthy():
@@ -19,3 +37,219 @@ def test_evaluate_status_down_on_error():
     settings = get_settings()
     status = evaluate_status(None, "timeout", settings)
     assert status == OutlineHealthStatus.down.value
+
+
+@pytest.mark.asyncio
+async def test_tcp_probe_checks_shadowsocks_port_without_api():
+    settings = get_settings().model_copy(update={"outline_healthcheck_probe": "tcp"})
+    server = await asyncio.start_server(lambda reader, writer: writer.close(), "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    node = OutlineNode(id=1, host="127.0.0.1", port=port)
+    status, latency_ms, error_text = await check_outline_node(node, settings)
+    server.close()
+    await server.wait_closed()
+    assert status == OutlineHealthStatus.healthy.value
+    assert latency_ms is not None and error_text is None
+    status, latency_ms, error_text = await check_outline_node(node, settings)
+    assert status == OutlineHealthStatus.down.value
+    assert error_text.startswith("tcp_connect_failed")
+
+
+@pytest.mark.asyncio
+async def test_every_api_probe_times_a_fresh_connection_under_one_label():
+    settings = get_settings().model_copy(update={"outline_healthcheck_probe": "server"})
+
+    async def serve(reader, writer):
+        while True:
+            try:
+                await reader.readuntil(b"\r\n\r\n")
+            except asyncio.IncompleteReadError:
+                break
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: 2\r\n\r\n{}")
+            await writer.drain()
+        writer.close()
+
+    server = await asyncio.start_server(serve, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    node = OutlineNode(id=1, host="127.0.0.1", port=port, api_url=f"http://127.0.0.1:{port}", api_key="k")
+    labels = {"node": f"127.0.0.1:{port}", "phase": "tcp"}
+    try:
+        for _ in range(2):
+            status, _, _ = await check_outline_node(node, settings)
+            assert status == OutlineHealthStatus.healthy.value
+        await check_outline_node(node, settings.model_copy(update={"outline_healthcheck_probe": "tcp"}))
+    finally:
+        server.close()
+        await server.wait_closed()
+    assert REGISTRY.get_sample_value("backend_outline_probe_phase_duration_seconds_count", labels) == 3
+
+
+def test_probe_label_is_the_same_in_every_probe_mode():
+    assert probe_label(OutlineNode(host="ss.example", port=8388, api_url="https://api.example:8443/secret")) == "api.example:8443"
+    assert probe_label(OutlineNode(host="ss.example", port=8388)) == "ss.example:8388"
+
+
+@pytest.mark.asyncio
+async def test_scheduled_healthchecks_batch_updates_and_refresh_load_snapshot(test_app):
+    settings = get_settings().model_copy(update={"outline_healthcheck_concurrency": 4})
+
+    async def handler(request):
+        if request.url.host == "broken":
+            return httpx.Response(500)
+        return httpx.Response(200, json={"name": "outline"})
+
+    scheduler = HealthCheckScheduler()
+    session_maker = test_app.state.test_session_maker
+    async with session_maker() as session:
+        await session.execute(delete(OutlineNode))
+        session.add_all(
+            [
+                OutlineNode(host="ok", port=1, api_url="https://ok", api_key="k", is_active=True),
+                OutlineNode(host="broken", port=1, api_url="https://broken", api_key="k", is_active=True),
+                OutlineNode(host="static", port=1, is_active=True),
+            ]
+        )
+        await session.commit()
+        for node_id in (await session.scalars(select(OutlineNode.id))).all():
+            scheduler.request(node_id, now=0)
+        assert load_snapshot.is_stale(settings.outline_load_snapshot_ttl_seconds)
+        assert await run_scheduled_healthchecks(session, settings, scheduler, transport=httpx.MockTransport(handler)) == 3
+    assert not load_snapshot.is_stale(settings.outline_load_snapshot_ttl_seconds)
+    async with session_maker() as session:
+        nodes = {node.host: node for node in (await session.scalars(select(OutlineNode))).all()}
+    assert nodes["ok"].last_check_status == OutlineHealthStatus.healthy.value
+    assert nodes["ok"].recent_latency_ms is not None
+    assert nodes["broken"].last_check_status == OutlineHealthStatus.down.value
+    assert nodes["broken"].last_error == "health_check_failed:500"
+    assert nodes["static"].last_error == "outline_api_not_configured"
+    assert all(node.last_check_at is not None for node in nodes.values())
+
+
+@pytest.mark.asyncio
+async def test_requested_healthchecks_are_picked_up_by_the_leader_scheduler(test_app):
+    settings = get_settings().model_copy(update={"outline_healthcheck_interval_seconds": 600})
+    scheduler = HealthCheckScheduler()
+    async with test_app.state.test_session_maker() as session:
+        await session.execute(delete(OutlineNode))
+        session.add_all([OutlineNode(host=f"n{index}", port=1) for index in range(3)])
+        await session.commit()
+        node_ids = list((await session.scalars(select(OutlineNode.id).order_by(OutlineNode.id))).all())
+        scheduler.sync(node_ids, settings)
+        assert scheduler.pop_due() == [node_ids[0]]
+        assert await request_outline_healthcheck(session, node_ids[2]) is True
+        assert await request_outline_healthcheck(session, 10**6) is False
+        assert await collect_requested_healthchecks(session, scheduler) == [node_ids[2]]
+        assert await collect_requested_healthchecks(session, scheduler) == [node_ids[2]]
+        assert await run_scheduled_healthchecks(session, settings, scheduler) == 1
+        assert await collect_requested_healthchecks(session, scheduler) == []
+        node = await session.scalar(select(OutlineNode).where(OutlineNode.id == node_ids[2]).execution_options(populate_existing=True))
+    assert node.health_check_requested_at is None
+    assert node.last_error == "outline_api_not_configured"
+
+
+def test_scheduler_spreads_initial_probes_and_backs_off_failures():
+    settings = get_settings().model_copy(
+        update={
+            "outline_healthcheck_interval_seconds": 60,
+            "outline_healthcheck_jitter_ratio": 0.1,
+            "outline_healthcheck_backoff_min_seconds": 5,
+            "outline_healthcheck_backoff_max_seconds": 30,
+        }
+    )
+    scheduler = HealthCheckScheduler()
+    scheduler.sync([1, 2, 3, 4], settings, now=0)
+    assert scheduler.pop_due(now=0) == [1]
+    assert scheduler.pop_due(now=29) == [2]
+    assert scheduler.pop_due(now=60) == [3, 4]
+    assert [scheduler.reschedule(1, "down", settings, now=0) for _ in range(4)] == [5, 10, 20, 30]
+    healthy_due = scheduler.reschedule(1, "healthy", settings, now=0)
+    assert 54 <= healthy_due <= 66
+    assert scheduler.reschedule(1, "degraded", settings, now=0) == 5
+
+
+def test_scheduler_request_preempts_and_sync_drops_removed_nodes():
+    settings = get_settings().model_copy(update={"outline_healthcheck_interval_seconds": 60})
+    scheduler = HealthCheckScheduler()
+    scheduler.sync([1, 2], settings, now=0)
+    assert scheduler.pop_due(now=0) == [1]
+    scheduler.reschedule(1, "healthy", settings, now=0)
+    scheduler.request(2, now=1)
+    assert scheduler.pop_due(now=1) == [2]
+    scheduler.sync([2], settings, now=1)
+    assert len(scheduler) == 1
+    assert scheduler.pop_due(now=10**9) == [2]
+
+
+@pytest.mark.asyncio
+async def test_run_scheduled_healthchecks_probes_only_due_nodes(test_app):
+    settings = get_settings().model_copy(update={"outline_healthcheck_interval_seconds": 600})
+    probed = []
+
+    async def handler(request):
+        probed.append(request.url.host)
+        return httpx.Response(200, json={"accessKeys": []})
+
+    scheduler = HealthCheckScheduler()
+    async with test_app.state.test_session_maker() as session:
+        await session.execute(delete(OutlineNode))
+        session.add_all([OutlineNode(host=f"n{index}", port=1, api_url=f"https://n{index}", api_key="k") for index in range(3)])
+        await session.commit()
+        await sync_health_schedule(session, settings, scheduler)
+        assert await run_scheduled_healthchecks(session, settings, scheduler, transport=httpx.MockTransport(handler)) == 1
+    assert probed == ["n0"]
+    assert len(scheduler) == 3
+    assert scheduler.seconds_until_next() > 0
+
+
+@pytest.mark.asyncio
+async def test_probe_concurrency_is_bounded():
+    settings = get_settings().model_copy(update={"outline_healthcheck_concurrency": 2})
+    in_flight = 0
+    peak = 0
+
+    async def handler(request):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.02)
+        in_flight -= 1
+        return httpx.Response(200, json={"name": "outline"})
+
+    nodes = [OutlineNode(id=index, host=f"n{index}", port=1, api_url=f"https://n{index}", api_key="k") for index in range(6)]
+    results = await probe_outline_nodes(nodes, settings, transport=httpx.MockTransport(handler))
+    assert set(results) == set(range(6))
+    assert peak == 2
+
+
+@pytest.mark.asyncio
+async def test_nodes_past_the_cycle_deadline_get_no_result_and_back_off(test_app):
+    settings = get_settings().model_copy(
+        update={
+            "outline_healthcheck_cycle_deadline_seconds": 0.2,
+            "outline_healthcheck_backoff_min_seconds": 5,
+            "outline_healthcheck_interval_seconds": 600,
+        }
+    )
+
+    async def handler(request):
+        if request.url.host == "slow":
+            await asyncio.sleep(5)
+        return httpx.Response(200, json={"name": "outline"})
+
+    scheduler = HealthCheckScheduler()
+    async with test_app.state.test_session_maker() as session:
+        await session.execute(delete(OutlineNode))
+        session.add_all([OutlineNode(host=host, port=1, api_url=f"https://{host}", api_key="k") for host in ("fast", "slow")])
+        await session.commit()
+        node_ids = {node.host: node.id for node in (await session.scalars(select(OutlineNode))).all()}
+        for node_id in node_ids.values():
+            scheduler.request(node_id, now=0)
+        started = time.monotonic()
+        assert await run_scheduled_healthchecks(session, settings, scheduler, transport=httpx.MockTransport(handler)) == 2
+        assert time.monotonic() - started < 2
+    async with test_app.state.test_session_maker() as session:
+        nodes = {node.host: node for node in (await session.scalars(select(OutlineNode))).all()}
+    assert nodes["fast"].last_check_status == OutlineHealthStatus.healthy.value
+    assert nodes["slow"].last_check_at is None
+    assert scheduler.pop_due(now=started + 4) == []
+    assert scheduler.pop_due(now=started + 10) == [node_ids["slow"]]
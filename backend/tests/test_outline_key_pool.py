@@ -0,0 +1,45 @@
+import pytest
+from sqlalchemy import delete, select
+from app.clients.outline_client import OutlineKeyData
+from app.core.config import get_settings
+from app.models.outline_access_key import OutlineAccessKey
+from app.models.outline_node import OutlineNode
+from app.services.nodes_service import assign_outline_node
+from app.services.outline_health_service import OutlineHealthStatus
+from app.services.outline_key_pool_service import refill_key_pools
+
+
+class CountingOutlineClient:
+    created = 0
+
+    def __init__(self, api_url: str, api_key: str):
+        self.api_url = api_url
+        self.api_key = api_key
+
+    async def create_key(self, name: str | None = None) -> OutlineKeyData:
+        CountingOutlineClient.created += 1
+        return OutlineKeyData(key_id=f"k{CountingOutlineClient.created}", password="pwd", port=9000, method="aes-256-gcm")
+
+
+@pytest.mark.asyncio
+async def test_refill_then_assign_claims_pooled_key(test_app, setup_device):
+    CountingOutlineClient.created = 0
+    settings = get_settings().model_copy(update={"outline_key_pool_size": 3})
+    session_maker = test_app.state.test_session_maker
+    async with session_maker() as session:
+        await session.execute(delete(OutlineAccessKey))
+        await session.execute(delete(OutlineNode))
+        node = OutlineNode(host="h", port=1, api_url="https://api", api_key="k", is_active=True, last_check_status=OutlineHealthStatus.healthy.value)
+        skipped = OutlineNode(host="d", port=1, api_url="https://down", api_key="k", is_active=True, last_check_status=OutlineHealthStatus.down.value)
+        session.add_all([node, skipped])
+        await session.commit()
+        assert await refill_key_pools(session, settings, client_class=CountingOutlineClient) == 3
+        assert await refill_key_pools(session, settings, client_class=CountingOutlineClient) == 0
+    async with session_maker() as session:
+        assignment = await assign_outline_node(session, None, setup_device.device_id, client_class=CountingOutlineClient)
+    assert CountingOutlineClient.created == 3
+    assert assignment.access_key_id == "k1"
+    async with session_maker() as session:
+        keys = (await session.scalars(select(OutlineAccessKey).order_by(OutlineAccessKey.id))).all()
+    assert [key.device_id for key in keys] == [setup_device.id, None, None]
+    assert keys[0].assigned_at is not None
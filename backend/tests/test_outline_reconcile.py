@@ -0,0 +1,130 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+import httpx
+import pytest
+from sqlalchemy import delete, select
+from app.core.config import get_settings
+from app.models.outline_access_key import OutlineAccessKey
+from app.models.outline_node import OutlineNode
+from app.services import outline_reconcile_service
+from app.services.outline_reconcile_service import OutlineKeyReconciler, outline_reconcile_loop
+
+
+def outline_server(keys: set[str], deleted: list[str]):
+    async def handler(request):
+        if request.method == "GET" and request.url.path == "/access-keys":
+            return httpx.Response(200, json={"accessKeys": [{"id": key_id, "port": 1} for key_id in sorted(keys)]})
+        if request.method == "DELETE":
+            key_id = request.url.path.rsplit("/", 1)[-1]
+            keys.discard(key_id)
+            deleted.append(key_id)
+            return httpx.Response(204)
+        return httpx.Response(404)
+
+    return httpx.MockTransport(handler)
+
+
+@pytest.mark.asyncio
+async def test_reconciler_revokes_drifted_rows_and_deletes_confirmed_orphans(test_app, setup_device):
+    settings = get_settings().model_copy(update={"outline_reconcile_grace_seconds": 60})
+    old = datetime.now(timezone.utc) - timedelta(hours=1)
+    async with test_app.state.test_session_maker() as session:
+        await session.execute(delete(OutlineNode))
+        node = OutlineNode(host="outline", port=1, api_url="https://outline", api_key="k")
+        session.add(node)
+        await session.flush()
+        session.add_all(
+            [
+                OutlineAccessKey(outline_node_id=node.id, device_id=setup_device.id, access_key_id="k1", password="p", port=1, created_at=old),
+                OutlineAccessKey(outline_node_id=node.id, device_id=setup_device.id, access_key_id="k2", password="p", port=1, created_at=old),
+                OutlineAccessKey(outline_node_id=node.id, access_key_id="k3", password="p", port=1),
+                OutlineAccessKey(outline_node_id=node.id, access_key_id="k4", password="p", port=1, revoked=True, created_at=old),
+            ]
+        )
+        await session.commit()
+        node_id = node.id
+    server_keys = {"k1", "k4", "k9"}
+    deleted = []
+    transport = outline_server(server_keys, deleted)
+    reconciler = OutlineKeyReconciler()
+    async with test_app.state.test_session_maker() as session:
+        first = await reconciler.run(session, settings, transport=transport)
+    assert first[node_id].remote_keys == 3
+    assert first[node_id].orphaned == {"k4", "k9"}
+    assert first[node_id].deleted == set()
+    assert len(first[node_id].drifted) == 1
+    assert deleted == []
+    async with test_app.state.test_session_maker() as session:
+        keys = {key.access_key_id: key.revoked for key in await session.scalars(select(OutlineAccessKey))}
+    assert keys == {"k1": False, "k2": True, "k3": False, "k4": True}
+    server_keys.add("k10")
+    async with test_app.state.test_session_maker() as session:
+        second = await reconciler.run(session, settings, transport=transport)
+    assert second[node_id].orphaned == {"k4", "k9", "k10"}
+    assert second[node_id].deleted == {"k4", "k9"}
+    assert sorted(deleted) == ["k4", "k9"]
+    assert server_keys == {"k1", "k10"}
+    assert second[node_id].drifted == set()
+
+
+@pytest.mark.asyncio
+async def test_reconciler_skips_nodes_it_cannot_list(test_app):
+    async with test_app.state.test_session_maker() as session:
+        await session.execute(delete(OutlineNode))
+        node = OutlineNode(host="outline", port=1, api_url="https://outline", api_key="k")
+        session.add(node)
+        await session.flush()
+        session.add(OutlineAccessKey(outline_node_id=node.id, access_key_id="k1", password="p", port=1, created_at=datetime.now(timezone.utc) - timedelta(days=1)))
+        await session.commit()
+        node_id = node.id
+    transport = httpx.MockTransport(lambda request: httpx.Response(500))
+    async with test_app.state.test_session_maker() as session:
+        results = await OutlineKeyReconciler().run(session, get_settings(), transport=transport)
+        revoked = await session.scalar(select(OutlineAccessKey.revoked))
+    assert results[node_id].error == "list_keys_failed:500"
+    assert revoked is False
+
+
+@pytest.mark.asyncio
+async def test_confirmed_orphans_over_the_delete_cap_stay_confirmed(test_app):
+    settings = get_settings().model_copy(update={"outline_reconcile_max_deletes": 1})
+    async with test_app.state.test_session_maker() as session:
+        await session.execute(delete(OutlineNode))
+        node = OutlineNode(host="outline", port=1, api_url="https://outline", api_key="k")
+        session.add(node)
+        await session.commit()
+        node_id = node.id
+    server_keys = {"a", "b", "c"}
+    deleted = []
+    transport = outline_server(server_keys, deleted)
+    reconciler = OutlineKeyReconciler()
+    for expected in ([], ["a"], ["a", "b"], ["a", "b", "c"]):
+        async with test_app.state.test_session_maker() as session:
+            await reconciler.run(session, settings, transport=transport)
+        assert deleted == expected
+    assert server_keys == set()
+
+
+@pytest.mark.asyncio
+async def test_reconcile_loop_runs_soon_after_taking_over_leadership(monkeypatch):
+    settings = get_settings().model_copy(
+        update={"outline_reconcile_interval_seconds": 3600, "leader_check_interval_seconds": 0.01}
+    )
+    leadership = iter([False, False, True])
+    runs = []
+
+    async def ensure(_settings):
+        return next(leadership, True)
+
+    async def run(session, _settings):
+        runs.append(session)
+        return {}
+
+    monkeypatch.setattr(outline_reconcile_service.background_leader, "ensure", ensure)
+    monkeypatch.setattr(outline_reconcile_service.outline_reconciler, "run", run)
+    task = asyncio.create_task(outline_reconcile_loop(settings))
+    await asyncio.sleep(0.2)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert len(runs) == 1
@@ -0,0 +1,66 @@
+import random
+from collections import Counter
+from app.core.config import get_settings
+from app.services.outline_selection_service import NodeLoadSnapshot, choose_outline_node
+from app.services.outline_topology_service import OutlineNodeView
+
+
+def make_node(node_id: int, priority: int | None = None, capacity: int | None = None, recent_latency_ms: int | None = None) -> OutlineNodeView:
+    return OutlineNodeView(
+        id=node_id,
+        name=None,
+        host=f"h{node_id}",
+        port=1,
+        method=None,
+        password=None,
+        api_url=None,
+        api_key=None,
+        tag=None,
+        priority=priority,
+        capacity=capacity,
+        key_pool_size=None,
+        last_check_status="healthy",
+        recent_latency_ms=recent_latency_ms,
+        region_id=None,
+        region_code=None,
+    )
+
+
+def test_choose_spreads_load_across_equal_nodes():
+    settings = get_settings()
+    nodes = [make_node(1), make_node(2), make_node(3)]
+    rng = random.Random(7)
+    picks = Counter(choose_outline_node(nodes, settings, NodeLoadSnapshot(), rng).id for _ in range(300))
+    assert set(picks) == {1, 2, 3}
+
+
+def test_choose_skips_full_and_prefers_idle_nodes():
+    settings = get_settings()
+    snapshot = NodeLoadSnapshot()
+    nodes = [make_node(1, capacity=10), make_node(2, capacity=10), make_node(3, capacity=10)]
+    for _ in range(10):
+        snapshot.record_assignment(1)
+    for _ in range(8):
+        snapshot.record_assignment(2)
+    rng = random.Random(1)
+    picks = Counter(choose_outline_node(nodes, settings, snapshot, rng).id for _ in range(200))
+    assert picks[1] == 0
+    assert picks[3] > picks[2]
+
+
+def test_choose_weights_priority_and_latency():
+    settings = get_settings()
+    nodes = [make_node(1, priority=1, recent_latency_ms=10), make_node(2, priority=5, recent_latency_ms=2000)]
+    rng = random.Random(3)
+    picks = Counter(choose_outline_node(nodes, settings, NodeLoadSnapshot(), rng).id for _ in range(200))
+    assert picks[1] > picks[2] * 3
+
+
+def test_choose_least_loaded_when_all_full():
+    settings = get_settings()
+    snapshot = NodeLoadSnapshot()
+    nodes = [make_node(1, capacity=1), make_node(2, capacity=4)]
+    snapshot.record_assignment(1)
+    for _ in range(5):
+        snapshot.record_assignment(2)
+    assert choose_outline_node(nodes, settings, snapshot).id == 1
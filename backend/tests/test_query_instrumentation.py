@@ -0,0 +1,36 @@
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import text
+from app.core.tracing import track_queries
+
+
+@pytest.mark.asyncio
+async def test_track_queries_counts_statements(test_app):
+    async with test_app.state.test_session_maker() as session:
+        with track_queries() as outer:
+            await session.execute(text("SELECT 1"))
+            with track_queries() as inner:
+                await session.execute(text("SELECT 2"))
+    assert inner.count == 1
+    assert outer.count == 2
+    assert outer.duration >= inner.duration
+
+
+@pytest.mark.asyncio
+async def test_request_queries_are_recorded_per_route(client, setup_device, query_budget):
+    labels = {"path": "/api/v1/nodes/revoke-outline"}
+    before = REGISTRY.get_sample_value("backend_db_queries_per_request_count", labels) or 0
+    with query_budget(3) as stats:
+        response = await client.post("/api/v1/nodes/revoke-outline", json={"device_id": "dev"})
+    assert response.status_code == 200
+    assert stats.count >= 1
+    assert REGISTRY.get_sample_value("backend_db_queries_per_request_count", labels) == before + 1
+
+
+@pytest.mark.asyncio
+async def test_query_budget_fails_when_exceeded(test_app, query_budget):
+    with pytest.raises(AssertionError):
+        async with test_app.state.test_session_maker() as session:
+            with query_budget(1):
+                await session.execute(text("SELECT 1"))
+                await session.execute(text("SELECT 2"))
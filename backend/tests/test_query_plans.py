@@ -0,0 +1,106 @@
+import re
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import pytest
+from sqlalchemy import event
+from app.clients.outline_client import OutlineKeyData
+from app.core.config import get_settings
+from app.models.outline_access_key import OutlineAccessKey
+from app.models.outline_node import OutlineNode
+from app.models.plan import Plan
+from app.models.subscription import Subscription, SubscriptionStatus
+from app.services.auth_service import load_entitlement
+from app.services.nodes_service import assign_outline_node, revoke_outline_key
+from app.services.outline_health_service import OutlineHealthStatus
+from app.services.outline_key_pool_service import claim_pooled_key
+
+LARGE_TABLES = {"outline_access_keys", "subscriptions", "sessions", "devices", "users"}
+SQLITE_SCAN = re.compile(r"^SCAN (\w+)")
+POSTGRES_SCAN = re.compile(r"Seq Scan on (\w+)")
+
+
+class StaticOutlineClient:
+    def __init__(self, api_url: str, api_key: str):
+        self.api_url = api_url
+
+    async def create_key(self, name: str | None = None) -> OutlineKeyData:
+        return OutlineKeyData(key_id="created", password="pwd", port=9000, method="aes-256-gcm")
+
+    async def delete_key(self, key_id: str) -> None:
+        return None
+
+
+@contextmanager
+def capture_statements(session):
+    statements = []
+    sync_engine = session.bind.sync_engine
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "WITH")):
+            statements.append((statement, parameters))
+
+    event.listen(sync_engine, "before_cursor_execute", capture)
+    try:
+        yield statements
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", capture)
+
+
+async def sequential_scans(session, statements) -> list[str]:
+    connection = await session.connection()
+    postgres = connection.dialect.name == "postgresql"
+    if postgres:
+        await connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+    prefix, pattern = ("EXPLAIN ", POSTGRES_SCAN) if postgres else ("EXPLAIN QUERY PLAN ", SQLITE_SCAN)
+    scans = []
+    for statement, parameters in statements:
+        rows = (await connection.exec_driver_sql(prefix + statement, parameters)).all()
+        for row in rows:
+            match = pattern.search(str(row[-1]))
+            if match and match.group(1) in LARGE_TABLES and "INDEX" not in str(row[-1]).upper():
+                scans.append(f"{match.group(1)}: {' '.join(statement.split())}")
+    await session.rollback()
+    return scans
+
+
+async def seed(test_app, device) -> int:
+    async with test_app.state.test_session_maker() as session:
+        plan = Plan(name="basic")
+        session.add(plan)
+        await session.flush()
+        session.add(Subscription(user_id=device.user_id, plan_id=plan.id, status=SubscriptionStatus.active.value))
+        node = OutlineNode(host="api", port=1, api_url="https://api", api_key="k", last_check_status=OutlineHealthStatus.healthy.value)
+        session.add(node)
+        await session.flush()
+        session.add_all(
+            [
+                OutlineAccessKey(device_id=device.id, outline_node_id=node.id, access_key_id="old", password="p", port=1, assigned_at=datetime.now(timezone.utc)),
+                OutlineAccessKey(outline_node_id=node.id, access_key_id="pooled", password="p", port=1),
+            ]
+        )
+        await session.commit()
+        return node.id
+
+
+@pytest.mark.asyncio
+async def test_entitlement_lookup_uses_indexes(test_app, setup_device):
+    await seed(test_app, setup_device)
+    async with test_app.state.test_session_maker() as session:
+        with capture_statements(session) as statements:
+            await load_entitlement(session, setup_device.device_id, get_settings())
+        assert statements
+        assert await sequential_scans(session, statements) == []
+
+
+@pytest.mark.asyncio
+async def test_outline_assignment_uses_indexes(test_app, setup_device):
+    node_id = await seed(test_app, setup_device)
+    settings = get_settings().model_copy(update={"outline_key_max_age_seconds": 0})
+    async with test_app.state.test_session_maker() as session:
+        with capture_statements(session) as statements:
+            await assign_outline_node(session, None, setup_device.device_id, client_class=StaticOutlineClient, settings=settings)
+            await claim_pooled_key(session, node_id, setup_device.id)
+            await session.rollback()
+            await revoke_outline_key(session, setup_device.device_id, client_class=None)
+        assert len(statements) >= 4
+        assert await sequential_scans(session, statements) == []
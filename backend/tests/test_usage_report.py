@@ -0,0 +1,119 @@
+import gzip
+import json
+import pytest
+from sqlalchemy.exc import OperationalError
+from app.core.config import get_settings
+from app.models.session import Session
+from app.services.sessions_service import apply_usage, usage_aggregator
+
+
+async def create_usage_session(session_maker, device) -> int:
+    async with session_maker() as session:
+        record = Session(device_id=device.id, bytes_up=10, bytes_down=20)
+        session.add(record)
+        await session.commit()
+        return record.id
+
+
+@pytest.mark.asyncio
+async def test_usage_reports_are_merged_and_flushed_in_bulk(client, test_app, setup_device):
+    session_maker = test_app.state.test_session_maker
+    session_id = await create_usage_session(session_maker, setup_device)
+    for _ in range(3):
+        resp = await client.post(
+            "/api/v1/usage/report",
+            json={"session_id": session_id, "device_id": setup_device.device_id, "bytes_up": 5, "bytes_down": 7},
+        )
+        assert resp.status_code == 200
+    await client.post("/api/v1/usage/report", json={"session_id": 999, "device_id": "x", "bytes_up": 1, "bytes_down": 1})
+    assert len(usage_aggregator) == 2
+    async with session_maker() as session:
+        assert await usage_aggregator.flush(session) == 2
+    assert len(usage_aggregator) == 0
+    async with session_maker() as session:
+        record = await session.get(Session, session_id)
+    assert record.bytes_up == 25
+    assert record.bytes_down == 41
+
+
+@pytest.mark.asyncio
+async def test_failed_inline_flush_keeps_deltas_without_failing_the_report(test_app, setup_device):
+    session_maker = test_app.state.test_session_maker
+    session_id = await create_usage_session(session_maker, setup_device)
+    settings = get_settings().model_copy(update={"usage_flush_interval_seconds": 0})
+
+    async def failing_commit():
+        raise OperationalError("COMMIT", {}, Exception("database is locked"))
+
+    async with session_maker() as session:
+        session.commit = failing_commit
+        await apply_usage(session, session_id, 5, 7, settings)
+    assert len(usage_aggregator) == 1
+    async with session_maker() as session:
+        await apply_usage(session, session_id, 1, 1, settings)
+    assert len(usage_aggregator) == 0
+    async with session_maker() as session:
+        record = await session.get(Session, session_id)
+    assert (record.bytes_up, record.bytes_down) == (16, 28)
+
+
+@pytest.mark.asyncio
+async def test_usage_batch_applies_reports_in_one_request(client, test_app, setup_device):
+    session_maker = test_app.state.test_session_maker
+    session_id = await create_usage_session(session_maker, setup_device)
+    lines = [
+        {"session_id": session_id, "device_id": "dev", "bytes_up": 1, "bytes_down": 2},
+        {"session_id": session_id, "device_id": "dev", "bytes_up": 3, "bytes_down": 4},
+        {"session_id": 999, "device_id": "dev", "bytes_up": 1, "bytes_down": 1},
+        {"device_id": "dev", "bytes_up": "many", "bytes_down": 1},
+        {"device_id": "dev", "bytes_up": 1, "bytes_down": 1},
+    ]
+    body = gzip.compress("\n".join(json.dumps(line) for line in lines).encode())
+    resp = await client.post(
+        "/api/v1/usage/report:batch",
+        content=body,
+        headers={"content-type": "application/x-ndjson", "content-encoding": "gzip"},
+    )
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["accepted"] == 2
+    assert [item["status"] for item in data["results"]] == ["accepted", "accepted", "not_found", "invalid", "ignored"]
+    async with session_maker() as session:
+        record = await session.get(Session, session_id)
+    assert (record.bytes_up, record.bytes_down) == (14, 26)
+
+
+@pytest.mark.asyncio
+async def test_usage_batch_rejects_non_list_body(client):
+    resp = await client.post("/api/v1/usage/report:batch", json={"session_id": 1})
+    assert resp.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_usage_batch_rejects_gzip_bomb(client):
+    body = gzip.compress(b"[" + b" " * (8 * 1024 * 1024) + b"]")
+    assert len(body) < 64 * 1024
+    resp = await client.post(
+        "/api/v1/usage/report:batch",
+        content=body,
+        headers={"content-type": "application/json", "content-encoding": "gzip"},
+    )
+    assert resp.status_code == 413
+    assert resp.json()["detail"] == "body_too_large"
+
+
+@pytest.mark.asyncio
+async def test_usage_batch_rejects_oversized_and_corrupt_bodies(client):
+    resp = await client.post(
+        "/api/v1/usage/report:batch",
+        content=b" " * (4 * 1024 * 1024 + 1),
+        headers={"content-type": "application/json"},
+    )
+    assert resp.status_code == 413
+    resp = await client.post(
+        "/api/v1/usage/report:batch",
+        content=gzip.compress(b"[]")[:-6],
+        headers={"content-type": "application/json", "content-encoding": "gzip"},
+    )
+    assert resp.status_code == 400
+    assert resp.json()["detail"] == "invalid_gzip_body"